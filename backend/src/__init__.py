@@ -3,6 +3,7 @@ Djambi backend package for game logic and AI.
 """
 
 from .board import Board
+from .mcts_player import MCTSPlayer
 from .minmax_player import MinMaxPlayer
 from .pieces import create_piece
 from .player import Player
@@ -12,4 +13,5 @@ __all__ = [
     "create_piece",
     "Player",
     "MinMaxPlayer",
+    "MCTSPlayer",
 ]
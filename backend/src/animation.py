@@ -71,7 +71,7 @@ def draw_legend(screen):
         start_x += text.get_width() + 20  # Space between elements
 
 
-def animate_player_elimination(screen, players, eliminated_player_index, board):
+def animate_player_elimination(screen, players, eliminated_player_index, renderer):
     jeton_radius = 15
     spacing = 10
     start_x = 20
@@ -82,7 +82,7 @@ def animate_player_elimination(screen, players, eliminated_player_index, board):
         screen.fill(BLACK)  # Clear the screen
 
         # Redraw the board
-        board.draw(screen)
+        renderer.draw(screen)
 
         for i, player in enumerate(players):
             x = start_x
@@ -99,7 +99,7 @@ def animate_player_elimination(screen, players, eliminated_player_index, board):
                 pygame.draw.circle(screen, player.color, (int(x), int(y)), jeton_radius)
 
         # Draw the arrow for the current player
-        current_player_index = board.current_player_index % len(players)
+        current_player_index = renderer.board.current_player_index % len(players)
         arrow_y = start_y + current_player_index * (jeton_radius * 2 + spacing)
         draw_arrow(screen, start_x, arrow_y, 20, jeton_radius, spacing)
 
@@ -0,0 +1,96 @@
+class AttackGraph:
+    """Possible moves, threats and protections of every piece of a board.
+
+    Kept up to date incrementally: the state collects the cells written since
+    the last refresh, and only the pieces standing (or last seen) on those
+    cells and the pieces whose rays go through them (Geometry.influence)
+    recompute their moves. An edge from a piece to an occupied destination is
+    a threat when the owners differ, a protection otherwise.
+
+    ``changed`` collects the pieces whose threat score inputs may have changed
+    (for the ScoreBoard): the updated pieces, the pieces they reached before
+    and after, and the attackers of all of those.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        nb_pieces = board.state.layout.nb_pieces
+        # (q, r) destinations, (target id, is threat) and attacker ids
+        self.moves: list[list[tuple[int, int]]] = [[] for _ in range(nb_pieces)]
+        self.targets: list[list[tuple[int, bool]]] = [[] for _ in range(nb_pieces)]
+        self.threatened_by: list[set[int]] = [set() for _ in range(nb_pieces)]
+        self.nb_threats = [0] * nb_pieces
+        self.nb_protections = [0] * nb_pieces
+        self.source = [None] * nb_pieces  # Cell the moves were computed from
+        self.at_source = {}  # cell -> id of the piece whose moves start there
+        self.changed = set(range(nb_pieces))
+        board.state.dirty_cells.update(range(board.state.layout.nb_cells))
+        self.refresh()
+
+    def refresh(self):
+        """Recomputes the pieces affected by the cells changed since last time."""
+        state = self.board.state
+        dirty_cells = state.dirty_cells
+        if not dirty_cells:
+            return self
+        buf, influence = state.buf, state.layout.geometry.influence
+        pids = set()
+        for cell in dirty_cells:
+            if buf[cell]:
+                pids.add(buf[cell] - 1)
+            if cell in self.at_source:
+                pids.add(self.at_source[cell])
+            for watcher in influence[cell]:
+                if buf[watcher]:
+                    pids.add(buf[watcher] - 1)
+        dirty_cells.clear()
+        for pid in pids:
+            self.update_piece(pid)
+        return self
+
+    def update_piece(self, pid):
+        threatened_by, nb_threats = self.threatened_by, self.nb_threats
+        nb_protections = self.nb_protections
+        changed = self.changed
+        changed.add(pid)
+        changed.update(threatened_by[pid])
+        for target, is_threat in self.targets[pid]:
+            changed.add(target)
+            changed.update(threatened_by[target])
+            if is_threat:
+                nb_threats[target] -= 1
+                threatened_by[target].discard(pid)
+            else:
+                nb_protections[target] -= 1
+        if self.at_source.get(self.source[pid]) == pid:
+            del self.at_source[self.source[pid]]
+
+        board, state = self.board, self.board.state
+        buf, layout = state.buf, state.layout
+        cell = buf[layout.piece_cell + pid]
+        owner = buf[layout.piece_owner + pid]
+        if buf[cell] == pid + 1:
+            moves = board.pieces[pid].all_possible_moves(board)
+            self.source[pid] = cell
+            self.at_source[cell] = pid
+        else:
+            moves = []  # Waiting to be placed
+            self.source[pid] = None
+
+        targets = []
+        index = layout.geometry.index
+        for destination in moves:
+            occupant = buf[index[destination]]
+            if occupant:
+                target = occupant - 1
+                is_threat = buf[layout.piece_owner + target] != owner
+                targets.append((target, is_threat))
+                changed.add(target)
+                changed.update(threatened_by[target])
+                if is_threat:
+                    nb_threats[target] += 1
+                    threatened_by[target].add(pid)
+                else:
+                    nb_protections[target] += 1
+        self.moves[pid] = moves
+        self.targets[pid] = targets
@@ -0,0 +1,218 @@
+import numpy as np
+
+from backend.src.scores import PIECE_VALUES
+from backend.src.state import CLASS_CODES, DEAD, PIECE_CLASSES
+
+MILITANT, ASSASSIN, CHIEF, DIPLOMAT, NECROMOBILE, REPORTER = (
+    CLASS_CODES[piece_class]
+    for piece_class in (
+        "militant",
+        "assassin",
+        "chief",
+        "diplomat",
+        "necromobile",
+        "reporter",
+    )
+)
+# std_value of each class code (a chief holding the central cell gets + 5)
+BASE_VALUES = np.array([1, 2, 5, 2, 3, 2], dtype=np.int64)
+MATERIAL = np.array([PIECE_VALUES[c] for c in PIECE_CLASSES], dtype=np.int64)
+NONE = 254  # Owner code of "no piece" in the gathered owner arrays
+
+
+class BatchEvaluator:
+    """Scores of a batch of positions with NumPy, one row per position.
+
+    A position is the bytes of a GameState buffer. The rays of every cell
+    are packed one after the other in step tables built from the Geometry;
+    scanning them for every piece gives the threat and protection edges of
+    the AttackGraph, then the material, central cell and threat terms of the
+    ScoreBoard are summed per player slot. ``evaluate`` returns the (batch,
+    slots) matrix of relative scores, equal to the relative_score of the
+    players after Board.update_all_scores (0 for the players out of the turn
+    order).
+    """
+
+    def __init__(self, layout, advanced_rules):
+        self.layout = layout
+        self.advanced_rules = advanced_rules
+        geometry = layout.geometry
+        nb_cells = layout.nb_cells
+        nb_steps = max(sum(len(steps) for _, steps in rays) for rays in geometry.rays)
+        # Per cell and step: cell reached, diagonal gate cells, index of the
+        # first step of the ray. Padding steps and missing gates point to an
+        # extra cell that stays empty.
+        self.ray_cells = np.full((nb_cells, nb_steps), nb_cells)
+        self.gate_cells = np.full((2, nb_cells, nb_steps), nb_cells)
+        self.ray_starts = np.tile(np.arange(nb_steps), (nb_cells, 1))
+        self.valid = np.zeros((nb_cells, nb_steps), dtype=bool)
+        # A militant goes 2 steps in the adjacent directions, 1 in diagonal
+        self.militant_valid = np.zeros((nb_cells, nb_steps), dtype=bool)
+        for cell, rays in enumerate(geometry.rays):
+            k = 0
+            for is_diagonal, steps in rays:
+                start = k
+                for s, (target, gate) in enumerate(steps):
+                    self.ray_cells[cell, k] = target
+                    self.ray_starts[cell, k] = start
+                    self.valid[cell, k] = True
+                    self.militant_valid[cell, k] = s < (1 if is_diagonal else 2)
+                    if gate is not None:
+                        self.gate_cells[:, cell, k] = gate
+                    k += 1
+
+    def as_array(self, states):
+        """(batch, state size) uint8 array of GameState buffers."""
+        if isinstance(states, np.ndarray):
+            return states.reshape(-1, self.layout.size)
+        return np.frombuffer(b"".join(states), dtype=np.uint8).reshape(
+            -1, self.layout.size
+        )
+
+    def evaluate(self, states):
+        """Relative scores (batch, slots) of the GameState buffers."""
+        return self.scores(states)[1]
+
+    def scores(self, states):
+        """Returns the (batch, slots) score and relative score matrices."""
+        layout = self.layout
+        buf = self.as_array(states)
+        batch = len(buf)
+        rows = np.arange(batch)[:, None]
+        nb_cells, nb_pieces, nb_slots = (
+            layout.nb_cells,
+            layout.nb_pieces,
+            layout.nb_slots,
+        )
+        center = layout.geometry.center
+
+        # Occupants (id + 1, 0 for empty) with the extra empty cell
+        occupants = np.zeros((batch, nb_cells + 1), dtype=np.uint8)
+        occupants[:, :nb_cells] = buf[:, :nb_cells]
+        cells = buf[:, layout.piece_cell : layout.piece_cell + nb_pieces]
+        classes = buf[:, layout.piece_class : layout.piece_class + nb_pieces]
+        owners = buf[:, layout.piece_owner : layout.piece_owner + nb_pieces]
+        # Owner of an occupant, NONE for an empty cell
+        occupant_owners = np.full((batch, nb_pieces + 1), NONE, dtype=np.uint8)
+        occupant_owners[:, 1:] = owners
+
+        pids = np.arange(nb_pieces)
+        alive = owners != DEAD
+        on_board = occupants[rows, cells] == pids + 1
+        movers = alive & on_board  # Dead pieces and the piece to place stay
+        chiefs = classes == CHIEF
+        central_chiefs = chiefs & alive & (occupants[:, center][:, None] == pids + 1)
+        values = BASE_VALUES[classes] + 5 * central_chiefs
+
+        # Scan of the rays of the pieces that can move: (movers, steps)
+        n, pid = np.nonzero(movers)
+        origin = cells[n, pid]
+        # Flat indices into the rows of occupants and occupant_owners
+        cell_base = (n * (nb_cells + 1))[:, None]
+        piece_base = (n * (nb_pieces + 1))[:, None]
+        occupants_flat, owners_flat = occupants.ravel(), occupant_owners.ravel()
+        ray = self.ray_cells[origin]
+        occupant = occupants_flat.take(cell_base + ray)
+        owner = owners_flat.take(piece_base + occupant)
+        me = owners[n, pid][:, None]
+        cls = classes[n, pid][:, None]
+        occupied = occupant > 0
+        valid = np.where(
+            cls == MILITANT, self.militant_valid[origin], self.valid[origin]
+        )
+        assassin = cls == ASSASSIN
+
+        if self.advanced_rules:
+            gates = [
+                occupants_flat.take(cell_base + self.gate_cells[i][origin])
+                for i in range(2)
+            ]
+            closed = (gates[0] > 0) & (gates[1] > 0)
+            # The assassin slips through a gate with an ally on one side
+            closed &= ~assassin | (
+                (owners_flat.take(piece_base + gates[0]) != me)
+                & (owners_flat.take(piece_base + gates[1]) != me)
+            )
+            # ...and walks through its allies
+            stop = closed | (occupied & ~(assassin & (owner == me)))
+        else:
+            closed = False
+            stop = occupied
+        # A step is reached when no earlier step of its ray stopped the scan
+        stops = np.zeros((len(n), ray.shape[1] + 1), dtype=np.int16)
+        np.cumsum(stop, axis=1, out=stops[:, 1:])
+        before = stops[:, :-1] > np.take_along_axis(
+            stops, self.ray_starts[origin], axis=1
+        )
+        reached = valid & ~before & ~closed
+
+        capturable = (owner != me) & (owner != DEAD)
+        capturable = np.where(cls == NECROMOBILE, owner == DEAD, capturable)
+        capturable = np.where(
+            cls == DIPLOMAT,
+            (owner != DEAD) & (self.advanced_rules | (owner != me)),
+            capturable,
+        )
+        targets = reached & occupied & capturable & (cls != REPORTER)
+        central_move = np.zeros((batch, nb_pieces), dtype=bool)
+        central_move[n, pid] = (
+            (cls == CHIEF) & reached & (ray == center) & (~occupied | targets)
+        ).any(axis=1)
+
+        # Threat and protection edges
+        mover, step = np.nonzero(targets)
+        n, attacker = n[mover], pid[mover]
+        target = occupant[mover, step].astype(np.int64) - 1
+        threat = owner[mover, step] != owners[n, attacker]
+        protections = np.bincount(
+            n[~threat] * nb_pieces + target[~threat], minlength=batch * nb_pieces
+        ).reshape(batch, nb_pieces)
+        protected = protections > 0
+        n, attacker, target = n[threat], attacker[threat], target[threat]
+        edge = np.maximum(
+            0,
+            values[n, target] - values[n, attacker] * protected[n, target],
+        )
+        threat_scores = np.bincount(
+            n * nb_pieces + attacker, weights=edge, minlength=batch * nb_pieces
+        ).reshape(batch, nb_pieces)
+        threatened = np.bincount(
+            n * nb_pieces + target, weights=edge, minlength=batch * nb_pieces
+        ).reshape(batch, nb_pieces)
+
+        nb_players = buf[:, layout.order_length][:, None].astype(np.int64)
+        threat_scores = (
+            threat_scores.astype(np.int64)
+            + central_move * 2 * values * (nb_players - 2)
+            - threatened.astype(np.int64) * values * (nb_players - 1)
+        )
+
+        # Totals per slot of the living pieces
+        index = (rows * nb_slots + np.where(alive, owners, 0))[alive]
+        material = np.bincount(
+            index, weights=MATERIAL[classes][alive], minlength=batch * nb_slots
+        ).reshape(batch, nb_slots)
+        threats = np.bincount(
+            index, weights=threat_scores[alive], minlength=batch * nb_slots
+        ).reshape(batch, nb_slots)
+        material = material.astype(np.int64)
+
+        # Turn order: a player appears twice per other player while central
+        order = buf[:, layout.order : layout.order + 2 * nb_slots]
+        in_order = np.arange(2 * nb_slots) < nb_players
+        counts = np.bincount(
+            (rows * nb_slots + order)[in_order], minlength=batch * nb_slots
+        ).reshape(batch, nb_slots)
+        playing = counts > 0
+        slot_chiefs = buf[:, layout.player_chief : layout.player_chief + nb_slots]
+        central = np.take_along_axis(central_chiefs, slot_chiefs, axis=1)
+
+        score = material + central * (material - PIECE_VALUES["chief"]) * (
+            nb_players - counts - 1
+        )
+        score = np.where(playing, score + threats.astype(np.int64), 0)
+        total = score.sum(axis=1, keepdims=True)
+        relative = np.where(
+            playing & (total != 0), score * 600 // np.where(total, total, 1), 0
+        )
+        return score, relative
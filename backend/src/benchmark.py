@@ -0,0 +1,555 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+from backend.src.board import Board
+from backend.src.mcts_player import MCTSPlayer
+from backend.src.minmax_player import ALGORITHMS
+from backend.src.parallel_search import (
+    get_executor,
+    search_root_moves,
+    shutdown_executors,
+)
+from backend.src.perft import legal_moves, perft
+
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import backend.src.board
+elapsed = time.perf_counter() - start
+print(elapsed, "pygame" in sys.modules, "cairosvg" in sys.modules)
+"""
+
+
+def bench_import(repeat):
+    """Measures the engine import time in fresh interpreters."""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        timings.append(float(output[0]))
+        if output[1] == "True" or output[2] == "True":
+            print("warning: the engine import pulled in pygame or cairosvg")
+    print(
+        f"import backend.src.board: best {min(timings) * 1000:.1f} ms, "
+        f"mean {sum(timings) / len(timings) * 1000:.1f} ms"
+    )
+
+
+def bench_board(nb_players, repeat):
+    """Measures the construction time of a new Board."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Board(nb_players)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Board({nb_players}): {elapsed / repeat * 1000:.2f} ms per board, "
+        f"{repeat / elapsed:.0f} boards/s"
+    )
+
+
+def play_random_plies(board, nb_plies):
+    """Plays random turns until nb_plies or the end of the game."""
+    played = 0
+    while played < nb_plies:
+        if len(board.players) < 2:
+            return played
+        board.players[board.current_player_index].play_turn(board)
+        board.next_player()
+        played += 1
+    return played
+
+
+def bench_history(nb_players, nb_plies, seed):
+    """Measures the history memory per 1,000 plies and the undo/redo latency."""
+    random.seed(seed)
+    board = Board(nb_players)
+    board.rl = True
+    played = play_random_plies(board, nb_plies)
+    history = board.history
+    per_thousand = history.memory_size() * 1000 / played
+    snapshots = (sys.getsizeof(bytes(board.state.buf)) + 8) * 1000  # Former list
+    print(
+        f"history {nb_players} players, {played} plies: "
+        f"{per_thousand / 1024:.1f} KiB per 1000 plies "
+        f"(full snapshots: {snapshots / 1024:.1f} KiB)"
+    )
+
+    start = time.perf_counter()
+    undone = 0
+    while board.undo() is not None:
+        undone += 1
+    undo_time = time.perf_counter() - start
+    start = time.perf_counter()
+    while board.redo() is not None:
+        pass
+    redo_time = time.perf_counter() - start
+    print(
+        f"  undo {undo_time / undone * 1e6:.0f} us, "
+        f"redo {redo_time / undone * 1e6:.0f} us per ply"
+    )
+
+
+def play_search_game(
+    nb_players, algorithms, depth, nb_plies, seed, quiescence_depths=None
+):
+    """Plays a game where the player of slot i searches with algorithms[i]
+    (and quiescence_depths[i] if given).
+
+    Returns the final relative score of each slot (0 once eliminated), the
+    number of searched nodes and the thinking time per slot, and the number
+    of plies played.
+    """
+    random.seed(seed)
+    board = Board(nb_players)
+    board.rl = True
+    for player, algorithm in zip(board.players_by_slot, algorithms):
+        player.algorithm = algorithm
+        player.depth = depth
+        if quiescence_depths is not None:
+            player.quiescence_depth = quiescence_depths[player.slot]
+    nodes = [0] * len(algorithms)
+    thinking = [0.0] * len(algorithms)
+    played = 0
+    for _ in range(nb_plies):
+        if len(board.players) < 2:
+            break
+        played += 1
+        player = board.players[board.current_player_index]
+        board.nodes = 0
+        start = time.perf_counter()
+        player.think_and_play_turn(board)
+        thinking[player.slot] += time.perf_counter() - start
+        nodes[player.slot] += board.nodes
+        board.next_player()
+    board.update_all_scores()
+    alive = {player.slot for player in board.players}
+    scores = [
+        player.relative_score if player.slot in alive else 0
+        for player in board.players_by_slot
+    ]
+    return scores, nodes, thinking, played
+
+
+def bench_search(nb_players, depth, nb_games, nb_plies, seed):
+    """Compares the search algorithms: nodes per second and game results.
+
+    Move quality is measured by games between paranoid and max^n bots on
+    alternate slots (swapped every other game): mean final relative score
+    and number of players still in the game at the end.
+    """
+    for algorithm in ALGORITHMS:
+        _, nodes, thinking, played = play_search_game(
+            nb_players, [algorithm] * nb_players, depth, nb_plies, seed
+        )
+        print(
+            f"search {nb_players} players, {algorithm} depth {depth}: "
+            f"{sum(nodes)} nodes, {sum(nodes) / sum(thinking):.0f} nodes/s, "
+            f"{sum(thinking) / max(1, played) * 1000:.0f} ms per ply"
+        )
+
+    contenders = ("paranoid", "maxn")
+    totals: dict[str, list[float]] = {algorithm: [] for algorithm in contenders}
+    for game in range(nb_games):
+        algorithms = [contenders[(slot + game) % 2] for slot in range(nb_players)]
+        scores, _, _, _ = play_search_game(
+            nb_players, algorithms, depth, nb_plies, seed + game
+        )
+        for algorithm, score in zip(algorithms, scores):
+            totals[algorithm].append(score)
+    for algorithm, scores in totals.items():
+        survivors = sum(1 for score in scores if score > 0)
+        print(
+            f"  {algorithm}: mean relative score {sum(scores) / len(scores):.1f}, "
+            f"{survivors}/{len(scores)} seats with a positive score"
+        )
+
+
+def bench_ordering(nb_players, algorithm, depth, nb_plies, seed):
+    """Compares the search with and without the move ordering heuristics."""
+    for ordering in (False, True):
+        random.seed(seed)
+        board = Board(nb_players)
+        board.rl = True
+        play_random_plies(board, 4)  # Leave the opening position
+        for player in board.players_by_slot:
+            player.algorithm = algorithm
+            player.depth = depth
+            player.move_ordering = ordering
+        board.nodes = 0
+        start = time.perf_counter()
+        for _ in range(nb_plies):
+            if len(board.players) < 2:
+                break
+            board.players[board.current_player_index].think_and_play_turn(board)
+            board.next_player()
+        elapsed = time.perf_counter() - start
+        if board.move_orderer is None:
+            continue  # The game ended before any search
+        stats = board.move_orderer.stats()
+        print(
+            f"ordering {nb_players} players, {algorithm} depth {depth}, "
+            f"{'heuristics' if ordering else 'generation order'}: "
+            f"{board.nodes} nodes in {elapsed:.1f} s, "
+            f"cutoffs at {stats['cutoff_rate']:.0%} of the nodes, "
+            f"{stats['first_move_rate']:.0%} of them by the first move"
+        )
+
+
+def bench_parallel(nb_players, algorithm, depth, max_workers, seed):
+    """Speedup of the parallel root search from 1 to max_workers processes.
+
+    Every run starts from fresh processes (warmed up without searching) and
+    fresh transposition tables.
+    """
+    random.seed(seed)
+    board = Board(nb_players)
+    board.rl = True
+    play_random_plies(board, 4)
+    player = board.players[board.current_player_index]
+    player.algorithm = algorithm
+
+    board.transposition_table = None
+    board.move_orderer = None
+    player.workers = 1
+    player.prepare_search(board)
+    start = time.perf_counter()
+    player.search(board, depth, board.transposition_table)
+    sequential = time.perf_counter() - start
+    print(
+        f"parallel {nb_players} players, {algorithm} depth {depth}: "
+        f"sequential {sequential:.2f} s"
+    )
+
+    state = bytes(board.state.buf)
+    for workers in range(1, max_workers + 1):
+        shutdown_executors()
+        executor = get_executor(workers)
+        player.workers = workers
+        warm_up = [
+            executor.submit(
+                search_root_moves,
+                nb_players,
+                state,
+                player.slot,
+                player.search_settings(),
+                depth,
+                [],
+                None,
+            )
+            for _ in range(workers)
+        ]
+        for future in warm_up:
+            future.result()
+        start = time.perf_counter()
+        player.parallel_search(board, depth)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {workers} workers: {elapsed:.2f} s, "
+            f"speedup {sequential / elapsed:.2f}"
+        )
+    shutdown_executors()
+
+
+def bench_movegen(nb_players, depth, nb_plies, seed):
+    """Move generation alone: legal moves per second on the positions of a
+    random game (placements included), then perft nodes per second."""
+    random.seed(seed)
+    board = Board(nb_players)
+    board.rl = True
+    states = []
+    for _ in range(nb_plies):
+        if len(board.players) < 2:
+            break
+        states.append(bytes(board.state.buf))
+        board.players[board.current_player_index].play_turn(board)
+        board.next_player()
+
+    generated = 0
+    elapsed = 0.0
+    for state in states:
+        board.load_state(state)
+        start = time.perf_counter()
+        for pid in range(len(board.pieces)):
+            board.attacks.update_piece(pid)  # Rescan every piece, no cache
+        generated += len(legal_moves(board))
+        elapsed += time.perf_counter() - start
+    print(
+        f"movegen {nb_players} players, {len(states)} positions: "
+        f"{generated / elapsed:.0f} legal moves/s"
+    )
+
+    board.load_state(states[0])
+    start = time.perf_counter()
+    nodes = perft(board, depth)
+    elapsed = time.perf_counter() - start
+    print(
+        f"  perft({depth}) of the opening: {nodes} nodes, "
+        f"{nodes / elapsed:.0f} nodes/s"
+    )
+
+
+def bench_eval(nb_players, nb_plies, batch_sizes, seed):
+    """Per-position cost of the evaluation: running ScoreBoard update after
+    make_move, full recompute from the state bytes, BatchEvaluator batches."""
+    from backend.src.batch_eval import BatchEvaluator  # Imports numpy
+
+    random.seed(seed)
+    board = Board(nb_players)
+    board.rl = True
+    states, moves = [], []
+    for _ in range(nb_plies):
+        if len(board.players) < 2:
+            break
+        states.append(bytes(board.state.buf))
+        moves.append(
+            board.players[board.current_player_index].get_all_valid_moves(board)
+        )
+        board.players[board.current_player_index].play_turn(board)
+        board.next_player()
+
+    # Score update after each child, timed alone: make/unmake are not included
+    elapsed, leaves = 0.0, 0
+    for state, children in zip(states, moves):
+        board.load_state(state)
+        for move in children:
+            record = board.make_move(move)
+            start = time.perf_counter()
+            board.update_all_scores()
+            elapsed += time.perf_counter() - start
+            board.unmake_move(record)
+        leaves += len(children)
+    incremental = elapsed / leaves
+
+    start = time.perf_counter()
+    for state in states:
+        board.state.buf[:] = state
+        board.state.dirty_cells.update(range(board.state.layout.nb_cells))
+        board.update_all_scores()
+    full = (time.perf_counter() - start) / len(states)
+
+    evaluator = BatchEvaluator(board.state.layout, board.advanced_rules)
+    batched = []
+    for batch_size in batch_sizes:
+        batches = [
+            states[i : i + batch_size] for i in range(0, len(states), batch_size)
+        ]
+        start = time.perf_counter()
+        for batch in batches:
+            evaluator.evaluate(batch)
+        batched.append((time.perf_counter() - start) / len(states))
+    print(
+        f"eval {nb_players} players, {len(states)} positions: "
+        f"incremental {incremental * 1e6:.0f} us, "
+        f"full recompute {full * 1e6:.0f} us, "
+        + ", ".join(
+            f"batch of {size} {elapsed * 1e6:.0f} us"
+            for size, elapsed in zip(batch_sizes, batched)
+        )
+        + " per position"
+    )
+
+
+def bench_mcts(nb_players, iterations, rollout_depth, nb_plies, seed):
+    """Playouts per second of MCTS bots playing each other."""
+    random.seed(seed)
+    board = Board(nb_players)
+    board.rl = True
+    bots = [
+        MCTSPlayer(board, slot, iterations=iterations, rollout_depth=rollout_depth)
+        for slot in range(len(board.players_by_slot))
+    ]
+    seats: list = board.players_by_slot  # Any Player can take a seat
+    seats[:] = bots
+    thinking = 0.0
+    reused = 0
+    played = 0
+    for _ in range(nb_plies):
+        if len(board.players) < 2:
+            break
+        player = board.players[board.current_player_index]
+        start = time.perf_counter()
+        player.think_and_play_turn(board)
+        thinking += time.perf_counter() - start
+        reused += player.reused_visits
+        board.next_player()
+        played += 1
+    playouts = sum(bot.playouts for bot in bots)
+    print(
+        f"mcts {nb_players} players, {iterations} iterations, rollouts of "
+        f"{rollout_depth} plies: {playouts / thinking:.0f} playouts/s, "
+        f"{thinking / max(1, played) * 1000:.0f} ms per ply, "
+        f"{reused / max(1, played):.1f} visits reused per turn"
+    )
+
+
+def bench_quiescence(nb_players, algorithm, depth, nb_games, nb_plies, seed):
+    """Games between bots with and without quiescence search at the same
+    depth, on alternate slots: nodes per move and mean final score."""
+    contenders = (4, 0)  # Quiescence depths
+    scores: dict[int, list[float]] = {q: [] for q in contenders}
+    nodes = {q: 0 for q in contenders}
+    moves = {q: 0 for q in contenders}
+    for game in range(nb_games):
+        depths = [contenders[(slot + game) % 2] for slot in range(nb_players)]
+        game_scores, game_nodes, _, played = play_search_game(
+            nb_players, [algorithm] * nb_players, depth, nb_plies, seed + game, depths
+        )
+        for slot, q in enumerate(depths):
+            scores[q].append(game_scores[slot])
+            nodes[q] += game_nodes[slot]
+        for ply in range(played):
+            moves[depths[ply % nb_players]] += 1  # Approximate: turn order
+    for q in contenders:
+        label = f"quiescence {q}" if q else "no quiescence"
+        print(
+            f"quiescence {nb_players} players, {algorithm} depth {depth}, {label}: "
+            f"{nodes[q] / max(1, moves[q]):.0f} nodes per move, "
+            f"mean relative score {sum(scores[q]) / len(scores[q]):.1f}"
+        )
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks of the rules engine.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Engine import time")
+    import_parser.add_argument("--repeat", type=int, default=5)
+
+    board_parser = subparsers.add_parser("board", help="Board construction time")
+    board_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4, 6]
+    )
+    board_parser.add_argument("--repeat", type=int, default=200)
+
+    history_parser = subparsers.add_parser("history", help="Undo/redo history")
+    history_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4, 6]
+    )
+    history_parser.add_argument("--plies", type=int, default=1000)
+    history_parser.add_argument("--seed", type=int, default=0)
+
+    search_parser = subparsers.add_parser("search", help="Search algorithms")
+    search_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4, 6]
+    )
+    search_parser.add_argument("--depth", type=int, default=2)
+    search_parser.add_argument("--games", type=int, default=4)
+    search_parser.add_argument("--plies", type=int, default=30)
+    search_parser.add_argument("--seed", type=int, default=0)
+
+    ordering_parser = subparsers.add_parser("ordering", help="Move ordering")
+    ordering_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4]
+    )
+    ordering_parser.add_argument(
+        "--algorithm", choices=ALGORITHMS, nargs="+", default=["negamax", "paranoid"]
+    )
+    ordering_parser.add_argument("--depth", type=int, default=2)
+    ordering_parser.add_argument("--plies", type=int, default=3)
+    ordering_parser.add_argument("--seed", type=int, default=0)
+
+    parallel_parser = subparsers.add_parser("parallel", help="Parallel root search")
+    parallel_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[4]
+    )
+    parallel_parser.add_argument("--algorithm", choices=ALGORITHMS, default="negamax")
+    parallel_parser.add_argument("--depth", type=int, default=3)
+    parallel_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parallel_parser.add_argument("--seed", type=int, default=0)
+
+    quiescence_parser = subparsers.add_parser("quiescence", help="Quiescence")
+    quiescence_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4]
+    )
+    quiescence_parser.add_argument(
+        "--algorithm", choices=ALGORITHMS[:2], default="paranoid"
+    )
+    quiescence_parser.add_argument("--depth", type=int, default=1)
+    quiescence_parser.add_argument("--games", type=int, default=4)
+    quiescence_parser.add_argument("--plies", type=int, default=30)
+    quiescence_parser.add_argument("--seed", type=int, default=0)
+
+    movegen_parser = subparsers.add_parser("movegen", help="Move generation")
+    movegen_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4, 6]
+    )
+    movegen_parser.add_argument("--depth", type=int, default=2)
+    movegen_parser.add_argument("--plies", type=int, default=100)
+    movegen_parser.add_argument("--seed", type=int, default=0)
+
+    eval_parser = subparsers.add_parser("eval", help="Batched NumPy evaluation")
+    eval_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4, 6]
+    )
+    eval_parser.add_argument("--plies", type=int, default=100)
+    eval_parser.add_argument(
+        "--batch_size", type=int, nargs="+", default=[1, 16, 64, 256]
+    )
+    eval_parser.add_argument("--seed", type=int, default=0)
+
+    mcts_parser = subparsers.add_parser("mcts", help="MCTS playouts")
+    mcts_parser.add_argument(
+        "--nb_player_mode", type=int, choices=[3, 4, 6], nargs="+", default=[3, 4, 6]
+    )
+    mcts_parser.add_argument("--iterations", type=int, default=100)
+    mcts_parser.add_argument("--rollout_depth", type=int, default=8)
+    mcts_parser.add_argument("--plies", type=int, default=6)
+    mcts_parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.command == "import":
+        bench_import(args.repeat)
+    elif args.command == "board":
+        for nb_players in args.nb_player_mode:
+            bench_board(nb_players, args.repeat)
+    elif args.command == "history":
+        for nb_players in args.nb_player_mode:
+            bench_history(nb_players, args.plies, args.seed)
+    elif args.command == "search":
+        for nb_players in args.nb_player_mode:
+            bench_search(nb_players, args.depth, args.games, args.plies, args.seed)
+    elif args.command == "ordering":
+        for nb_players in args.nb_player_mode:
+            for algorithm in args.algorithm:
+                bench_ordering(nb_players, algorithm, args.depth, args.plies, args.seed)
+    elif args.command == "parallel":
+        for nb_players in args.nb_player_mode:
+            bench_parallel(
+                nb_players, args.algorithm, args.depth, args.workers, args.seed
+            )
+    elif args.command == "quiescence":
+        for nb_players in args.nb_player_mode:
+            bench_quiescence(
+                nb_players,
+                args.algorithm,
+                args.depth,
+                args.games,
+                args.plies,
+                args.seed,
+            )
+    elif args.command == "movegen":
+        for nb_players in args.nb_player_mode:
+            bench_movegen(nb_players, args.depth, args.plies, args.seed)
+    elif args.command == "eval":
+        for nb_players in args.nb_player_mode:
+            bench_eval(nb_players, args.plies, args.batch_size, args.seed)
+    elif args.command == "mcts":
+        for nb_players in args.nb_player_mode:
+            bench_mcts(
+                nb_players, args.iterations, args.rollout_depth, args.plies, args.seed
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,91 +1,124 @@
 import logging
 import math
 
-import pygame
-
-from backend.src.animation import animate_player_elimination, draw_player_turn
+from backend.src.attacks import AttackGraph
 from backend.src.constants import *
+from backend.src.geometry import find_adjacent_vectors, get_geometry
+from backend.src.history import History
 from backend.src.minmax_player import MinMaxPlayer
 from backend.src.pieces import *
-from backend.src.utils import get_colors, get_directions, get_start_positions
+from backend.src.scores import ScoreBoard
+from backend.src.state import PIECE_CLASSES, new_game_state
+from backend.src.utils import get_colors, get_start_positions
+
+
+class UndoRecord:
+    """What Board.unmake_move needs to take back one make_move."""
+
+    __slots__ = ("writes", "key", "nb_eliminated", "scores")
+
+    def __init__(self, key, nb_eliminated, scores):
+        self.writes = []  # (offset, old byte) of every state write
+        self.key = key  # Zobrist key before the move
+        self.nb_eliminated = nb_eliminated
+        self.scores = scores  # (score, relative_score, threat_score) per slot
 
 
 class Board:
+    # Verify the cell index at every end of turn (slow, meant for tests).
+    debug_checks = DEBUG_CHECKS
+    nodes = 0  # Number of make_move calls, for the search statistics
+
     def __init__(self, nb_players, current_player_index=0, one_player_mode=False):
-        self.hexagons = []
-        self.pieces = []
         self.nb_players = nb_players
         self.eliminated_players = []
-        self.current_player_index = current_player_index
         self.one_player_mode = one_player_mode
         logging.debug("Initializing the board")
+        self.init_rules()
 
-        if self.nb_players in [3, 4]:
-            self.board_size = 5
-            self.advanced_rules = False
-        elif self.nb_players == 6:
-            self.board_size = 7
-            self.advanced_rules = True
-        else:
-            raise ValueError("Nombre de joueurs invalide. Veuillez choisir 3, 4 ou 6.")
-
-        self.directions = get_directions(self.nb_players)
-        self.colors, self.color_reverse, self.names = get_colors(self.nb_players)
-        self.start_positions = get_start_positions(self.nb_players)
-
-        # Initialize the board hexagons
-        for q in range(-self.board_size + 1, self.board_size):
-            for r in range(-self.board_size + 1, self.board_size):
-                if (
-                    -q - r in range(-self.board_size + 1, self.board_size)
-                    or self.nb_players == 4
-                ):
-                    self.hexagons.append((q, r))
+        # The whole position (pieces, players, turn) lives in one buffer
+        self.state = new_game_state(
+            self.geometry, self.colors, self.start_positions, current_player_index
+        )
 
         # Add pieces to starting positions
         self.initialize_pieces()
+        self.update_all_scores()
+        self.update_all_opportunity_scores()
         self.rl = False
-        self.history = []
-        self.future = []
-        self.piece_to_place = None  # Killed piece to be placed manually
+        self.history = History(self.state)  # Undo/redo, one entry per turn
         self.available_cells = []  # Available cells to place the killed piece
-        self.board_surface = self.create_board_surface()
-        self.hex_pixel_positions = self.calculate_hex_pixel_positions()
-        self.save_state(self.current_player_index)
-
-    def create_board_surface(self):
-        board_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        board_surface.fill(BLACK)
-        for hex_coord in self.hexagons:
-            q, r = hex_coord
-            x, y = self.hex_to_pixel(q, r)
-            pygame.draw.polygon(board_surface, WHITE, self.hex_corners(x, y), 1)
-            if q == 0 and r == 0:
-                pygame.draw.polygon(
-                    board_surface, CENTRAL_WHITE, self.hex_corners(x, y), 0
-                )
-            else:
-                pygame.draw.polygon(board_surface, WHITE, self.hex_corners(x, y), 1)
-        return board_surface
+        self.transposition_table = None  # Search results of the MinMax bots
+        self.move_orderer = None  # Killer moves and history of the MinMax bots
+        self.batch_evaluator = None  # NumPy leaf scores of the MinMax bots
+        self.renderer = None  # Display attached by the pygame client
+
+    def init_rules(self):
+        """Sets the attributes that only depend on the number of players."""
+        self.geometry = get_geometry(self.nb_players)
+        self.board_size = self.geometry.board_size
+        self.advanced_rules = self.nb_players == 6
+
+        self.directions = self.geometry.directions
+        self.colors, self.color_reverse, self.names = get_colors(self.nb_players)
+        self.start_positions = get_start_positions(self.nb_players)
 
-    def calculate_hex_pixel_positions(self):
-        positions = {}
-        for q, r in self.hexagons:
-            x, y = self.hex_to_pixel(q, r)
-            positions[(q, r)] = (x, y)
-        return positions
+        # Initialize the board hexagons
+        self.hexagons = list(self.geometry.cells)
+
+    def copy(self):
+        """Returns a display-less board on a copy of the state, for the bots."""
+        board = object.__new__(type(self))
+        board.nb_players = self.nb_players
+        board.eliminated_players = list(self.eliminated_players)
+        board.one_player_mode = self.one_player_mode
+        board.init_rules()
+        board.state = self.state.copy()
+        board.initialize_pieces()
+        board.rl = True
+        board.history = History(board.state)
+        board.available_cells = list(self.available_cells)
+        board.transposition_table = None
+        board.move_orderer = None
+        board.batch_evaluator = None
+        board.renderer = None
+        return board
+
+    @property
+    def players(self):
+        """Players in turn order, a player may appear several times."""
+        return [self.players_by_slot[slot] for slot in self.state.turn_order()]
+
+    @players.setter
+    def players(self, players):
+        self.state.set_turn_order([player.slot for player in players])
+
+    @property
+    def zobrist_key(self):
+        """64-bit key of the position, updated at every state write."""
+        return self.state.key
+
+    @property
+    def current_player_index(self):
+        return self.state.current_player_index
+
+    @current_player_index.setter
+    def current_player_index(self, index):
+        self.state.current_player_index = index
+
+    @property
+    def piece_to_place(self):
+        """Killed piece to be placed manually."""
+        pid = self.state.piece_to_place
+        return None if pid is None else self.pieces[pid]
+
+    @piece_to_place.setter
+    def piece_to_place(self, piece):
+        self.state.piece_to_place = None if piece is None else piece.pid
 
     def is_within_board(self, q, r):
         """Checks if the coordinates q, r are within the board limits."""
-        if self.nb_players in [3, 6]:
-            s = -q - r  # Coordonnée s dans un système hexagonal
-            return (
-                abs(q) < self.board_size
-                and abs(r) < self.board_size
-                and abs(s) < self.board_size
-            )
-        elif self.nb_players == 4:
-            return abs(q) < self.board_size and abs(r) < self.board_size
+        return (q, r) in self.geometry.cell_set
 
     def hex_to_pixel(self, q, r):
         if self.nb_players in [3, 6]:
@@ -102,12 +135,7 @@ class Board:
         return pixel_coords
 
     def find_adjacent_vectors(self, dq, dr):
-        for v1 in self.directions["adjacent"]:
-            for v2 in self.directions["adjacent"]:
-                if v1 != v2:  # Check that v1 and v2 are different
-                    if (v1[0] + v2[0] == dq) and (v1[1] + v2[1] == dr):
-                        return v1, v2  # Returns the found vectors
-        return None
+        return find_adjacent_vectors(self.directions, dq, dr)
 
     def initialize_pieces(self):
         # Starting positions of the pieces (arbitrary example)
@@ -121,119 +149,94 @@ class Board:
             "necromobile": ASSET_PATH + "necromobile.svg",
             "reporter": ASSET_PATH + "reporter.svg",
         }
-        self.players = []
-        for color in self.colors.keys():
-            pieces = [
-                create_piece(q, r, self.colors[color], cl, class_svg_paths[cl])
-                for q, r, c, cl in self.start_positions
-                if c == color
-            ]
-            self.players.append(MinMaxPlayer(self.colors[color], pieces))
-            self.pieces.extend(pieces)
-        self.update_all_scores()
-        self.update_all_opportunity_scores()
+        # Views on the state: self.pieces[pid] is the piece with id pid
+        self.pieces = [
+            create_piece(
+                self.state,
+                pid,
+                class_svg_paths[PIECE_CLASSES[self.state.piece_class(pid)]],
+            )
+            for pid in range(self.state.layout.nb_pieces)
+        ]
+        self.players_by_slot = [
+            MinMaxPlayer(self, slot) for slot in range(self.state.layout.nb_slots)
+        ]
+        self.attacks = AttackGraph(self)
+        self.scores = ScoreBoard(self)
 
     def save_state(self, current_player_index):
-        state = {
-            "pieces": [
-                (p.q, p.r, p.color, p.piece_class, p.svg_path, p.is_dead)
-                for p in self.pieces
-            ],
-            "players": [
-                {"color": p.color, "pieces": [piece.piece_class for piece in p.pieces]}
-                for p in self.players
-                if p is not None
-            ],
-            "current_player_index": current_player_index,
-            "players_colors_order": [
-                p.color for p in self.players
-            ],  # probably something to do with this.
-        }
-        self.history.append(state)
-        self.future.clear()
+        self.current_player_index = current_player_index
+        self.history.push()
 
     def load_state(self, state):
-        self.pieces = [
-            create_piece(q, r, color, piece_class, svg_path)
-            for q, r, color, piece_class, svg_path, is_dead in state["pieces"]
-        ]
-        for piece, (_, _, _, _, _, is_dead) in zip(self.pieces, state["pieces"]):
-            piece.is_dead = is_dead
-            if piece.q == 0 and piece.r == 0:
-                piece.on_central_cell = True
-            else:
-                piece.on_central_cell = False
-        self.players = []
-        for player_data in state["players"]:
-            player_pieces = [
-                piece for piece in self.pieces if piece.color == player_data["color"]
-            ]
-            self.players.append(MinMaxPlayer(player_data["color"], player_pieces))
+        self.state.buf[:] = state  # The piece and player views stay valid
+        self.state.key = self.state.compute_key()
+        self.state.dirty_cells.update(range(self.state.layout.nb_cells))
+        return self.after_history_move()
+
+    def after_history_move(self):
+        self.update_all_opportunity_scores()
         self.update_all_scores()
-        return state["current_player_index"]
+        return self.current_player_index
 
     def undo(self):
-        if len(self.history) > 1:  # Make sure at least one state remains after undoing
-            self.future.append(self.history.pop())
-            previous_state = self.history[-1]
-            return self.load_state(previous_state)
+        # At least one state remains after undoing
+        if self.history.undo():
+            return self.after_history_move()
         return None
 
     def redo(self):
-        if self.future:
-            next_state = self.future.pop()
-            self.history.append(next_state)
-            return self.load_state(next_state)
+        if self.history.redo():
+            return self.after_history_move()
         return None
 
+    def set_piece_position(self, piece, q, r):
+        """Moves a piece to (q, r), keeping the cell index up to date."""
+        self.state.move_piece(piece.pid, self.geometry.index[(q, r)])
+
+    def lift_piece(self, piece):
+        """Removes a piece from its cell while it waits to be placed."""
+        self.state.lift_piece(piece.pid)
+
+    def check_piece_index(self):
+        """Debug check: the cells must match the pieces positions."""
+        self.state.check()
+
     def get_piece_at(self, q, r):
         """Returns the piece at position (q, r) if it exists, otherwise None."""
-        for piece in self.pieces:
-            if piece.q == q and piece.r == r:
-                return piece
-        return None
+        cell = self.geometry.index.get((q, r))
+        return None if cell is None else self.get_piece_at_cell(cell)
+
+    def get_piece_at_cell(self, cell):
+        """Returns the piece on the numbered cell if it exists, otherwise None."""
+        occupant = self.state.buf[cell]
+        return self.pieces[occupant - 1] if occupant else None
 
     def is_occupied(self, q, r):
         """Checks if a cell is already occupied by a piece."""
-        for piece in self.pieces:
-            if piece.q == q and piece.r == r:
-                return True
-        return False
+        cell = self.geometry.index.get((q, r))
+        return cell is not None and self.state.buf[cell] != 0
 
     def get_unoccupied_cells(self):
         """Returns all unoccupied cells that are not the central cell."""
-        unoccupied_cells = []
-        for q in range(-self.board_size + 1, self.board_size):
-            for r in range(-self.board_size + 1, self.board_size):
-                # Check if the cell is on the board
-                if self.is_within_board(q, r):
-                    # Exclude the central cell and occupied cells
-                    if (q != 0 or r != 0) and not self.is_occupied(q, r):
-                        unoccupied_cells.append((q, r))
-        return unoccupied_cells
+        buf, center = self.state.buf, self.geometry.center
+        return [
+            coords
+            for cell, coords in enumerate(self.geometry.cells)
+            if cell != center and not buf[cell]
+        ]
 
     def get_chief_of_color(self, color):
-        for piece in self.pieces:
-            if isinstance(piece, ChiefPiece) and piece.color == color:
-                return piece
-        return None
+        if color not in self.state.layout.colors:
+            return None
+        slot = self.state.layout.colors.index(color)
+        chief = self.pieces[self.state.player_chief(slot)]
+        return None if chief.is_dead else chief
 
     def chief_killed(self, killed_chief, killer_chief):
-        killed_player = next(
-            (player for player in self.players if player.color == killed_chief.color),
-            None,
-        )
+        killed_player = self.get_player_of_color(killed_chief.color)
         killer_player = (
-            next(
-                (
-                    player
-                    for player in self.players
-                    if player.color == killer_chief.color
-                ),
-                None,
-            )
-            if killer_chief
-            else None
+            self.get_player_of_color(killer_chief.color) if killer_chief else None
         )
 
         if killed_player is None:
@@ -244,29 +247,22 @@ class Board:
 
         self.eliminated_players.append(killed_player)
         # Change the color of all pieces of the killed player
+        # (transferring them to the player who killed the chief, if there is one)
         for piece in killed_player.pieces:
             if killer_player:
-                piece.color = killer_player.color
-                piece.name = self.names[killer_player.color]
-                piece.load_image()
+                killer_player.add_piece(piece)
             else:
                 piece.die()  # If no specific killer, the pieces simply die
-
-        # Transfer all pieces to the player who killed the chief, if there is one
-        if killer_player:
-            killer_player.pieces.extend(killed_player.pieces)
+        self.state.set_alive(killed_player.slot, False)
 
         # Remove all occurrences of the killed player
-        while killed_player in self.players:
-            killed_player_index = self.players.index(killed_player)
-            if not self.rl:
-                animate_player_elimination(
-                    pygame.display.get_surface(),
-                    self.players,
-                    killed_player_index,
-                    self,
-                )
-            self.players.pop(killed_player_index)
+        players = self.players
+        while killed_player in players:
+            killed_player_index = players.index(killed_player)
+            if self.renderer is not None and not self.rl:
+                self.renderer.animate_player_elimination(players, killed_player_index)
+            players.pop(killed_player_index)
+        self.players = players
 
         logging.debug(
             f"Chief {killed_chief.name} has been killed{'.' if not killer_chief else f' by chief {killer_chief.name}.'} All their pieces are now {'dead' if not killer_chief else f'controlled by {killer_chief.name}'}."
@@ -276,32 +272,6 @@ class Board:
         if self.current_player_index >= len(self.players):
             self.current_player_index = -1
 
-    def draw(self, screen, selected_piece=None, piece_to_place=None):
-        if self.rl:
-            return
-        for hex_coord in self.hexagons:
-            x, y = self.hex_pixel_positions[hex_coord]
-            q, r = hex_coord
-            pygame.draw.polygon(screen, WHITE, self.hex_corners(x, y), 1)
-
-            if q == 0 and r == 0:
-                pygame.draw.polygon(
-                    screen, CENTRAL_WHITE, self.hex_corners(x, y), 0
-                )  # Full fill
-            else:
-                pygame.draw.polygon(
-                    screen, WHITE, self.hex_corners(x, y), 1
-                )  # Only the outline
-
-        self.current_player_color = self.players[self.current_player_index].color
-        for piece in self.pieces:
-            is_current_player = (
-                piece.color == self.current_player_color
-                and selected_piece is None
-                and piece_to_place is None
-            )
-            piece.draw(self, screen, is_current_player)
-
     def hex_corners(self, x, y):
         """Returns the hexagon corners based on its pixel position."""
         corners = []
@@ -326,8 +296,7 @@ class Board:
         return corners
 
     def update_all_opportunity_scores(self):
-        for p in self.pieces:
-            p.update_threat_and_protections(self)
+        self.attacks.refresh()
         for p in self.pieces:
             p.update_piece_best_moves(self)
             p.evaluate_threat_score(self)
@@ -341,14 +310,57 @@ class Board:
 
     def get_possible_moves(self, piece):
         """Returns possible moves for a piece."""
-        return piece.all_possible_moves(self)
+        return self.attacks.refresh().moves[piece.pid]
 
     def next_player(self):
         """Moves to the next player and performs necessary checks."""
+        self.end_turn()
+        self.save_state(self.current_player_index)
+
+    def end_turn(self):
+        """Checks the surrounded chiefs, updates the scores and passes the turn."""
+        if self.debug_checks:
+            self.check_piece_index()
         self.check_surrounded_chiefs()
         self.update_all_scores()
-        self.current_player_index = (self.current_player_index + 1) % len(self.players)
-        self.save_state(self.current_player_index)
+        players = self.players
+        if players:  # Nobody left to play when the last chiefs died together
+            self.current_player_index = (self.current_player_index + 1) % len(players)
+
+    def make_move(self, move):
+        """Plays a whole turn in place, for the search: no animation, no history.
+
+        move is (piece, (q, r)) or (piece, (q, r), (q, r) of the displaced
+        piece); without a placement a displaced piece goes to a random free
+        cell, as for the bots. Returns the UndoRecord for unmake_move.
+        """
+        piece, (new_q, new_r), *placement = move
+        self.nodes += 1
+        record = UndoRecord(
+            self.state.key,
+            len(self.eliminated_players),
+            [(p.score, p.relative_score, p.threat_score) for p in self.players_by_slot],
+        )
+        rl, self.rl = self.rl, True
+        self.state.journal = record.writes
+        try:
+            if not piece.move(new_q, new_r, self, *placement):
+                self.state.undo(record.writes, record.key)
+                raise ValueError(
+                    f"Illegal move: {piece.piece_class} {piece.name} to {new_q},{new_r}"
+                )
+            self.end_turn()
+        finally:
+            self.state.journal = None
+            self.rl = rl
+        return record
+
+    def unmake_move(self, record):
+        """Takes back the make_move that returned record."""
+        self.state.undo(record.writes, record.key)
+        del self.eliminated_players[record.nb_eliminated :]
+        for player, scores in zip(self.players_by_slot, record.scores):
+            player.score, player.relative_score, player.threat_score = scores
 
     def move_piece(self, piece, new_q, new_r):
         """Moves a piece to a new position."""
@@ -371,9 +383,12 @@ class Board:
                             f"Chief {target_piece.name} has been killed by the {piece.piece_class} {piece.name}."
                         )
 
-                    if target_piece.on_central_cell and isinstance(piece, ChiefPiece):
+                    if (new_q, new_r) == CENTRAL_CELL and isinstance(piece, ChiefPiece):
                         piece.enter_central_cell(self)
                         logging.debug(f"Chief {piece.name} enters the central cell.")
+                    elif isinstance(piece, ChiefPiece) and piece.on_central_cell:
+                        piece.leave_central_cell(self)
+                        logging.debug(f"Chief {piece.name} leaves the central cell.")
 
                     target_piece.die()
                     logging.debug(
@@ -398,15 +413,9 @@ class Board:
                     (original_q, original_r)
                 ]  # Get available cells
                 # Move the piece that killed to the target's position
-                self.animate_move(
-                    pygame.display.get_surface(),
-                    piece,
-                    original_q,
-                    original_r,
-                    new_q,
-                    new_r,
-                )
-                piece.q, piece.r = new_q, new_r
+                self.animate_move(piece, original_q, original_r, new_q, new_r)
+                self.lift_piece(target_piece)
+                self.set_piece_position(piece, new_q, new_r)
             else:
                 piece.move(new_q, new_r, self)
                 self.next_player()
@@ -429,22 +438,14 @@ class Board:
     def place_dead_piece(self, new_q, new_r):
         """Places a dead piece at a new position."""
         if self.piece_to_place and (new_q, new_r) in self.available_cells:
-            self.piece_to_place.q = new_q
-            self.piece_to_place.r = new_r
+            piece = self.piece_to_place
             self.piece_to_place = None
+            self.set_piece_position(piece, new_q, new_r)
             self.available_cells = []
             self.next_player()
             return True
         return False
 
-    def draw_available_cells(self, screen):
-        """Draws available cells to place the killed piece."""
-        if self.rl:
-            return
-        for q, r in self.available_cells:
-            x, y = self.hex_to_pixel(q, r)
-            pygame.draw.circle(screen, GREY, (int(x), int(y)), 10)
-
     def pixel_to_hex(self, x, y):
         """Converts pixel coordinates to hexagonal coordinates."""
 
@@ -468,14 +469,6 @@ class Board:
             r = y
             return round(q), round(r)
 
-    def draw_possible_moves(self, screen, possible_moves):
-        """Draws possible moves on the screen."""
-        if self.rl:
-            return
-        for q, r in possible_moves:
-            x, y = self.hex_to_pixel(q, r)
-            pygame.draw.circle(screen, (100, 100, 100), (int(x), int(y)), 10)
-
     def get_player_of_color(self, color):
         """Returns the player corresponding to the given color."""
         for player in self.players:
@@ -483,59 +476,12 @@ class Board:
                 return player
         return None  # Returns None if no player matches the color
 
-    def animate_move(self, screen, piece, start_q, start_r, end_q, end_r):
-        if self.rl:
-            return
-        frames = 30  # Number of frames for animation
-        logging.debug(
-            f"Move animation of {piece.piece_class} {piece.name} from {start_q},{start_r} to {end_q},{end_r}"
-        )
-
-        original_q, original_r = piece.q, piece.r  # Save the original position
-        current_player_index = self.current_player_index
-        next_player_index = (current_player_index + 1) % len(self.players)
-
-        for i in range(frames + 1):
-            t = i / frames
-            current_q = start_q + (end_q - start_q) * t
-            current_r = start_r + (end_r - start_r) * t
-
-            # Temporarily update the piece position
-            piece.q, piece.r = current_q, current_r
-
-            # Redraw the complete board
-            screen.fill(BLACK)
-            self.draw(screen)
-
-            # Draw the moving piece on top
-            x, y = self.hex_to_pixel(current_q, current_r)
-            pygame.draw.circle(screen, piece.color, (int(x), int(y)), PIECE_RADIUS)
-            if piece.class_image:
-                class_image_rect = piece.class_image.get_rect(center=(int(x), int(y)))
-                screen.blit(piece.class_image, class_image_rect)
-
-            # Draw the player order with arrow animation
-            draw_player_turn(
-                screen, self.players, current_player_index, next_player_index, t
-            )
-
-            pygame.display.flip()
-            pygame.time.wait(5)  # Wait 5ms between each frame
-
-        # Put the piece back to its final position
-        piece.q, piece.r = end_q, end_r
-
-        # Redraw one last time to ensure everything is up to date
-        screen.fill(BLACK)
-        self.draw(screen)
-        draw_player_turn(screen, self.players, next_player_index)
-        pygame.display.flip()
+    def animate_move(self, piece, start_q, start_r, end_q, end_r):
+        if self.renderer is not None and not self.rl:
+            self.renderer.animate_move(piece, start_q, start_r, end_q, end_r)
 
     def update_all_scores(self):
-        for player in self.players:
-            player.compute_score(self)
-        for player in self.players:
-            player.compute_relative_score(self)
+        self.scores.update()
 
     def handle_client_move(
         self, player_color, selected_pos, destination_pos, captured_piece_pos=None
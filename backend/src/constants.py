@@ -18,4 +18,21 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Go up one level and access the assets folder
 ASSET_PATH = os.path.join(os.path.dirname(CURRENT_DIR), "assets/")
 IS_PRODUCTION = os.environ.get("ENVIRONMENT") == "production"
+# Rasterized piece images, shared by every run
+SPRITE_CACHE_DIR = os.environ.get(
+    "DJAMBI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "djambi")
+)
+# Run the (slow) board consistency checks (GameState.check) at the end of every
+# turn, in Board.end_turn: the moves and captures in between are not checked
+DEBUG_CHECKS = os.environ.get("DJAMBI_DEBUG_CHECKS") == "1"
 HIGHLIGHT_WIDTH = 3  # Highlight circle thickness
+CENTRAL_CELL = (0, 0)
+COLOR_NAMES = {
+    (128, 0, 128): "Violet",
+    (0, 0, 255): "Bleu",
+    (255, 0, 0): "Rouge",
+    (255, 105, 180): "Rose",
+    (255, 255, 0): "Jaune",
+    (0, 255, 0): "Vert",
+    DARKER_GREY: "Mort",
+}
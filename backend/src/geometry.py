@@ -0,0 +1,118 @@
+from functools import lru_cache
+
+from backend.src.constants import CENTRAL_CELL
+from backend.src.utils import get_directions
+
+
+def get_board_size(nb_players):
+    if nb_players in [3, 4]:
+        return 5
+    elif nb_players == 6:
+        return 7
+    raise ValueError("Nombre de joueurs invalide. Veuillez choisir 3, 4 ou 6.")
+
+
+def find_adjacent_vectors(directions, dq, dr):
+    """Returns the two adjacent directions whose sum is the diagonal (dq, dr)."""
+    for v1 in directions["adjacent"]:
+        for v2 in directions["adjacent"]:
+            if v1 != v2 and v1[0] + v2[0] == dq and v1[1] + v2[1] == dr:
+                return v1, v2
+    return None
+
+
+class Geometry:
+    """Move generation tables for one board variant, computed once.
+
+    Cells are numbered in ``cells`` order (``index`` maps (q, r) back to the
+    number). For every cell number:
+    - ``rays[cell]`` is a tuple of ``(is_diagonal, steps)`` in the order of
+      ``directions["all"]``. ``steps`` lists the on-board cells of the ray, each
+      paired with the diagonal "gate" crossed to reach it: the two cells on
+      both sides of the diagonal step, or None when the step cannot be blocked
+      (adjacent direction, or one of the two cells is off the board).
+    - ``neighbours[cell]`` lists the adjacent cells that are on the board.
+    - ``influence[cell]`` lists the cells whose rays go through, or are gated
+      by, the cell: the pieces there may have to recompute their moves when
+      the cell changes.
+    """
+
+    def __init__(self, nb_players):
+        self.nb_players = nb_players
+        self.board_size = get_board_size(nb_players)
+        self.directions = get_directions(nb_players)
+
+        # Same order as the original q/r scan of the board
+        self.cells = [
+            (q, r)
+            for q in range(-self.board_size + 1, self.board_size)
+            for r in range(-self.board_size + 1, self.board_size)
+            if self._is_within_board(q, r)
+        ]
+        self.cell_set = frozenset(self.cells)
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+        self.center = self.index[CENTRAL_CELL]
+
+        diagonal_vectors = {
+            d: find_adjacent_vectors(self.directions, *d)
+            for d in self.directions["diagonal"]
+        }
+        self.neighbours = [
+            tuple(
+                self.index[(q + dq, r + dr)]
+                for dq, dr in self.directions["adjacent"]
+                if (q + dq, r + dr) in self.cell_set
+            )
+            for q, r in self.cells
+        ]
+        self.rays = [
+            tuple(
+                self._build_ray(cell, d, diagonal_vectors.get(d))
+                for d in self.directions["all"]
+            )
+            for cell in self.cells
+        ]
+        influence: list[set[int]] = [set() for _ in self.cells]
+        for source, rays in enumerate(self.rays):
+            for _, steps in rays:
+                for cell, gate in steps:
+                    influence[cell].add(source)
+                    for gate_cell in gate or ():
+                        influence[gate_cell].add(source)
+        self.influence = [tuple(sorted(cells)) for cells in influence]
+
+    def _is_within_board(self, q, r):
+        if self.nb_players in [3, 6]:
+            s = -q - r  # Coordonnée s dans un système hexagonal
+            return (
+                abs(q) < self.board_size
+                and abs(r) < self.board_size
+                and abs(s) < self.board_size
+            )
+        return abs(q) < self.board_size and abs(r) < self.board_size
+
+    def _gate(self, q, r, vectors):
+        if vectors is None:
+            return None
+        (v1q, v1r), (v2q, v2r) = vectors
+        g1, g2 = (q + v1q, r + v1r), (q + v2q, r + v2r)
+        if g1 in self.cell_set and g2 in self.cell_set:
+            return self.index[g1], self.index[g2]
+        return None
+
+    def _build_ray(self, cell, direction, vectors):
+        (q, r), (dq, dr) = cell, direction
+        steps = []
+        while (q + dq, r + dr) in self.cell_set:
+            steps.append((self.index[(q + dq, r + dr)], self._gate(q, r, vectors)))
+            q, r = q + dq, r + dr
+        return vectors is not None, tuple(steps)
+
+    def is_within_board(self, q, r):
+        return (q, r) in self.cell_set
+
+
+@lru_cache(maxsize=None)
+def get_geometry(nb_players):
+    """Returns the shared geometry tables of a variant (3, 4 or 6 players)."""
+    return Geometry(nb_players)
@@ -0,0 +1,144 @@
+import sys
+
+DELTA_ENTRY = 4  # Offset (2 bytes), old value, new value
+
+
+def encode_delta(before, after):
+    """Bytes (offset, old, new) of the state bytes that differ."""
+    delta = bytearray()
+    for offset, (old, new) in enumerate(zip(before, after)):
+        if old != new:
+            delta += bytes((offset >> 8, offset & 255, old, new))
+    return bytes(delta)
+
+
+def decode_delta(delta):
+    """Yields the (offset, old, new) of an encoded delta, by increasing offset."""
+    for i in range(0, len(delta), DELTA_ENTRY):
+        yield (delta[i] << 8) | delta[i + 1], delta[i + 2], delta[i + 3]
+
+
+class History:
+    """Undo/redo history of a GameState as compact per-ply deltas.
+
+    A ply only stores the bytes that changed, and undo/redo write them back
+    in place through GameState.set, which keeps the Zobrist key and the
+    dirty cells (hence the attack graph) incremental. A full snapshot
+    (keyframe) is kept every keyframe_interval plies to jump to distant plies,
+    and while memory_size() is over max_bytes the oldest plies are dropped, a
+    keyframe at a time (never past the current ply).
+    """
+
+    def __init__(self, state, keyframe_interval=64, max_bytes=1 << 20):
+        self.state = state
+        self.keyframe_interval = keyframe_interval
+        self.max_bytes = max_bytes
+        self.saved = bytearray(state.buf)  # State at the current ply
+        self.deltas = []  # deltas[i] goes from ply first + i to first + i + 1
+        self.keyframes = {0: bytes(state.buf)}  # Absolute ply -> snapshot
+        self.first = 0  # Absolute ply of the oldest state kept, a keyframe
+        self.position = 0  # Absolute ply of the current state
+        # Running size of the deltas and keyframes, without their containers
+        self.nbytes = sys.getsizeof(self.keyframes[0])
+
+    def __len__(self):
+        """Number of states kept, including the ones that can be redone."""
+        return len(self.deltas) + 1
+
+    def can_undo(self):
+        return self.position > self.first
+
+    def can_redo(self):
+        return self.position < self.first + len(self.deltas)
+
+    def push(self):
+        """Records the current state as the next ply, dropping the redo plies."""
+        redo = self.deltas[self.position - self.first :]
+        self.nbytes -= sum(sys.getsizeof(delta) for delta in redo)
+        del self.deltas[self.position - self.first :]
+        for ply in [ply for ply in self.keyframes if ply > self.position]:
+            self.nbytes -= sys.getsizeof(self.keyframes.pop(ply))
+        buf = self.state.buf
+        delta = encode_delta(self.saved, buf)
+        self.deltas.append(delta)
+        self.nbytes += sys.getsizeof(delta)
+        self.saved[:] = buf
+        self.position += 1
+        if self.position % self.keyframe_interval == 0:
+            frame = self.keyframes[self.position] = bytes(buf)
+            self.nbytes += sys.getsizeof(frame)
+        if self.memory_size() > self.max_bytes:
+            self.trim()
+
+    def trim(self):
+        """Drops the oldest plies, a keyframe at a time, until the history
+        fits in max_bytes or the next keyframe is past the current ply."""
+        for frame in sorted(ply for ply in self.keyframes if ply > self.first):
+            if self.memory_size() <= self.max_bytes or frame > self.position:
+                return
+            dropped = self.deltas[: frame - self.first]
+            self.nbytes -= sum(sys.getsizeof(delta) for delta in dropped)
+            del self.deltas[: frame - self.first]
+            self.nbytes -= sys.getsizeof(self.keyframes.pop(self.first))
+            self.first = frame
+
+    def revert(self):
+        """Discards the writes made since the current ply was recorded."""
+        state, saved = self.state, self.saved
+        buf = state.buf
+        if buf != saved:
+            for offset, value in enumerate(saved):
+                if buf[offset] != value:
+                    state.set(offset, value)
+
+    def undo(self):
+        """Steps back one ply in place. Returns False at the oldest ply."""
+        if not self.can_undo():
+            return False
+        self.revert()
+        self.apply(self.deltas[self.position - self.first - 1], backward=True)
+        self.position -= 1
+        return True
+
+    def redo(self):
+        """Steps forward one ply in place. Returns False at the latest ply."""
+        if not self.can_redo():
+            return False
+        self.revert()
+        self.apply(self.deltas[self.position - self.first], backward=False)
+        self.position += 1
+        return True
+
+    def seek(self, ply):
+        """Moves to an absolute ply, from the closest keyframe if far away."""
+        if not self.first <= ply <= self.first + len(self.deltas):
+            raise ValueError(f"Ply {ply} is not in the history")
+        self.revert()
+        start = max(frame for frame in self.keyframes if frame <= ply)
+        if abs(ply - self.position) > ply - start:
+            self.load(self.keyframes[start])
+            self.position = start
+        while self.position > ply:
+            self.apply(self.deltas[self.position - self.first - 1], backward=True)
+            self.position -= 1
+        while self.position < ply:
+            self.apply(self.deltas[self.position - self.first], backward=False)
+            self.position += 1
+
+    def apply(self, delta, backward):
+        state, saved = self.state, self.saved
+        for offset, old, new in decode_delta(delta):
+            value = old if backward else new
+            state.set(offset, value)
+            saved[offset] = value
+
+    def load(self, snapshot):
+        state = self.state
+        state.buf[:] = snapshot
+        state.key = state.compute_key()
+        state.dirty_cells.update(range(state.layout.nb_cells))
+        self.saved[:] = snapshot
+
+    def memory_size(self):
+        """Bytes used by the recorded plies and keyframes."""
+        return self.nbytes + sys.getsizeof(self.deltas) + sys.getsizeof(self.keyframes)
@@ -7,6 +7,7 @@ import pygame
 from backend.src.animation import draw_button, draw_legend, draw_player_turn
 from backend.src.board import Board
 from backend.src.constants import *
+from backend.src.renderer import BoardRenderer
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -23,6 +24,12 @@ def parse_arguments():
         default=3,
         help="Number of players (3, 4 or 6)",
     )
+    parser.add_argument(
+        "--time_budget_ms",
+        type=int,
+        default=None,
+        help="Thinking time of the MinMax bot (Shift), fixed depth if not set",
+    )
     return parser.parse_args()
 
 
@@ -35,6 +42,7 @@ def main():
     clock = pygame.time.Clock()
     current_player_index = 0
     board = Board(args.nb_player_mode, current_player_index)
+    renderer = BoardRenderer(board, screen)
 
     # Initialize the font for text
     pygame.font.init()
@@ -73,7 +81,9 @@ def main():
                     board.players[board.current_player_index].play_turn(board)
                     board.next_player()
                 elif event.key == pygame.K_LSHIFT and not game_over and not auto_play:
-                    board.players[board.current_player_index].think_and_play_turn(board)
+                    board.players[board.current_player_index].think_and_play_turn(
+                        board, args.time_budget_ms
+                    )
                     board.next_player()
                 elif event.key == pygame.K_RETURN:
                     auto_play = not auto_play  # Toggle auto_play state
@@ -128,11 +138,11 @@ def main():
             draw_player_turn(screen, board.players, board.current_player_index)
 
             # Draw the board and pieces
-            board.draw(screen, selected_piece, board.piece_to_place)
+            renderer.draw(screen, selected_piece, board.piece_to_place)
             if selected_piece and not auto_play:
-                board.draw_possible_moves(screen, possible_moves)
+                renderer.draw_possible_moves(screen, possible_moves)
             if board.piece_to_place and not auto_play:
-                board.draw_available_cells(screen)
+                renderer.draw_available_cells(screen)
 
             # Add the legend
             draw_legend(screen)
@@ -165,8 +175,9 @@ def main():
                     and button_y <= mouse_y <= button_y + button_height
                 ):
                     # Reset the game
-                    current_player_index = 4
-                    board = Board(current_player_index)
+                    current_player_index = 0
+                    board = Board(args.nb_player_mode, current_player_index)
+                    renderer = BoardRenderer(board, screen)
                     game_over = False
                     winner = None
                     selected_piece = None
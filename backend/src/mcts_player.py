@@ -0,0 +1,217 @@
+import logging
+import math
+import random
+import time
+
+from backend.src.minmax_player import MAXN_TOTAL, MinMaxPlayer
+from backend.src.move_ordering import MoveOrderer
+from backend.src.player import Player
+
+
+class MCTSNode:
+    """Node of an open-loop search tree: the sequence of moves leading to it.
+
+    Displaced pieces land on random cells, so a node stands for every state
+    reached by its moves; key is the Zobrist key of the first one, used to
+    find the node again when the tree is reused.
+    """
+
+    __slots__ = ("move", "children", "visits", "rewards", "key")
+
+    def __init__(self, move, nb_slots, key):
+        self.move = move  # Encoded move (piece id * 256 + cell) leading here
+        self.children = {}  # Encoded move -> MCTSNode
+        self.visits = 0
+        self.rewards = [0.0] * nb_slots  # Sum of the rewards of each slot
+        self.key = key
+
+
+class MCTSPlayer(Player):
+    """Monte Carlo Tree Search bot (UCT with one reward per player).
+
+    Each iteration walks down the tree with make_move, choosing for the
+    player to move the child with the best UCB score of its own reward, adds
+    one node, then plays a short playout (captures first, else random) and
+    takes everything back with unmake_move. The reward of a slot is 1 for
+    the winner, else its share of the positive relative scores. The rewards
+    of every slot are kept, so the node of the position reached at the next
+    turn can be taken from the tree of any MCTS bot of the board.
+    """
+
+    def __init__(
+        self,
+        board,
+        slot,
+        iterations=200,
+        rollout_depth=8,
+        exploration=1.4,
+        reuse_depth=None,
+    ):
+        super().__init__(board, slot)
+        self.iterations = iterations  # Budget without time_budget_ms
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        # Plies between two turns of the player, searched for tree reuse
+        self.reuse_depth = reuse_depth or board.state.layout.nb_slots + 1
+        self.root = None
+        self.playouts = 0
+        self.reused_visits = 0  # Visits of the reused subtree at the last turn
+
+    def think_and_play_turn(self, board, time_budget_ms=None):
+        """Searches for time_budget_ms, or self.iterations times, and plays."""
+        nb_slots = len(board.players_by_slot)
+        root = self.find_reusable_root(board)
+        if root is None:
+            root = MCTSNode(None, nb_slots, board.zobrist_key)
+        self.root = root
+        self.reused_visits = root.visits
+
+        rl, board.rl = board.rl, True  # No animation inside the search
+        try:
+            if time_budget_ms is None:
+                for _ in range(self.iterations):
+                    self.iterate(board, root)
+            else:
+                deadline = time.perf_counter() + time_budget_ms / 1000
+                while time.perf_counter() < deadline:
+                    self.iterate(board, root)
+        finally:
+            board.rl = rl
+
+        legal = set(self.legal_codes(board))
+        children = [c for c in root.children.values() if c.move in legal]
+        if not children:
+            return
+        best = max(children, key=lambda child: child.visits)
+        piece, destination = self.decode(board, best.move)
+        logging.info(
+            f"MCTS played: {piece.piece_class} from ({piece.q}, {piece.r}) to {destination}, visits: {best.visits}/{root.visits}"
+        )
+        self.root = best
+        piece.move(destination[0], destination[1], board)
+
+    def find_reusable_root(self, board):
+        """Most visited node of the current position in the trees kept by the
+        MCTS bots of the board, if any.
+
+        Each bot keeps the node of the position it played into: the last one
+        to move holds the current position, the others hold it among the
+        replies below their node.
+        """
+        key = board.zobrist_key
+        level = [
+            player.root
+            for player in board.players_by_slot
+            if isinstance(player, MCTSPlayer) and player.root is not None
+        ]
+        found = None
+        for _ in range(self.reuse_depth + 1):
+            for node in level:
+                if node.key == key and (found is None or node.visits > found.visits):
+                    found = node
+            level = [child for node in level for child in node.children.values()]
+        return found
+
+    @staticmethod
+    def legal_codes(board):
+        """Encoded moves of the player to move."""
+        attacks = board.attacks.refresh()
+        index = board.geometry.index
+        state = board.state
+        owners, offset = state.buf, state.layout.piece_owner
+        slot = board.players[board.current_player_index].slot
+        return [
+            pid * 256 + index[destination]
+            for pid in range(state.layout.nb_pieces)
+            if owners[offset + pid] == slot
+            for destination in attacks.moves[pid]
+        ]
+
+    @staticmethod
+    def decode(board, code):
+        return board.pieces[code // 256], board.geometry.cells[code % 256]
+
+    def iterate(self, board, root):
+        """One selection, expansion, playout and backpropagation from root."""
+        node = root
+        path = [node]
+        records = []
+        try:
+            while len(board.players) > 1:
+                codes = self.legal_codes(board)
+                if not codes:
+                    break
+                unexpanded = [code for code in codes if code not in node.children]
+                if unexpanded:
+                    code = random.choice(unexpanded)
+                    records.append(board.make_move(self.decode(board, code)))
+                    child = MCTSNode(code, len(node.rewards), board.zobrist_key)
+                    node.children[code] = child
+                    path.append(child)
+                    break
+                node = self.select(board, node, codes)
+                records.append(board.make_move(self.decode(board, node.move)))
+                path.append(node)
+            rewards = self.playout(board)
+        finally:
+            for record in reversed(records):
+                board.unmake_move(record)
+        for visited in path:
+            visited.visits += 1
+            for slot, reward in enumerate(rewards):
+                visited.rewards[slot] += reward
+
+    def select(self, board, node, codes):
+        """Child of the legal moves with the best UCB score for the mover."""
+        slot = board.players[board.current_player_index].slot
+        children = [node.children[code] for code in codes]
+        log_visits = math.log(sum(child.visits for child in children))
+        exploration = self.exploration
+        return max(
+            children,
+            key=lambda child: child.rewards[slot] / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+    def playout(self, board):
+        """Plays rollout_depth plies in place, returns the reward per slot."""
+        self.playouts += 1
+        records = []
+        try:
+            for _ in range(self.rollout_depth):
+                if len(board.players) < 2:
+                    break
+                code = self.rollout_move(board)
+                if code is None:
+                    break
+                records.append(board.make_move(self.decode(board, code)))
+            return self.rewards(board)
+        finally:
+            for record in reversed(records):
+                board.unmake_move(record)
+
+    def rollout_move(self, board):
+        """Cheap policy: a random move that kills an enemy piece, else a
+        random move. Diplomat moves only displace and are not kills."""
+        codes = self.legal_codes(board)
+        if not codes:
+            return None
+        pieces = board.pieces
+        kills = [
+            code
+            for code in codes
+            if MoveOrderer.victim_value(board, pieces[code // 256], code % 256)
+            is not None
+        ]
+        return random.choice(kills or codes)
+
+    @staticmethod
+    def rewards(board):
+        """1 for the last player standing, else the share of the scores."""
+        players = board.players
+        rewards = [0.0] * len(board.players_by_slot)
+        if len(players) == 1:
+            rewards[players[0].slot] = 1.0
+            return rewards
+        shares = MinMaxPlayer.score_shares(board)
+        return [share / MAXN_TOTAL for share in shares]
@@ -1,18 +1,85 @@
-import copy
 import logging
 import random
+import time
 
+from backend.src.move_ordering import MoveOrderer
+from backend.src.parallel_search import get_executor, search_root_moves
 from backend.src.player import Player
+from backend.src.state import DEAD
+from backend.src.transposition import (
+    EXACT,
+    LOWER,
+    NO_MOVE,
+    UPPER,
+    TranspositionTable,
+)
+
+ALGORITHMS = ("negamax", "paranoid", "maxn")
+MAXN_TOTAL = 600  # Sum of the score vectors of max^n (shallow pruning bound)
+# Default plies of captures searched beyond the depth (0: static evaluation).
+# Off for negamax: the negated evaluation of the next player counts its
+# captures on a third player as losses, and the quiescence made it weaker.
+QUIESCENCE_DEPTHS = {"negamax": 0, "paranoid": 4, "maxn": 0}
+# Transposition table keys of the searches whose scores are not negamax ones:
+# paranoid scores depend on the root player, max^n only stores moves
+PARANOID_KEYS = [random.Random(f"paranoid{slot}").getrandbits(64) for slot in range(6)]
+MAXN_KEY = random.Random("maxn").getrandbits(64)
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is spent."""
 
 
 class MinMaxPlayer(Player):
-    def __init__(self, color, pieces, depth=1):
-        super().__init__(color, pieces)
+    """Search bot, with a selectable multi-player algorithm.
+
+    - negamax: alpha-beta where each player is the opponent of the previous
+      one, scored with the relative_score of the player to move;
+    - paranoid: the other players minimise the root player's score share,
+      a two-sided search with full alpha-beta pruning;
+    - maxn: each player maximises its own share of the score vector, with
+      shallow pruning (the shares sum to MAXN_TOTAL).
+
+    With workers > 1, the root moves are split between worker processes,
+    which receive the state bytes rather than the board.
+    """
+
+    def __init__(
+        self,
+        board,
+        slot,
+        depth=1,
+        tt_size_mb=16,
+        max_depth=16,
+        algorithm="negamax",
+        workers=1,
+    ):
+        super().__init__(board, slot)
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown search algorithm: {algorithm}")
         self.depth = depth
+        self.tt_size_mb = tt_size_mb
+        self.max_depth = max_depth  # Limit of the iterative deepening
+        self.algorithm = algorithm
+        self.move_ordering = True  # False: legal moves in generation order
+        self.workers = workers  # Processes of the root search
+        self.quiescence_depth = None  # None: QUIESCENCE_DEPTHS[algorithm]
+        # True: the children of the last ply are scored in one BatchEvaluator
+        # call instead of one incremental ScoreBoard update each
+        self.batch_leaves = False
+        self.principal_variation = []
+
+    def think_and_play_turn(self, board, time_budget_ms=None):
+        """Plays a turn using the MinMax algorithm with alpha-beta pruning.
 
-    def think_and_play_turn(self, board):
-        """Plays a turn using the MinMax algorithm with alpha-beta pruning."""
-        best_move = self.alpha_beta(board, self.depth, float("-inf"), float("inf"))[1]
+        Without a time budget, searches at self.depth. With one, deepens
+        iteratively and plays the best move of the last completed depth.
+        """
+        self.prepare_search(board)
+        if time_budget_ms is None:
+            best_move = self.search(board, self.depth, board.transposition_table)[1]
+        else:
+            best_move = self.iterative_deepening(board, time_budget_ms)
         if best_move:
             piece, move = best_move
             piece.move(move[0], move[1], board)
@@ -20,85 +87,626 @@ class MinMaxPlayer(Player):
                 f"MinMax played: {piece.piece_class} from ({piece.q}, {piece.r}) to {move}, eval: {self.evaluate_board(board)}"
             )
 
-    def get_best_moves(self, board):  # should go in minmax class
-        best_moves: dict[tuple, float] = {}
-        for piece in self.pieces:
-            best_moves.update(piece.update_piece_best_moves(board))
-        best_moves_sorted = sorted(best_moves.items(), key=lambda x: x[1], reverse=True)
-        print(best_moves_sorted)
-        return [
-            move[0] for move in best_moves_sorted
-        ]  # Returns only the tuples (piece, move)
-
-    def alpha_beta(self, board, depth, alpha, beta):
-        if depth == 0:
+    def prepare_search(self, board):
+        if board.transposition_table is None:
+            # Shared by the bots and kept for the whole game
+            board.transposition_table = TranspositionTable(self.tt_size_mb)
+        if board.move_orderer is None:
+            board.move_orderer = MoveOrderer(board.state.layout.nb_cells)
+        board.move_orderer.new_search()
+        if self.batch_leaves and board.batch_evaluator is None:
+            from backend.src.batch_eval import BatchEvaluator  # Imports numpy
+
+            board.batch_evaluator = BatchEvaluator(
+                board.state.layout, board.advanced_rules
+            )
+
+    def search(self, board, depth, table=None, deadline=None, first_move=None):
+        """Searches the position with self.algorithm, returns (score, move)."""
+        if self.workers > 1 and depth > 1:
+            return self.parallel_search(board, depth, deadline, first_move)
+        if self.algorithm == "paranoid":
+            return self.paranoid(
+                board, depth, float("-inf"), float("inf"), table, deadline, first_move
+            )
+        if self.algorithm == "maxn":
+            scores, move = self.maxn(
+                board, depth, float("inf"), table, deadline, first_move
+            )
+            return scores[self.slot], move
+        return self.alpha_beta(
+            board, depth, float("-inf"), float("inf"), table, deadline, first_move
+        )
+
+    def root_move_score(
+        self, board, move, depth, table=None, deadline=None, alpha=float("-inf")
+    ):
+        """Score for self of a root move searched to the given depth.
+
+        A score at or below alpha is only an upper bound (the move is not
+        better than one already searched).
+        """
+        record = board.make_move(move)
+        try:
+            if self.algorithm == "paranoid":
+                return self.paranoid(
+                    board, depth - 1, alpha, float("inf"), table, deadline, ply=1
+                )[0]
+            if self.algorithm == "maxn":
+                scores = self.maxn(
+                    board, depth - 1, float("inf"), table, deadline, ply=1
+                )[0]
+                return scores[self.slot]
+            if not board.players:  # Every remaining chief died with the move
+                return self.evaluate_board(board)
+            next_player = board.players[board.current_player_index]
+            return -next_player.alpha_beta(  # Negamax
+                board, depth - 1, float("-inf"), -alpha, table, deadline, ply=1
+            )[0]
+        finally:
+            board.unmake_move(record)
+
+    def parallel_search(self, board, depth, deadline=None, first_move=None):
+        """Root splitting: the workers score disjoint subsets of the root moves.
+
+        The first move is searched here and its score bounds the search of
+        the other moves, dealt round-robin in search order to the workers
+        (no bound is shared between workers afterwards). Raises
+        SearchTimeout when a worker ran out of time, like the sequential
+        search.
+        """
+        moves = self.ordered_moves(board, 0, None, first_move)
+        if not moves:
             return self.evaluate_board(board), None
+        table = board.transposition_table
+        alpha = self.root_move_score(board, moves[0], depth, table, deadline)
+        best_score, best_move = alpha, moves[0]
+        codes = [self.encode_move(board, move) for move in moves[1:]]
+        if not codes:
+            return best_score, best_move
+        time_budget = None
+        if deadline is not None:
+            time_budget = max(0.0, deadline - time.perf_counter())
+        state = bytes(board.state.buf)
+        workers = min(self.workers, len(codes))
+        executor = get_executor(self.workers)
+        futures = [
+            executor.submit(
+                search_root_moves,
+                board.nb_players,
+                state,
+                self.slot,
+                self.search_settings(),
+                depth,
+                codes[i::workers],
+                time_budget,
+                alpha,
+            )
+            for i in range(workers)
+        ]
+        timed_out = False
+        for future in futures:
+            results, worker_timed_out = future.result()
+            timed_out = timed_out or worker_timed_out
+            for code, score in results:
+                if score > best_score:
+                    best_score, best_move = score, moves[1 + codes.index(code)]
+        if timed_out:
+            raise SearchTimeout
+        return best_score, best_move
+
+    def search_settings(self):
+        """Attributes that change the scores of a search, for the workers.
+        Each worker keeps its own table: tt_size_mb is split between them."""
+        return {
+            "algorithm": self.algorithm,
+            "quiescence_depth": self.quiescence_depth,
+            "batch_leaves": self.batch_leaves,
+            "move_ordering": self.move_ordering,
+            "tt_size_mb": max(1, self.tt_size_mb // self.workers),
+        }
+
+    def iterative_deepening(self, board, time_budget_ms):
+        """Searches at depth 1, 2, ... until the deadline, returns the best move.
+
+        The depth 1 search always completes. Each iteration tries first the
+        principal variation of the previous one (root move given explicitly,
+        the rest through the best moves of the transposition table).
+        """
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        table = board.transposition_table
+        best_move = None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self.search(
+                    board,
+                    depth,
+                    table,
+                    deadline=deadline if depth > 1 else None,
+                    first_move=best_move,
+                )
+            except SearchTimeout:
+                break
+            if move is None:
+                break  # No legal move, or nothing more to search
+            best_move = move
+            self.principal_variation = self.read_principal_variation(board, depth)
+            logging.debug(
+                f"depth {depth}: score {score}, pv {self.principal_variation}"
+            )
+            if time.perf_counter() >= deadline:
+                break
+        return best_move
+
+    def read_principal_variation(self, board, depth):
+        """Follows the best moves stored in the transposition table."""
+        table = board.transposition_table
+        records = []
+        variation: list[tuple] = []
+        while len(variation) < depth and len(board.players) > 1:
+            entry = table.probe(self.table_key(board))
+            move = self.decode_move(board, entry[3]) if entry else None
+            if move is None:
+                break
+            variation.append(move)
+            records.append(board.make_move(move))
+        for record in reversed(records):
+            board.unmake_move(record)
+        return variation
+
+    def table_key(self, board):
+        """Transposition table key of the position for self.algorithm."""
+        if self.algorithm == "paranoid":
+            return board.zobrist_key ^ PARANOID_KEYS[self.slot]
+        if self.algorithm == "maxn":
+            return board.zobrist_key ^ MAXN_KEY
+        return board.zobrist_key
+
+    def ordered_moves(self, board, ply=0, tt_move=None, first_move=None):
+        """Legal moves of this player, in the order to search them.
+
+        The move of the previous iteration and the table move go first, then
+        the MoveOrderer heuristics if the board has one.
+        """
+        moves = self.get_all_valid_moves(board)
+        first_moves = (first_move, tt_move)
+        if self.move_ordering and board.move_orderer is not None:
+            return board.move_orderer.order(board, moves, ply, first_moves)
+        for move in reversed(first_moves):
+            if move is not None and move in moves:
+                moves.remove(move)
+                moves.insert(0, move)
+        return moves
+
+    def probe(self, board, table, key, depth, alpha, beta):
+        """Reads the table: returns (cutoff score or None, alpha, beta, tt move)."""
+        entry = table.probe(key) if table is not None else None
+        if entry is None:
+            return None, alpha, beta, None
+        entry_depth, bound, score, move = entry
+        tt_move = self.decode_move(board, move)
+        if entry_depth >= depth:
+            if bound == EXACT:
+                return score, alpha, beta, tt_move
+            elif bound == LOWER:
+                alpha = max(alpha, score)
+            elif bound == UPPER:
+                beta = min(beta, score)
+            if beta <= alpha:
+                return score, alpha, beta, tt_move
+        return None, alpha, beta, tt_move
+
+    @staticmethod
+    def store(board, table, key, depth, score, alpha_orig, beta, best_move):
+        if table is None:
+            return
+        if score <= alpha_orig:
+            bound = UPPER
+        elif score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        table.store(
+            key, depth, bound, score, MinMaxPlayer.encode_move(board, best_move)
+        )
+
+    def alpha_beta(
+        self,
+        board,
+        depth,
+        alpha,
+        beta,
+        table=None,
+        deadline=None,
+        first_move=None,
+        ply=0,
+    ):
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchTimeout
+        key = board.zobrist_key
+        cutoff, alpha, beta, tt_move = self.probe(board, table, key, depth, alpha, beta)
+        if cutoff is not None:
+            return cutoff, tt_move
+
+        if depth == 0:
+            players = board.players
+            previous = players[(board.current_player_index - 1) % len(players)]
+            score = self.quiescence(
+                board, alpha, beta, deadline, ply, self.leaf_depth(), previous.slot
+            )
+            self.store(board, table, key, 0, score, alpha, beta, None)
+            return score, None
 
-        best_moves = self.get_best_moves(board)
+        best_moves = self.ordered_moves(board, ply, tt_move, first_move)
         if not best_moves:
-            valid_moves = self.get_all_valid_moves(board)
-            if not valid_moves:
-                return self.evaluate_board(board), None
-            best_moves = [random.choice(valid_moves)]
+            return self.evaluate_board(board), None
+        alpha_orig = alpha
+        orderer = board.move_orderer
+        if orderer is not None:
+            orderer.nodes += 1
 
         logging.info(f"there is {len(best_moves)} good moves for {self.color}")
 
+        leaves = self.batch_leaf_scores(board, best_moves, depth)
         max_eval = float("-inf")
         best_move = None
-        for piece, move in best_moves:  # Use sorted moves
-            new_board = self.copy_board_state(board)
-            new_piece = new_board.pieces_by_pos[(piece.q, piece.r)]
-            new_piece.move(move[0], move[1], new_board)
-            new_board.next_player()
-            next_player = new_board.players[new_board.current_player_index]
-            eval = -next_player.alpha_beta(new_board, depth - 1, -beta, -alpha)[
-                0
-            ]  # Negamax
+        for i, (piece, move) in enumerate(best_moves):  # Use sorted moves
+            if leaves is not None:
+                relative, next_slot = leaves[0][i], leaves[1][i]
+                eval = float(
+                    relative[self.slot] if next_slot is None else -relative[next_slot]
+                )
+            else:
+                # Search in place: play the move, then take it back
+                record = board.make_move((piece, move))
+                try:
+                    if not board.players:  # Every remaining chief died
+                        eval = self.evaluate_board(board)
+                    else:
+                        next_player = board.players[board.current_player_index]
+                        eval = -next_player.alpha_beta(  # Negamax
+                            board,
+                            depth - 1,
+                            -beta,
+                            -alpha,
+                            table,
+                            deadline,
+                            ply=ply + 1,
+                        )[0]
+                finally:
+                    board.unmake_move(record)
             if eval > max_eval:
                 max_eval = eval
                 best_move = (piece, move)
                 logging.info(f"max_eval: {max_eval}, best_move: {best_move}")
             alpha = max(alpha, eval)
             if beta <= alpha:
+                if orderer is not None:
+                    orderer.record_cutoff(board, (piece, move), ply, depth, i)
                 break
+
+        self.store(board, table, key, depth, max_eval, alpha_orig, beta, best_move)
         return max_eval, best_move
 
+    def paranoid(
+        self,
+        board,
+        depth,
+        alpha,
+        beta,
+        table=None,
+        deadline=None,
+        first_move=None,
+        ply=0,
+    ):
+        """Alpha-beta on self's score share, the other players minimising it."""
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchTimeout
+        key = self.table_key(board)
+        cutoff, alpha, beta, tt_move = self.probe(board, table, key, depth, alpha, beta)
+        if cutoff is not None:
+            return cutoff, tt_move
+
+        if depth > 0 and len(board.players) > 1:
+            to_move = board.players[board.current_player_index]
+            best_moves = to_move.ordered_moves(board, ply, tt_move, first_move)
+        else:
+            best_moves = []
+        if not best_moves:
+            if depth == 0 and len(board.players) > 1:
+                score = self.paranoid_quiescence(
+                    board, alpha, beta, deadline, ply, self.leaf_depth()
+                )
+                self.store(board, table, key, 0, score, alpha, beta, None)
+                return score, None
+            score = self.score_shares(board)[self.slot]
+            if table is not None:
+                table.store(key, depth, EXACT, score)
+            return score, None
+
+        maximizing = to_move.slot == self.slot
+        alpha_orig, beta_orig = alpha, beta
+        orderer = board.move_orderer
+        if orderer is not None:
+            orderer.nodes += 1
+        leaves = self.batch_leaf_scores(board, best_moves, depth)
+        best_score = float("-inf") if maximizing else float("inf")
+        best_move = None
+        for i, move in enumerate(best_moves):
+            if leaves is not None:
+                score = self.shares_of(leaves[0][i])[self.slot]
+            else:
+                record = board.make_move(move)
+                try:
+                    score = self.paranoid(
+                        board, depth - 1, alpha, beta, table, deadline, ply=ply + 1
+                    )[0]
+                finally:
+                    board.unmake_move(record)
+            if maximizing:
+                if score > best_score:
+                    best_score, best_move = score, move
+                alpha = max(alpha, score)
+            else:
+                if score < best_score:
+                    best_score, best_move = score, move
+                beta = min(beta, score)
+            if beta <= alpha:
+                if orderer is not None:
+                    orderer.record_cutoff(board, move, ply, depth, i)
+                break
+
+        self.store(
+            board, table, key, depth, best_score, alpha_orig, beta_orig, best_move
+        )
+        return best_score, best_move
+
+    def batch_leaf_scores(self, board, moves, depth):
+        """Relative scores of the positions reached by the moves, in one batch.
+
+        Only for the last ply of the search without quiescence, when
+        batch_leaves is set; returns None otherwise. Also returns the slot to
+        move after each move (None once every chief is dead).
+        """
+        if not self.batch_leaves or depth != 1 or self.leaf_depth():
+            return None
+        states, next_slots = [], []
+        for move in moves:
+            record = board.make_move(move)
+            try:
+                states.append(bytes(board.state.buf))
+                players = board.players
+                next_slots.append(
+                    players[board.current_player_index].slot if players else None
+                )
+            finally:
+                board.unmake_move(record)
+        return board.batch_evaluator.evaluate(states).tolist(), next_slots
+
+    def leaf_depth(self):
+        """Plies of quiescence search at the leaves of the main search."""
+        if self.quiescence_depth is not None:
+            return self.quiescence_depth
+        return QUIESCENCE_DEPTHS[self.algorithm]
+
+    def tactical_moves(self, board, ply=0, target=None):
+        """Moves of this player that kill, ordered.
+
+        Captures (chief kills included) and reporter moves next to an enemy
+        piece; a diplomat moving onto an enemy only displaces it. With a
+        target slot, only the moves killing a piece of that player.
+        """
+        state, geometry = board.state, board.geometry
+        buf, owners = state.buf, state.layout.piece_owner
+        moves = []
+        for piece, destination in self.get_all_valid_moves(board):
+            cell = geometry.index[destination]
+            own = buf[owners + piece.pid]
+            occupant = buf[cell]
+            if occupant:
+                owner = buf[owners + occupant - 1]
+                if owner not in (DEAD, own) and piece.piece_class != "diplomat":
+                    if target is None or owner == target:
+                        moves.append((piece, destination))
+            elif piece.piece_class == "reporter":
+                for neighbour in geometry.neighbours[cell]:
+                    occupant = buf[neighbour]
+                    if not occupant:
+                        continue
+                    owner = buf[owners + occupant - 1]
+                    if owner not in (DEAD, own) and (target is None or owner == target):
+                        moves.append((piece, destination))
+                        break
+        if board.move_orderer is not None:
+            return board.move_orderer.order(board, moves, ply)
+        return moves
+
+    def quiescence(
+        self, board, alpha, beta, deadline=None, ply=0, depth=4, target=None
+    ):
+        """Negamax over the killing moves only, until the position is quiet.
+
+        The player to move may also stand pat: its static evaluation is a
+        lower bound of the score. Below the first ply, only the pieces of the
+        player who just moved are targeted: a capture on a third player is
+        not a loss for it, which the negamax sign cannot express.
+        """
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchTimeout
+        stand_pat = self.evaluate_board(board)
+        if depth == 0 or len(board.players) < 2 or stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        best_score = stand_pat
+        for move in self.tactical_moves(board, ply, target):
+            record = board.make_move(move)
+            try:
+                if not board.players:  # Every remaining chief died with the move
+                    score = self.evaluate_board(board)
+                else:
+                    next_player = board.players[board.current_player_index]
+                    score = -next_player.quiescence(
+                        board, -beta, -alpha, deadline, ply + 1, depth - 1, self.slot
+                    )
+            finally:
+                board.unmake_move(record)
+            best_score = max(best_score, score)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_score
+
+    def paranoid_quiescence(self, board, alpha, beta, deadline=None, ply=0, depth=4):
+        """Paranoid search over the killing moves only.
+
+        Both sides may stand pat: the static score share of the root player
+        bounds the score from below at its turns, from above at the others.
+        """
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchTimeout
+        stand_pat = self.score_shares(board)[self.slot]
+        if depth == 0 or len(board.players) < 2:
+            return stand_pat
+        to_move = board.players[board.current_player_index]
+        maximizing = to_move.slot == self.slot
+        if maximizing:
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+        else:
+            if stand_pat <= alpha:
+                return stand_pat
+            beta = min(beta, stand_pat)
+        best_score = stand_pat
+        for move in to_move.tactical_moves(board, ply):
+            record = board.make_move(move)
+            try:
+                score = self.paranoid_quiescence(
+                    board, alpha, beta, deadline, ply + 1, depth - 1
+                )
+            finally:
+                board.unmake_move(record)
+            if maximizing:
+                best_score = max(best_score, score)
+                alpha = max(alpha, score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, score)
+            if beta <= alpha:
+                break
+        return best_score
+
+    def maxn(
+        self, board, depth, bound, table=None, deadline=None, first_move=None, ply=0
+    ):
+        """Max^n search: returns the score shares vector and the best move.
+
+        The player to move stops as soon as its share reaches bound, since
+        the player above can then get at most what it already has.
+        """
+        if deadline is not None and time.perf_counter() > deadline:
+            raise SearchTimeout
+        key = board.zobrist_key ^ MAXN_KEY
+        entry = table.probe(key) if table is not None else None
+        tt_move = self.decode_move(board, entry[3]) if entry else None
+
+        if depth > 0 and len(board.players) > 1:
+            to_move = board.players[board.current_player_index]
+            best_moves = to_move.ordered_moves(board, ply, tt_move, first_move)
+        else:
+            best_moves = []
+        if not best_moves:
+            return self.score_shares(board), None
+
+        slot = to_move.slot
+        orderer = board.move_orderer
+        if orderer is not None:
+            orderer.nodes += 1
+        leaves = self.batch_leaf_scores(board, best_moves, depth)
+        best_scores = None
+        best_move = None
+        for i, move in enumerate(best_moves):
+            if leaves is not None:
+                scores = self.shares_of(leaves[0][i])
+            else:
+                record = board.make_move(move)
+                try:
+                    next_slot = (
+                        board.players[board.current_player_index].slot
+                        if board.players
+                        else None
+                    )
+                    # A player playing twice in a row (central chief): no bound
+                    child_bound = (
+                        float("inf")
+                        if next_slot == slot or best_scores is None
+                        else MAXN_TOTAL - best_scores[slot]
+                    )
+                    scores = self.maxn(
+                        board, depth - 1, child_bound, table, deadline, ply=ply + 1
+                    )[0]
+                finally:
+                    board.unmake_move(record)
+            if best_scores is None or scores[slot] > best_scores[slot]:
+                best_scores, best_move = scores, move
+            if best_scores[slot] >= bound:
+                if orderer is not None:
+                    orderer.record_cutoff(board, move, ply, depth, i)
+                break  # Shallow pruning
+
+        if table is not None and best_scores is not None:
+            table.store(
+                key,
+                depth,
+                EXACT,
+                best_scores[slot],
+                self.encode_move(board, best_move),
+            )
+        return best_scores, best_move
+
+    @staticmethod
+    def encode_move(board, move):
+        if move is None:
+            return NO_MOVE
+        piece, destination = move
+        return piece.pid * 256 + board.geometry.index[destination]
+
+    @staticmethod
+    def decode_move(board, code):
+        """Returns the (piece, (q, r)) move of a table entry if it is legal here."""
+        if code == NO_MOVE:
+            return None
+        piece = board.pieces[code // 256]
+        destination = board.geometry.cells[code % 256]
+        if piece.color != board.players[board.current_player_index].color:
+            return None  # Key collision
+        if destination not in piece.all_possible_moves(board):
+            return None
+        return piece, destination
+
     def evaluate_board(self, board):
         """Evaluates the board based on the relative score difference."""
         board.update_all_scores()
-        print([player.relative_score for player in board.players])
+        logging.debug([player.relative_score for player in board.players])
         return self.relative_score
 
-    def copy_board_state(self, board):
-        """Creates a lightweight copy of the board with only the data needed for MinMax."""
-        new_board = type(board)()
-
-        new_pieces = [self.copy_piece(p) for p in board.pieces]
-        new_board.pieces = new_pieces
-        new_board.pieces_by_pos = {(p.q, p.r): p for p in new_pieces}
+    @staticmethod
+    def score_shares(board):
+        """Positive parts of the relative scores, rescaled to sum to MAXN_TOTAL.
 
-        pieces_by_color: dict[tuple[int, int, int], list] = {}
-        for piece in new_pieces:
-            pieces_by_color.setdefault(piece.color, []).append(piece)
-
-        new_board.players = [
-            type(player)(player.color, pieces_by_color[player.color])
-            for player in board.players
-        ]
+        Indexed by player slot, eliminated players get 0.
+        """
+        board.update_all_scores()
+        relative = [0] * len(board.players_by_slot)
+        for player in board.players:
+            relative[player.slot] = player.relative_score
+        return MinMaxPlayer.shares_of(relative)
 
-        new_board.current_player_index = board.current_player_index
-        new_board.rl = True
-        return new_board
-
-    def copy_piece(self, piece):
-        """Creates a copy of a piece with only the essential attributes."""
-        # Create a new instance with all required arguments
-        new_piece = type(piece)(
-            q=piece.q,
-            r=piece.r,
-            color=piece.color,
-            piece_class=piece.piece_class,
-            svg_path=piece.svg_path if hasattr(piece, "svg_path") else None,
-        )
-        new_piece.is_dead = piece.is_dead
-        return new_piece
+    @staticmethod
+    def shares_of(relative):
+        """Score shares of a relative score per slot (0 out of the turn order)."""
+        shares = [max(0.0, float(score)) for score in relative]
+        total = sum(shares)
+        if not total:
+            return shares
+        return [share * MAXN_TOTAL / total for share in shares]
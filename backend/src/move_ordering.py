@@ -0,0 +1,129 @@
+from array import array
+
+from backend.src.constants import CENTRAL_CELL
+from backend.src.state import DEAD, PIECE_CLASSES
+
+NB_KILLERS = 2  # Killer moves kept per ply
+# Tiers of the ordering keys, above any history score
+CAPTURE = 3 << 40
+CENTRAL = 2 << 40
+KILLER = 1 << 40
+
+
+class MoveOrderer:
+    """Orders the full legal move list of the player to move for the search.
+
+    Moves that kill come first, most valuable victim then least valuable
+    attacker (std_value): moves onto an enemy piece other than the
+    diplomat's (it only displaces it) and reporter moves next to an enemy
+    piece, scored by the best victim at hand. Then come the chief entries in the central
+    cell, then the killer moves of the ply (quiet moves that caused a cutoff
+    at the same distance from the root), and the other moves by their
+    history score, indexed by (piece class, from cell, to cell) and raised
+    by depth * depth at each cutoff. Shared by the bots, like the
+    transposition table.
+    """
+
+    def __init__(self, nb_cells):
+        self.nb_cells = nb_cells
+        self.history = array("q", bytes(8 * len(PIECE_CLASSES) * nb_cells * nb_cells))
+        self.touched = set()  # History entries that are not 0
+        self.killers = []  # Per ply, encoded moves (piece id * 256 + cell)
+        self.nodes = 0  # Nodes whose moves were searched
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0  # Cutoffs by the first move searched
+
+    def new_search(self):
+        """Forgets the killers of the previous root, ages the history."""
+        self.killers = []
+        history = self.history
+        for i in list(self.touched):
+            history[i] >>= 1
+            if not history[i]:
+                self.touched.discard(i)
+
+    @staticmethod
+    def victim_value(board, piece, cell):
+        """std_value of the enemy piece the move of piece to cell kills (the
+        most valuable one for a reporter), None for a move that kills none."""
+        state = board.state
+        buf, owners = state.buf, state.layout.piece_owner
+        own = buf[owners + piece.pid]
+        if piece.piece_class == "reporter":
+            cells = board.geometry.neighbours[cell] if not buf[cell] else ()
+        elif piece.piece_class == "diplomat":
+            return None
+        else:
+            cells = (cell,)
+        best = None
+        for target in cells:
+            occupant = buf[target]
+            if occupant and buf[owners + occupant - 1] not in (DEAD, own):
+                value = board.pieces[occupant - 1].std_value
+                if best is None or value > best:
+                    best = value
+        return best
+
+    def history_index(self, board, piece, cell):
+        return (
+            board.state.piece_class(piece.pid) * self.nb_cells + piece.cell
+        ) * self.nb_cells + cell
+
+    def order(self, board, moves, ply, first_moves=()):
+        """Returns the (piece, (q, r)) moves sorted for the search.
+
+        first_moves (table move, previous iteration move) go before all.
+        """
+        index = board.geometry.index
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        central = index[CENTRAL_CELL]
+        keys = {}
+        for move in moves:
+            piece, destination = move
+            cell = index[destination]
+            victim = self.victim_value(board, piece, cell)
+            if victim is not None:
+                keys[move] = CAPTURE + victim * 64 - piece.std_value
+            elif cell == central and piece.piece_class == "chief":
+                keys[move] = CENTRAL
+            elif piece.pid * 256 + cell in killers:
+                keys[move] = KILLER + NB_KILLERS - killers.index(piece.pid * 256 + cell)
+            else:
+                keys[move] = self.history[self.history_index(board, piece, cell)]
+        ordered = sorted(moves, key=keys.__getitem__, reverse=True)
+        for move in reversed(first_moves):
+            if move is not None and move in keys:
+                ordered.remove(move)
+                ordered.insert(0, move)
+        return ordered
+
+    def record_cutoff(self, board, move, ply, depth, move_number):
+        """Updates the statistics, killers and history after a cutoff."""
+        self.cutoffs += 1
+        if move_number == 0:
+            self.first_move_cutoffs += 1
+        piece, destination = move
+        cell = board.geometry.index[destination]
+        if self.victim_value(board, piece, cell) is not None:
+            return  # Captures are already ordered first
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        code = piece.pid * 256 + cell
+        if code not in killers:
+            killers.insert(0, code)
+            del killers[NB_KILLERS:]
+        i = self.history_index(board, piece, cell)
+        self.history[i] += depth * depth
+        self.touched.add(i)
+
+    def stats(self):
+        return {
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_rate": (
+                self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+            ),
+            "cutoff_rate": self.cutoffs / self.nodes if self.nodes else 0.0,
+        }
@@ -0,0 +1,77 @@
+import atexit
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Pools of the parent process, by number of workers
+_executors: dict = {}
+# Boards of a worker process, by number of players, reused between tasks so
+# that their transposition table and move orderer stay warm
+_boards: dict = {}
+
+
+def get_executor(workers):
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return executor
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown(cancel_futures=True)
+    _executors.clear()
+
+
+atexit.register(shutdown_executors)
+
+
+def worker_board(nb_players, state, tt_size_mb):
+    """Board of the worker process, set to the state bytes sent by the parent,
+    with a transposition table of tt_size_mb."""
+    from backend.src.board import Board  # board imports minmax_player
+    from backend.src.transposition import TranspositionTable
+
+    board = _boards.get(nb_players)
+    if board is None:
+        board = _boards[nb_players] = Board(nb_players)
+        board.rl = True
+    board.load_state(state)
+    table = board.transposition_table
+    if table is None or table.size_mb != tt_size_mb:
+        board.transposition_table = TranspositionTable(tt_size_mb)
+    return board
+
+
+def search_root_moves(
+    nb_players, state, slot, settings, depth, codes, time_budget, alpha=float("-inf")
+):
+    """Worker task: scores the encoded root moves for the player of slot.
+
+    settings are the search attributes of the calling player
+    (MinMaxPlayer.search_settings), applied to the worker's player.
+
+    Returns the (code, score) of the moves searched and whether the time
+    budget (seconds, None for no limit) ran out before the last one. Scores
+    at or below alpha are upper bounds.
+    """
+    from backend.src.minmax_player import SearchTimeout
+
+    board = worker_board(nb_players, state, settings["tt_size_mb"])
+    player = board.players_by_slot[slot]
+    for name, value in settings.items():
+        setattr(player, name, value)
+    player.prepare_search(board)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    results: list[tuple[int, float]] = []
+    for code in codes:
+        move = player.decode_move(board, code)
+        if move is None:
+            continue
+        try:
+            score = player.root_move_score(
+                board, move, depth, board.transposition_table, deadline, alpha
+            )
+        except SearchTimeout:
+            return results, True
+        results.append((code, score))
+    return results, False
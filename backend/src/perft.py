@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import random
+import time
+
+from backend.src.board import Board
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "perft_corpus.json")
+# Pieces that send the piece on their destination cell to a chosen free cell
+# (the assassin leaves it on its own start cell, the reporter never lands on one)
+PLACING_CLASSES = ("militant", "chief", "diplomat", "necromobile")
+
+
+def legal_moves(board):
+    """Full moves of the player to move, as accepted by Board.make_move.
+
+    A move onto an occupied cell is expanded into one move per free cell
+    where the displaced piece can be placed, (piece, (q, r), (q, r)).
+    """
+    players = board.players
+    if len(players) < 2:
+        return []
+    free_cells = board.get_unoccupied_cells()
+    buf, index = board.state.buf, board.geometry.index
+    moves: list[tuple] = []
+    for piece, destination in players[board.current_player_index].get_all_valid_moves(
+        board
+    ):
+        if buf[index[destination]] and piece.piece_class in PLACING_CLASSES:
+            moves.extend((piece, destination, cell) for cell in free_cells)
+        else:
+            moves.append((piece, destination))
+    return moves
+
+
+def perft(board, depth):
+    """Number of positions reached by playing every legal sequence of depth
+    moves. A position without legal moves (end of the game) counts for 0."""
+    if depth == 0:
+        return 1
+    moves = legal_moves(board)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        record = board.make_move(move)
+        try:
+            nodes += perft(board, depth - 1)
+        finally:
+            board.unmake_move(record)
+    return nodes
+
+
+def move_name(move):
+    piece, (q, r), *placement = move
+    name = f"{piece.name} {piece.piece_class} ({piece.q}, {piece.r}) -> ({q}, {r})"
+    if placement:
+        name += f" placing at {placement[0]}"
+    return name
+
+
+def divide(board, depth):
+    """perft of each root move, keyed by move_name."""
+    counts = {}
+    for move in legal_moves(board):
+        name = move_name(move)  # Before the piece moves
+        record = board.make_move(move)
+        try:
+            counts[name] = perft(board, depth - 1)
+        finally:
+            board.unmake_move(record)
+    return counts
+
+
+def load_position(nb_players, state_hex=None):
+    """Board of the variant, set to the hex encoded state bytes if given."""
+    board = Board(nb_players)
+    board.rl = True
+    if state_hex is not None:
+        board.load_state(bytes.fromhex(state_hex))
+    return board
+
+
+def random_position(nb_players, nb_plies, seed):
+    """State reached by nb_plies random turns, or None if the game ended."""
+    random.seed(seed)
+    board = load_position(nb_players)
+    for _ in range(nb_plies):
+        if len(board.players) < 2:
+            return None
+        board.players[board.current_player_index].play_turn(board)
+        board.next_player()
+    return bytes(board.state.buf).hex()
+
+
+def build_corpus(depths):
+    """Opening positions and seeded mid-game positions, with their counts.
+
+    depths maps the number of players to the deepest perft stored.
+    """
+    corpus = []
+    for nb_players, depth in depths.items():
+        positions = [(f"opening {nb_players}p", None)]
+        for nb_plies, seed in ((12, 1), (30, 2)):
+            positions.append(
+                (
+                    f"{nb_plies} plies {nb_players}p seed {seed}",
+                    random_position(nb_players, nb_plies, seed),
+                )
+            )
+        for name, state_hex in positions:
+            board = load_position(nb_players, state_hex)
+            counts = [perft(board, d) for d in range(1, depth + 1)]
+            corpus.append(
+                {
+                    "name": name,
+                    "nb_players": nb_players,
+                    "state": state_hex or bytes(board.state.buf).hex(),
+                    "counts": counts,
+                }
+            )
+            print(f"{name}: {counts}")
+    return corpus
+
+
+def check_corpus(corpus):
+    """Recounts every corpus position, returns the number of mismatches."""
+    failures = 0
+    for entry in corpus:
+        board = load_position(entry["nb_players"], entry["state"])
+        for depth, expected in enumerate(entry["counts"], start=1):
+            start = time.perf_counter()
+            nodes = perft(board, depth)
+            elapsed = time.perf_counter() - start
+            status = "ok" if nodes == expected else f"FAILED (expected {expected})"
+            if nodes != expected:
+                failures += 1
+            print(
+                f"{entry['name']} depth {depth}: {nodes} {status}, "
+                f"{nodes / max(elapsed, 1e-9):.0f} nodes/s"
+            )
+    return failures
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Move generation counter.")
+    parser.add_argument("--nb_player_mode", type=int, choices=[3, 4, 6], default=3)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--state", help="Hex encoded state (default: opening)")
+    parser.add_argument("--divide", action="store_true", help="Counts per root move")
+    parser.add_argument(
+        "--check", action="store_true", help="Recount the golden corpus"
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="Rebuild the golden corpus"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.update:
+        corpus = build_corpus({3: 3, 4: 2, 6: 2})
+        with open(CORPUS_PATH, "w") as f:
+            json.dump(corpus, f, indent=2)
+            f.write("\n")
+        return
+    if args.check:
+        with open(CORPUS_PATH) as f:
+            corpus = json.load(f)
+        failures = check_corpus(corpus)
+        print(f"{failures} mismatch(es)")
+        raise SystemExit(1 if failures else 0)
+
+    board = load_position(args.nb_player_mode, args.state)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(board, args.depth)
+        for name, nodes in counts.items():
+            print(f"{name}: {nodes}")
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(board, args.depth)
+    elapsed = time.perf_counter() - start
+    print(
+        f"perft({args.depth}) = {nodes}, {elapsed:.2f} s, "
+        f"{nodes / max(elapsed, 1e-9):.0f} nodes/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,99 @@
 import logging
 import math
 import random
-from io import BytesIO
-
-import cairosvg
-import pygame
 
 from backend.src.constants import *
+from backend.src.state import DEAD, PIECE_CLASSES
 
 
 class Piece:
-    necromobile_image = None
-
-    def __init__(
-        self,
-        q,
-        r,
-        color,
-        piece_class,
-        svg_path=None,
-        menace_score=0,
-        opportunity_score=0,
-        std_value=1,
-    ):
-        self.q = q  # Coordonnée hexagonale q
-        self.r = r  # Coordonnée hexagonale r
-        self.color = color  # Couleur de la pièce
-        self.is_dead = False  # Indique si la pièce est morte ou non
-        self.piece_class = piece_class  # Classe de la pièce (e.g., 'assassin', 'chief')
+    """View of one piece of a GameState.
+
+    Position, owner and life are read from the state buffer, the piece only
+    keeps its id and the caches used for display and move scoring.
+    """
+
+    base_value = 1  # Standard value of the piece class
+
+    def __init__(self, state, pid, svg_path=None):
+        self.state = state
+        self.pid = pid  # Index of the piece records in the state
+        self.piece_class = PIECE_CLASSES[state.piece_class(pid)]
         self.svg_path = svg_path  # Ajout de cet attribut
-        self.class_image = None  # Ne pas stocker l'image ici
-        names = {
-            (128, 0, 128): "Violet",
-            (0, 0, 255): "Bleu",
-            (255, 0, 0): "Rouge",
-            (255, 105, 180): "Rose",
-            (255, 255, 0): "Jaune",
-            (0, 255, 0): "Vert",
-            (100, 100, 100): "Mort",
-        }
-        self.name = names[color]
-        self.on_central_cell = (
-            False  # New attribute to track if the chief is on the central cell
-        )
+        self.class_image = None  # Chargée par le BoardRenderer
 
-        # self.menace_score = menace_score
-        # self.opportunity_score = opportunity_score
         self.opportunity_moves = {}
-        self.threaten = []
-        self.protect = []
-        self.is_threatened_by = []
-        self.is_protected_by = []
-        self.std_value = std_value
         self.possible_moves = []
         self.best_moves = {}
         self.threat_score = 0
 
-    def remove_threat_and_protections_after_move(self):
-        for piece in self.threaten:
-            piece.is_threatened_by.remove(self)
-        for piece in self.protect:
-            piece.is_protected_by.remove(self)
-        self.threaten = []
-        self.protect = []
-
-    def update_threat_and_protections(self, board):
-        self.remove_threat_and_protections_after_move()
-
-        possible_moves = self.all_possible_moves(board)
-        pieces = [board.get_piece_at(q, r) for q, r in possible_moves]
-        pieces = [p for p in pieces if p]  # Filtrer les cases vides
-        self.threaten = [p for p in pieces if p.color != self.color]
-        self.protect = [p for p in pieces if p.color == self.color]
-        for piece in pieces:
-            if piece in self.threaten:
-                piece.is_threatened_by.append(self)
-
-            elif piece in self.protect:
-                piece.is_protected_by.append(self)
+    @property
+    def cell(self):
+        """Cell number of the piece in the board geometry."""
+        return self.state.buf[self.state.layout.piece_cell + self.pid]
+
+    @property
+    def q(self):
+        return self.state.layout.geometry.cells[self.cell][0]
+
+    @property
+    def r(self):
+        return self.state.layout.geometry.cells[self.cell][1]
+
+    @property
+    def owner(self):
+        """Slot of the owning player, DEAD for a dead piece."""
+        return self.state.buf[self.state.layout.piece_owner + self.pid]
+
+    @property
+    def is_dead(self):
+        return self.owner == DEAD
+
+    @property
+    def color(self):
+        owner = self.owner
+        return DARKER_GREY if owner == DEAD else self.state.layout.colors[owner]
+
+    @color.setter
+    def color(self, color):
+        if color == DARKER_GREY:
+            self.state.set_owner(self.pid, DEAD)
+        else:
+            self.state.set_owner(self.pid, self.state.layout.colors.index(color))
+
+    @property
+    def name(self):
+        return COLOR_NAMES[self.color]
+
+    @property
+    def on_central_cell(self):
+        return False  # Only a chief can hold the central cell
+
+    @property
+    def std_value(self):
+        return self.base_value
 
     def evaluate_threat_score(self, board):
+        attacks = board.attacks.refresh()
         threat_score = 0
         threatened_score = 0
 
-        is_protected = 1 if len(self.is_protected_by) > 0 else 0
-        for threat in self.is_threatened_by:
-            threatened_score += max(0, self.std_value - threat.std_value * is_protected)
+        is_protected = 1 if attacks.nb_protections[self.pid] > 0 else 0
+        for threat in attacks.threatened_by[self.pid]:
+            threatened_score += max(
+                0, self.std_value - board.pieces[threat].std_value * is_protected
+            )
 
-        if isinstance(self, ChiefPiece) and (0, 0) in self.possible_moves:
+        if isinstance(self, ChiefPiece) and CENTRAL_CELL in attacks.moves[self.pid]:
             threat_score += 2 * self.std_value * (len(board.players) - 2)
 
-        for target in self.threaten:
-            is_protected = 1 if len(target.is_protected_by) > 0 else 0
-            threat_score += max(0, target.std_value - self.std_value * is_protected)
+        for target, is_threat in attacks.targets[self.pid]:
+            if not is_threat:
+                continue
+            is_protected = 1 if attacks.nb_protections[target] > 0 else 0
+            threat_score += max(
+                0, board.pieces[target].std_value - self.std_value * is_protected
+            )
 
         self.threat_score = threat_score - threatened_score * self.std_value * (
             len(board.players) - 1
@@ -101,19 +102,20 @@ class Piece:
 
     def update_piece_best_moves(self, board):
         # self.opportunity_moves = {(self, (p.q, p.r)): {'victim_value': p.std_value, 'protected_value': len(p.is_protected_by)} for p in self.threaten}
-        is_protected = 1 if len(self.is_protected_by) > 0 else 0
+        attacks = board.attacks.refresh()
+        is_protected = 1 if attacks.nb_protections[self.pid] > 0 else 0
 
         get_out_score = 0
-        for threat in self.is_threatened_by:
+        for threat in attacks.threatened_by[self.pid]:
             get_out_score += max(
-                0, self.std_value - threat.std_value * is_protected
+                0, self.std_value - board.pieces[threat].std_value * is_protected
             ) * (len(board.players) - 1)
 
         best_moves: dict[tuple, float] = {}
-        possible_moves = self.all_possible_moves(board)
+        possible_moves = attacks.moves[self.pid]
 
         if isinstance(self, ChiefPiece) and (0, 0) in possible_moves:
-            best_moves[(self, possible_moves)] = (
+            best_moves[(self, CENTRAL_CELL)] = (
                 2 * self.std_value * (len(board.players) - 2)
             )
 
@@ -121,8 +123,11 @@ class Piece:
             for move in possible_moves:
                 best_moves[(self, move)] = get_out_score
 
-        for target in self.threaten:
-            is_protected = 1 if len(target.is_protected_by) > 0 else 0
+        for target, is_threat in attacks.targets[self.pid]:
+            if not is_threat:
+                continue
+            target = board.pieces[target]
+            is_protected = 1 if attacks.nb_protections[target.pid] > 0 else 0
             best_moves[(self, (target.q, target.r))] = (
                 target.std_value
                 - self.std_value * is_protected * (len(board.players) - 1)
@@ -134,83 +139,28 @@ class Piece:
 
     def die(self):
         """Marks the piece as dead and changes its color to grey."""
-        self.is_dead = True
-        self.color = DARKER_GREY  # Grey color for dead pieces
+        self.state.set_owner(self.pid, DEAD)
         logging.debug(f"Piece at {self.q}, {self.r} is dead")
 
-    @staticmethod
-    def load_svg_as_surface(svg_path, target_size=(SIZE_IMAGE, SIZE_IMAGE)):
-        """Loads the SVG file and converts it directly to the desired size."""
-        if IS_PRODUCTION:
-            return None
-        with open(svg_path, "rb") as f:
-            svg_data = f.read()
-        png_data = cairosvg.svg2png(
-            bytestring=svg_data,
-            output_width=target_size[0],
-            output_height=target_size[1],
-        )
-        image = pygame.image.load(BytesIO(png_data))
-        return image  # Return the image directly without resizing
-
-    def load_image(self):
-        # Load the image only when needed
-        self.class_image = self.load_svg_as_surface(self.svg_path)
-
-    @classmethod
-    def load_necromobile_image(cls):
-        if cls.necromobile_image is None:
-            cls.necromobile_image = pygame.transform.scale(
-                cls.load_svg_as_surface(ASSET_PATH + "necromobile.svg"),
-                (SIZE_IMAGE // 2, SIZE_IMAGE // 2),
-            )
-
-    def draw(self, board, screen, is_current_player):
-        x, y = board.hex_to_pixel(self.q, self.r)
-
-        if not self.is_dead:
-            pygame.draw.circle(screen, self.color, (x, y), PIECE_RADIUS)
-            if self.class_image is not None:
-                class_image_rect = self.class_image.get_rect(center=(x, y))
-                screen.blit(self.class_image, class_image_rect)
-
-            if is_current_player:
-                pygame.draw.circle(
-                    screen, GREY, (x, y), PIECE_RADIUS + 2, HIGHLIGHT_WIDTH
-                )
-        else:
-            pygame.draw.circle(screen, GREY, (x, y), PIECE_RADIUS)
-
     def all_possible_moves(self, board):
         """Returns a list of all possible cells where the piece can go."""
         if self.is_dead:
             return []  # cannot move.
 
         possible_moves = []
+        occupied = self.state.buf  # Cells come first in the state buffer
+        geometry = self.state.layout.geometry
+        gated = board.advanced_rules
+        can_enter_center = isinstance(self, ChiefPiece)
         # For each direction, explore cells until encountering an obstacle or board edge
-        for dq, dr in board.directions["all"]:
-            step = 1
-            if (dq, dr) in board.directions["diagonal"]:
-                v1, v2 = board.find_adjacent_vectors(dq, dr)
-            new_q, new_r = self.q, self.r
-            while True:
-                if board.advanced_rules:
-                    if (
-                        (dq, dr) in board.directions["diagonal"]
-                        and board.is_occupied(new_q + v1[0], new_r + v1[1])
-                        and board.is_occupied(new_q + v2[0], new_r + v2[1])
-                    ):
-                        break
-                new_q = self.q + dq * step
-                new_r = self.r + dr * step
-                if not board.is_within_board(new_q, new_r) or board.is_occupied(
-                    new_q, new_r
-                ):
+        for _, ray in geometry.rays[self.cell]:
+            for cell, gate in ray:
+                if gated and gate and occupied[gate[0]] and occupied[gate[1]]:
                     break
-
-                if not (new_q == 0 and new_r == 0 and not isinstance(self, ChiefPiece)):
-                    possible_moves.append((new_q, new_r))
-                step += 1  # Continuer dans la même direction
+                if occupied[cell]:
+                    break
+                if cell != geometry.center or can_enter_center:
+                    possible_moves.append(geometry.cells[cell])
 
         self.possible_moves = possible_moves
         return possible_moves
@@ -218,25 +168,19 @@ class Piece:
     def move(self, new_q, new_r, board):
         if (new_q, new_r) not in self.all_possible_moves(board):
             return False  # new_q, new_r is not a valid move.
-        self.q = new_q
-        self.r = new_r
-        self.update_threat_and_protections(board)
+        board.set_piece_position(self, new_q, new_r)
         return True
 
     def is_surrounded(self, board, visited=None):
         if visited is None:
             visited = set()
-        if (self.q, self.r) in visited:
+        if self.cell in visited:
             return True
-        visited.add((self.q, self.r))
-
-        for dq, dr in board.directions["adjacent"]:
-            new_q = self.q + dq
-            new_r = self.r + dr
+        visited.add(self.cell)
 
-            if not board.is_within_board(new_q, new_r):
-                continue  # Cell outside the board, considered as non-surrounding
-            piece_at_position = board.get_piece_at(new_q, new_r)
+        # Cells outside the board are not listed, they are non-surrounding
+        for cell in board.geometry.neighbours[self.cell]:
+            piece_at_position = board.get_piece_at_cell(cell)
             if piece_at_position is None:
                 return False  # There is an empty cell, so not surrounded
             if piece_at_position.is_dead:
@@ -250,67 +194,32 @@ class Piece:
 
 
 class MilitantPiece(Piece):
-    def __init__(
-        self,
-        q,
-        r,
-        color,
-        piece_class,
-        svg_path,
-        menace_score=0,
-        opportunity_score=0,
-        std_value=1,
-    ):
-        super().__init__(
-            q,
-            r,
-            color,
-            piece_class,
-            svg_path,
-            menace_score,
-            opportunity_score,
-            std_value,
-        )
+    base_value = 1
 
     def all_possible_moves(self, board):
         if self.is_dead:
             return []  # ne peut se déplacer.
         possible_moves = []
+        occupied = self.state.buf
+        owners = self.state.layout.piece_owner - 1  # occupied[cell] is id + 1
+        geometry = self.state.layout.geometry
+        gated = board.advanced_rules
+        me = self.owner
         max_steps = {"adjacent": 2, "diagonal": 1}
 
-        for dq, dr in board.directions["all"]:
-            is_diagonal = (dq, dr) in board.directions["diagonal"]
-            for step in range(
-                1, max_steps["diagonal" if is_diagonal else "adjacent"] + 1
-            ):
-                new_q = self.q + dq * step
-                new_r = self.r + dr * step
-
-                if is_diagonal:
-                    v1, v2 = board.find_adjacent_vectors(dq, dr)
-                    if board.advanced_rules:
-                        if board.is_occupied(
-                            self.q + v1[0], self.r + v1[1]
-                        ) and board.is_occupied(self.q + v2[0], self.r + v2[1]):
-                            break
-
-                if not board.is_within_board(new_q, new_r):
+        for is_diagonal, ray in geometry.rays[self.cell]:
+            nb_steps = max_steps["diagonal" if is_diagonal else "adjacent"]
+            for cell, gate in ray[:nb_steps]:
+                if gated and gate and occupied[gate[0]] and occupied[gate[1]]:
                     break
 
-                piece_at_position = board.get_piece_at(new_q, new_r)
-                if piece_at_position:
-                    if (
-                        piece_at_position.color != self.color
-                        and not piece_at_position.is_dead
-                    ):
-                        possible_moves.append((new_q, new_r))
+                if occupied[cell]:
+                    owner = occupied[owners + occupied[cell]]
+                    if owner != me and owner != DEAD:
+                        possible_moves.append(geometry.cells[cell])
                     break
-                elif not (new_q == 0 and new_r == 0) or (
-                    board.is_occupied(0, 0)
-                    and not isinstance(piece_at_position, ChiefPiece)
-                    and not piece_at_position.is_dead
-                ):  # possibilité d'enlever cette dernière condition selon les règles.
-                    possible_moves.append((new_q, new_r))
+                elif cell != geometry.center:
+                    possible_moves.append(geometry.cells[cell])
         return possible_moves
 
     def move(self, new_q, new_r, board, moved_piece_position=None):
@@ -318,9 +227,7 @@ class MilitantPiece(Piece):
         if (new_q, new_r) not in self.all_possible_moves(board):
             return False  # new_q, new_r is not a valid move.
         target_piece = board.get_piece_at(new_q, new_r)
-        board.animate_move(
-            pygame.display.get_surface(), self, original_q, original_r, new_q, new_r
-        )
+        board.animate_move(self, original_q, original_r, new_q, new_r)
         if (
             target_piece
             and target_piece.color != self.color
@@ -336,41 +243,20 @@ class MilitantPiece(Piece):
                 new_position = moved_piece_position
             else:
                 return False  # moved_piece_position is not a valid position.
-            target_piece.q, target_piece.r = new_position
+            board.set_piece_position(target_piece, *new_position)
             logging.debug(
                 f"The militant killed the piece at {new_q}, {new_r} and moved it to {target_piece.q,}, {target_piece.r}"
             )
 
-        self.q, self.r = new_q, new_r
+        board.set_piece_position(self, new_q, new_r)
         logging.debug(
             f"The militant moved from {original_q}, {original_r} to {new_q}, {new_r}"
         )
-        self.update_threat_and_protections(board)
         return True
 
 
 class AssassinPiece(Piece):
-    def __init__(
-        self,
-        q,
-        r,
-        color,
-        piece_class,
-        svg_path,
-        menace_score=0,
-        opportunity_score=0,
-        std_value=2,
-    ):
-        super().__init__(
-            q,
-            r,
-            color,
-            piece_class,
-            svg_path,
-            menace_score,
-            opportunity_score,
-            std_value,
-        )
+    base_value = 2
 
     def all_possible_moves(self, board):
         """Returns all possible moves for the assassin, including cells occupied by enemies,
@@ -378,48 +264,34 @@ class AssassinPiece(Piece):
         if self.is_dead:
             return []  # cannot move.
         possible_moves = []
-        for dq, dr in board.directions["all"]:
-            step = 1
-            new_q, new_r = self.q, self.r
-            if (dq, dr) in board.directions["diagonal"]:
-                v1, v2 = board.find_adjacent_vectors(dq, dr)
-            while True:
-                if board.advanced_rules:
+        occupied = self.state.buf
+        owners = self.state.layout.piece_owner - 1  # occupied[cell] is id + 1
+        geometry = self.state.layout.geometry
+        gated = board.advanced_rules
+        me = self.owner
+        for _, ray in geometry.rays[self.cell]:
+            for cell, gate in ray:
+                if gated and gate and occupied[gate[0]] and occupied[gate[1]]:
+                    # The assassin slips through if one side is an ally
                     if (
-                        (dq, dr) in board.directions["diagonal"]
-                        and board.is_occupied(new_q + v1[0], new_r + v1[1])
-                        and board.is_occupied(new_q + v2[0], new_r + v2[1])
+                        occupied[owners + occupied[gate[0]]] != me
+                        and occupied[owners + occupied[gate[1]]] != me
                     ):
-                        piece1 = board.get_piece_at(new_q + v1[0], new_r + v1[1])
-                        piece2 = board.get_piece_at(new_q + v2[0], new_r + v2[1])
-                        if (piece1.color != self.color or piece1.is_dead) and (
-                            piece2.color != self.color or piece2.is_dead
-                        ):
-                            break
-                new_q = self.q + dq * step
-                new_r = self.r + dr * step
-
-                if not board.is_within_board(new_q, new_r):
-                    break
+                        break
 
-                piece_at_position = board.get_piece_at(new_q, new_r)
-                if piece_at_position:
-                    if piece_at_position.is_dead:
+                if occupied[cell]:
+                    owner = occupied[owners + occupied[cell]]
+                    if owner == DEAD:
                         break
-                    elif piece_at_position.color != self.color:
+                    elif owner != me:
                         possible_moves.append(
-                            (new_q, new_r)
+                            geometry.cells[cell]
                         )  # The assassin can move to an enemy piece
                         break
                     elif not board.advanced_rules:
                         break
-                elif not (new_q == 0 and new_r == 0) or (
-                    board.is_occupied(0, 0)
-                    and not isinstance(piece_at_position, ChiefPiece)
-                    and not piece_at_position.is_dead
-                ):
-                    possible_moves.append((new_q, new_r))
-                step += 1
+                elif cell != geometry.center:
+                    possible_moves.append(geometry.cells[cell])
         return possible_moves
 
     def move(self, new_q, new_r, board):
@@ -430,9 +302,7 @@ class AssassinPiece(Piece):
         target_piece = board.get_piece_at(new_q, new_r)
 
         # Add the move animation
-        board.animate_move(
-            pygame.display.get_surface(), self, original_q, original_r, new_q, new_r
-        )
+        board.animate_move(self, original_q, original_r, new_q, new_r)
 
         if (
             target_piece
@@ -442,74 +312,44 @@ class AssassinPiece(Piece):
             if isinstance(target_piece, ChiefPiece):
                 board.chief_killed(target_piece, board.get_chief_of_color(self.color))
             target_piece.die()
-            target_piece.q, target_piece.r = original_q, original_r
+            board.set_piece_position(target_piece, original_q, original_r)
             logging.debug(
                 f"The assassin killed the piece at {new_q}, {new_r} and moved it to {original_q}, {original_r}"
             )
 
         # Move the assassin
-        self.q, self.r = new_q, new_r
+        board.set_piece_position(self, new_q, new_r)
         logging.debug(
             f"The assassin moved from {original_q}, {original_r} to {new_q}, {new_r}"
         )
-        self.update_threat_and_protections(board)
         return True
 
 
 class ChiefPiece(Piece):
-    def __init__(
-        self,
-        q,
-        r,
-        color,
-        piece_class,
-        svg_path,
-        menace_score=0,
-        opportunity_score=0,
-        std_value=5,
-    ):
-        super().__init__(
-            q,
-            r,
-            color,
-            piece_class,
-            svg_path,
-            menace_score,
-            opportunity_score,
-            std_value,
-        )
+    base_value = 5
 
     def all_possible_moves(self, board):
         if self.is_dead:
             return []  # cannot move. # The chief no longer moves if on the central cell
         possible_moves = []
-        for dq, dr in board.directions["all"]:
-            step = 1
-            new_q, new_r = self.q, self.r
-            if (dq, dr) in board.directions["diagonal"]:
-                v1, v2 = board.find_adjacent_vectors(dq, dr)
-            while True:
-                if board.advanced_rules:
-                    if (
-                        (dq, dr) in board.directions["diagonal"]
-                        and board.is_occupied(new_q + v1[0], new_r + v1[1])
-                        and board.is_occupied(new_q + v2[0], new_r + v2[1])
-                    ):
-                        break
-                new_q = self.q + dq * step
-                new_r = self.r + dr * step
-                if not board.is_within_board(new_q, new_r):
+        occupied = self.state.buf
+        owners = self.state.layout.piece_owner - 1  # occupied[cell] is id + 1
+        geometry = self.state.layout.geometry
+        gated = board.advanced_rules
+        me = self.owner
+        for _, ray in geometry.rays[self.cell]:
+            for cell, gate in ray:
+                if gated and gate and occupied[gate[0]] and occupied[gate[1]]:
                     break
 
-                piece_at_position = board.get_piece_at(new_q, new_r)
-                if piece_at_position:
-                    if piece_at_position.color != self.color:
-                        if not piece_at_position.is_dead:
-                            possible_moves.append((new_q, new_r))
+                if occupied[cell]:
+                    owner = occupied[owners + occupied[cell]]
+                    if owner != me:
+                        if owner != DEAD:
+                            possible_moves.append(geometry.cells[cell])
                     break
                 else:
-                    possible_moves.append((new_q, new_r))
-                step += 1
+                    possible_moves.append(geometry.cells[cell])
         return possible_moves
 
     def move(self, new_q, new_r, board, moved_piece_position=None):
@@ -517,11 +357,10 @@ class ChiefPiece(Piece):
         if (new_q, new_r) not in self.all_possible_moves(board):
             return False  # new_q, new_r is not a valid move.
         target_piece = board.get_piece_at(new_q, new_r)
+        was_on_central_cell = self.on_central_cell
 
         # Ajouter l'animation du mouvement
-        board.animate_move(
-            pygame.display.get_surface(), self, original_q, original_r, new_q, new_r
-        )
+        board.animate_move(self, original_q, original_r, new_q, new_r)
 
         if (
             target_piece
@@ -538,29 +377,37 @@ class ChiefPiece(Piece):
                 new_position = moved_piece_position
             else:
                 return False  # moved_piece_position is not a valid position.
-            target_piece.q, target_piece.r = new_position
+            board.set_piece_position(target_piece, *new_position)
             logging.debug(
                 f"The chief killed the piece at {new_q}, {new_r} and moved it to {target_piece.q,}, {target_piece.r}"
             )
 
         # Move the chief
-        self.q, self.r = new_q, new_r
+        board.set_piece_position(self, new_q, new_r)
         logging.debug(
             f"The chief moved from {original_q}, {original_r} to {new_q}, {new_r}"
         )
 
-        self.update_threat_and_protections(board)
-
         # Check if the chief is on the central cell
-        if not self.on_central_cell and self.q == 0 and self.r == 0:
+        if not was_on_central_cell and self.on_central_cell:
             self.enter_central_cell(board)
-        elif self.on_central_cell and (self.q != 0 or self.r != 0):
+        elif was_on_central_cell and not self.on_central_cell:
             self.leave_central_cell(board)
         return True
 
+    @property
+    def on_central_cell(self):
+        state = self.state
+        return (
+            not self.is_dead and state.buf[state.layout.geometry.center] == self.pid + 1
+        )
+
+    @property
+    def std_value(self):
+        # The chief is worth more while holding the central cell
+        return self.base_value + 5 if self.on_central_cell else self.base_value
+
     def enter_central_cell(self, board):
-        self.on_central_cell = True
-        self.std_value += 5
         logging.debug(f"Chief {self.name} has entered the central cell!")
         new_order = []
         for player_index in range(
@@ -573,8 +420,6 @@ class ChiefPiece(Piece):
         board.current_player_index = -1
 
     def leave_central_cell(self, board):
-        self.on_central_cell = False
-        self.std_value -= 5
         logging.debug(f"Chief {self.name} is no longer on the central cell.")
         new_order = []
         for player_index in range(
@@ -599,65 +444,31 @@ class ChiefPiece(Piece):
 class DiplomatPiece(Piece):
     """Ajoute un comportement spécifique pour les diplomates."""
 
-    def __init__(
-        self,
-        q,
-        r,
-        color,
-        piece_class,
-        svg_path,
-        menace_score=0,
-        opportunity_score=0,
-        std_value=2,
-    ):
-        super().__init__(
-            q,
-            r,
-            color,
-            piece_class,
-            svg_path,
-            menace_score,
-            opportunity_score,
-            std_value,
-        )
+    base_value = 2
 
     def all_possible_moves(self, board):
         if self.is_dead:
             return []  # ne peut se déplacer.
         possible_moves = []
-        for dq, dr in board.directions["all"]:
-            step = 1
-            new_q, new_r = self.q, self.r
-            if (dq, dr) in board.directions["diagonal"]:
-                v1, v2 = board.find_adjacent_vectors(dq, dr)
-            while True:
-                if board.advanced_rules:
-                    if (
-                        (dq, dr) in board.directions["diagonal"]
-                        and board.is_occupied(new_q + v1[0], new_r + v1[1])
-                        and board.is_occupied(new_q + v2[0], new_r + v2[1])
-                    ):
-                        break
-                new_q = self.q + dq * step
-                new_r = self.r + dr * step
-
-                if not board.is_within_board(new_q, new_r):
+        occupied = self.state.buf
+        owners = self.state.layout.piece_owner - 1  # occupied[cell] is id + 1
+        geometry = self.state.layout.geometry
+        gated = board.advanced_rules
+        me = self.owner
+        for _, ray in geometry.rays[self.cell]:
+            for cell, gate in ray:
+                if gated and gate and occupied[gate[0]] and occupied[gate[1]]:
                     break
 
-                piece_at_position = board.get_piece_at(new_q, new_r)
-                if piece_at_position:
-                    if not piece_at_position.is_dead and (
-                        board.advanced_rules or piece_at_position.color != self.color
+                if occupied[cell]:
+                    owner = occupied[owners + occupied[cell]]
+                    if owner != DEAD and (
+                        board.advanced_rules or owner != me
                     ):  # toutes les pièces sont accessibles
-                        possible_moves.append((new_q, new_r))
+                        possible_moves.append(geometry.cells[cell])
                     break  # Arrêter dans cette direction aprs avoir rencontré une pièce
-                elif not (new_q == 0 and new_r == 0) or (
-                    board.is_occupied(0, 0)
-                    and not isinstance(piece_at_position, ChiefPiece)
-                    and not piece_at_position.is_dead
-                ):
-                    possible_moves.append((new_q, new_r))
-                step += 1
+                elif cell != geometry.center:
+                    possible_moves.append(geometry.cells[cell])
         return possible_moves
 
     def move(self, new_q, new_r, board, moved_piece_position=None):
@@ -666,11 +477,10 @@ class DiplomatPiece(Piece):
             return False  # new_q, new_r is not a valid move.
         target_piece = board.get_piece_at(new_q, new_r)
 
-        board.animate_move(
-            pygame.display.get_surface(), self, original_q, original_r, new_q, new_r
-        )
+        board.animate_move(self, original_q, original_r, new_q, new_r)
 
         if target_piece and not target_piece.is_dead:
+            target_was_on_central_cell = target_piece.on_central_cell
             # Trouver une case libre aléatoire
             unoccupied_cells = board.get_unoccupied_cells()
             if not moved_piece_position:
@@ -680,80 +490,46 @@ class DiplomatPiece(Piece):
             else:
                 return False  # moved_piece_position is not a valid position.
             # Déplacer la pièce rencontrée vers la nouvelle position
-            target_piece.q, target_piece.r = new_position
+            board.set_piece_position(target_piece, *new_position)
             logging.debug(
                 f"Le diplomate {self.name} a déplacé le {target_piece.piece_class} {target_piece.name} de {new_q}, {new_r} vers {new_position}"
             )
 
-            if isinstance(target_piece, ChiefPiece) and target_piece.on_central_cell:
+            if target_was_on_central_cell:
                 target_piece.leave_central_cell(board)
 
         # Déplacer le diplomate
-        self.q, self.r = new_q, new_r
+        board.set_piece_position(self, new_q, new_r)
         logging.debug(
             f"Le diplomate s'est déplacé de {original_q}, {original_r} à {new_q}, {new_r}"
         )
-        self.update_threat_and_protections(board)
         return True
 
 
 class NecromobilePiece(Piece):
     """Ajoute un comportement spécifique pour les necromobiles."""
 
-    def __init__(
-        self,
-        q,
-        r,
-        color,
-        piece_class,
-        svg_path,
-        menace_score=0,
-        opportunity_score=0,
-        std_value=3,
-    ):
-        super().__init__(
-            q,
-            r,
-            color,
-            piece_class,
-            svg_path,
-            menace_score,
-            opportunity_score,
-            std_value,
-        )
+    base_value = 3
 
     def all_possible_moves(self, board):
         if self.is_dead:
             return []  # ne peut se dplacer.
         possible_moves = []
-        for dq, dr in board.directions["all"]:
-            step = 1
-            new_q, new_r = self.q, self.r
-            if (dq, dr) in board.directions["diagonal"]:
-                v1, v2 = board.find_adjacent_vectors(dq, dr)
-            while True:
-                if board.advanced_rules:
-                    if (
-                        (dq, dr) in board.directions["diagonal"]
-                        and board.is_occupied(new_q + v1[0], new_r + v1[1])
-                        and board.is_occupied(new_q + v2[0], new_r + v2[1])
-                    ):
-                        break
-                new_q = self.q + dq * step
-                new_r = self.r + dr * step
-                if not board.is_within_board(new_q, new_r):
+        occupied = self.state.buf
+        owners = self.state.layout.piece_owner - 1  # occupied[cell] is id + 1
+        geometry = self.state.layout.geometry
+        gated = board.advanced_rules
+        for _, ray in geometry.rays[self.cell]:
+            for cell, gate in ray:
+                if gated and gate and occupied[gate[0]] and occupied[gate[1]]:
                     break
 
-                piece_at_position = board.get_piece_at(new_q, new_r)
-                if piece_at_position:
-                    if piece_at_position.is_dead:
-                        possible_moves.append((new_q, new_r))
+                if occupied[cell]:
+                    if occupied[owners + occupied[cell]] == DEAD:
+                        possible_moves.append(geometry.cells[cell])
                     break  # Arrêter dans cette direction après avoir rencontré une pièce
-                elif not (new_q == 0 and new_r == 0) or (
-                    board.is_occupied(0, 0) and piece_at_position.is_dead
-                ):
-                    possible_moves.append((new_q, new_r))
-                step += 1
+                elif cell != geometry.center:
+                    possible_moves.append(geometry.cells[cell])
         return possible_moves
 
     def move(self, new_q, new_r, board, moved_piece_position=None):
@@ -762,9 +538,7 @@ class NecromobilePiece(Piece):
             return False  # new_q, new_r is not a valid move.
 
         target_piece = board.get_piece_at(new_q, new_r)
-        board.animate_move(
-            pygame.display.get_surface(), self, original_q, original_r, new_q, new_r
-        )
+        board.animate_move(self, original_q, original_r, new_q, new_r)
 
         if target_piece and target_piece.is_dead:
             # Trouver une case libre aléatoire
@@ -776,41 +550,20 @@ class NecromobilePiece(Piece):
             else:
                 return False  # moved_piece_position is not a valid position.
             # Déplacer la pièce rencontrée vers la nouvelle position
-            target_piece.q, target_piece.r = new_position
+            board.set_piece_position(target_piece, *new_position)
             logging.debug(
                 f"Le necromobile a déplacé la pièce de {new_q}, {new_r} vers {new_position}"
             )
         # Déplacer le necromobile
-        self.q, self.r = new_q, new_r
+        board.set_piece_position(self, new_q, new_r)
         logging.debug(
             f"Le necromobile s'est déplacé de {original_q}, {original_r} à {new_q}, {new_r}"
         )
-        self.update_threat_and_protections(board)
         return True
 
 
 class ReporterPiece(Piece):
-    def __init__(
-        self,
-        q,
-        r,
-        color,
-        piece_class,
-        svg_path,
-        menace_score=0,
-        opportunity_score=0,
-        std_value=2,
-    ):
-        super().__init__(
-            q,
-            r,
-            color,
-            piece_class,
-            svg_path,
-            menace_score,
-            opportunity_score,
-            std_value,
-        )
+    base_value = 2
 
     def all_possible_moves(self, board):
         """Le reporter peut se déplacer normalement."""
@@ -820,23 +573,18 @@ class ReporterPiece(Piece):
         """Déplace le reporter et tue les pièces adverses autour de sa nouvelle position."""
         # Effectuer le déplacement
         original_q, original_r = self.q, self.r
-        self.q = new_q
-        self.r = new_r
+        board.set_piece_position(self, new_q, new_r)
 
         # Ajouter l'animation du mouvement
-        board.animate_move(
-            pygame.display.get_surface(), self, original_q, original_r, new_q, new_r
-        )
+        board.animate_move(self, original_q, original_r, new_q, new_r)
 
         # Tuer les ennemis adjacents après le déplacement
         if board.advanced_rules:
-            for dq, dr in board.directions["adjacent"]:
-                adjacent_q = self.q + dq
-                adjacent_r = self.r + dr
-                piece = board.get_piece_at(adjacent_q, adjacent_r)
+            for cell in board.geometry.neighbours[self.cell]:
+                piece = board.get_piece_at_cell(cell)
                 if piece and piece.color != self.color and not piece.is_dead:
                     logging.debug(
-                        f"Le reporter tue la pièce ennemie en {adjacent_q}, {adjacent_r}"
+                        f"Le reporter tue la pièce ennemie en {piece.q}, {piece.r}"
                     )
                     if isinstance(piece, ChiefPiece):
                         board.chief_killed(piece, board.get_chief_of_color(self.color))
@@ -844,10 +592,8 @@ class ReporterPiece(Piece):
         else:
             # implement only one kill from the reporter.
             adjacent_enemies = []
-            for dq, dr in board.directions["adjacent"]:
-                adjacent_q = self.q + dq
-                adjacent_r = self.r + dr
-                piece = board.get_piece_at(adjacent_q, adjacent_r)
+            for cell in board.geometry.neighbours[self.cell]:
+                piece = board.get_piece_at_cell(cell)
                 if piece and piece.color != self.color and not piece.is_dead:
                     adjacent_enemies.append(piece)
 
@@ -863,12 +609,11 @@ class ReporterPiece(Piece):
                     )
                 target_piece.die()
 
-        self.update_threat_and_protections(board)
         return True
 
 
-def create_piece(q, r, color, piece_class, svg_path):
-    """Crée une pièce de la classe appropriée."""
+def create_piece(state, pid, svg_path):
+    """Crée la vue de la pièce pid de l'état, de la classe appropriée."""
     class_mapping = {
         "militant": MilitantPiece,
         "assassin": AssassinPiece,
@@ -878,8 +623,7 @@ def create_piece(q, r, color, piece_class, svg_path):
         "reporter": ReporterPiece,
     }
 
-    piece_class_constructor = class_mapping.get(piece_class, Piece)
-    piece = piece_class_constructor(q, r, color, piece_class, svg_path)
-    if not IS_PRODUCTION:  # Only load image if not in production
-        piece.load_image()  # Charger l'image immédiatement après la création
-    return piece
+    piece_class_constructor = class_mapping.get(
+        PIECE_CLASSES[state.piece_class(pid)], Piece
+    )
+    return piece_class_constructor(state, pid, svg_path)
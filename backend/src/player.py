@@ -1,66 +1,44 @@
 import random
 
+from backend.src.constants import COLOR_NAMES
+
 
 class Player:
-    def __init__(self, color, pieces):
-        self.color = color
-        names = {
-            (128, 0, 128): "Violet",
-            (0, 0, 255): "Bleu",
-            (255, 0, 0): "Rouge",
-            (255, 105, 180): "Rose",
-            (255, 255, 0): "Jaune",
-            (0, 255, 0): "Vert",
-        }
-        self.name = names[color]
-        self.pieces = pieces
+    """View of one player slot of the board state."""
+
+    def __init__(self, board, slot):
+        self.board = board
+        self.slot = slot  # Index of the player in the state records
+        self.color = board.state.layout.colors[slot]
+        self.name = COLOR_NAMES[self.color]
         self.score = 0
         self.relative_score = 0
         self.threat_score = 0
 
+    @property
+    def pieces(self):
+        """Alive pieces currently owned by the player."""
+        owners = self.board.state.buf
+        offset = self.board.state.layout.piece_owner
+        return [p for p in self.board.pieces if owners[offset + p.pid] == self.slot]
+
     def compute_score(self, board):
         """Calcule le score actuel du joueur en fonction des pièces qu'il possède."""
-        piece_values = {
-            "militant": 60,
-            "assassin": 120,
-            "chief": 180,
-            "diplomat": 120,
-            "necromobile": 120,
-            "reporter": 120,
-        }
-        score = sum(
-            piece_values[piece.piece_class]
-            for piece in self.pieces
-            if not piece.is_dead
-        )
-        if any(
-            piece.piece_class == "chief" and not piece.is_dead and piece.on_central_cell
-            for piece in self.pieces
-        ):
-            score += (score - 180) * (
-                len([player for player in board.players if player.color != self.color])
-                - 1
-            )
-
-        self.score = score + self.evaluate_threat_score(board)
+        board.scores.update()  # Running totals of every player
+        return self.score
 
     def compute_relative_score(self, board):
-        self.relative_score = (
-            self.score * 600 // sum(player.score for player in list(set(board.players)))
-        )
+        board.scores.update()
         return self.relative_score
 
     def evaluate_threat_score(self, board):
-        threat_score = 0
-        for piece in self.pieces:
-            threat_score += piece.evaluate_threat_score(board)
-        self.threat_score = threat_score
-        return threat_score
+        board.scores.update()
+        return self.threat_score
 
     def get_all_valid_moves(self, board):
         all_moves = []
         for piece in self.pieces:
-            moves = piece.all_possible_moves(board)
+            moves = board.get_possible_moves(piece)
             if moves:
                 all_moves.extend([(piece, move) for move in moves])
         return all_moves
@@ -75,14 +53,5 @@ class Player:
         piece, move = random.choice(all_moves)
         piece.move(move[0], move[1], board)
 
-    def change_color(self, new_color):
-        self.color = new_color
-        for piece in self.pieces:
-            piece.color = new_color
-
-    def remove_piece(self, piece):
-        self.pieces.remove(piece)
-
     def add_piece(self, piece):
-        self.pieces.append(piece)
-        piece.color = self.color
+        piece.color = self.color  # Ownership is stored in the board state
@@ -0,0 +1,150 @@
+import logging
+
+import pygame
+
+from backend.src.animation import animate_player_elimination, draw_player_turn
+from backend.src.constants import *
+from backend.src.sprites import get_sprite
+
+
+class BoardRenderer:
+    """Pygame display of a Board.
+
+    The rules engine does not import pygame: the client attaches a renderer
+    to the board (board.renderer), which the board only calls back to animate
+    moves and eliminations when it is not in rl mode.
+    """
+
+    def __init__(self, board, screen):
+        self.board = board
+        self.screen = screen
+        board.renderer = self
+        self.load_images()
+        self.board_surface = self.create_board_surface()
+        self.hex_pixel_positions = self.calculate_hex_pixel_positions()
+
+    def load_images(self):
+        # The pieces share the cached surface of their class
+        for piece in self.board.pieces:
+            piece.class_image = get_sprite(piece.svg_path)
+
+    def create_board_surface(self):
+        board = self.board
+        board_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        board_surface.fill(BLACK)
+        for hex_coord in board.hexagons:
+            q, r = hex_coord
+            x, y = board.hex_to_pixel(q, r)
+            pygame.draw.polygon(board_surface, WHITE, board.hex_corners(x, y), 1)
+            if q == 0 and r == 0:
+                pygame.draw.polygon(
+                    board_surface, CENTRAL_WHITE, board.hex_corners(x, y), 0
+                )
+            else:
+                pygame.draw.polygon(board_surface, WHITE, board.hex_corners(x, y), 1)
+        return board_surface
+
+    def calculate_hex_pixel_positions(self):
+        positions = {}
+        for q, r in self.board.hexagons:
+            x, y = self.board.hex_to_pixel(q, r)
+            positions[(q, r)] = (x, y)
+        return positions
+
+    def draw(self, screen, selected_piece=None, piece_to_place=None, moving_piece=None):
+        board = self.board
+        for hex_coord in board.hexagons:
+            x, y = self.hex_pixel_positions[hex_coord]
+            q, r = hex_coord
+            pygame.draw.polygon(screen, WHITE, board.hex_corners(x, y), 1)
+
+            if q == 0 and r == 0:
+                pygame.draw.polygon(
+                    screen, CENTRAL_WHITE, board.hex_corners(x, y), 0
+                )  # Full fill
+            else:
+                pygame.draw.polygon(
+                    screen, WHITE, board.hex_corners(x, y), 1
+                )  # Only the outline
+
+        current_player_color = board.players[board.current_player_index].color
+        for piece in board.pieces:
+            if piece is moving_piece:
+                continue  # Drawn by animate_move
+            is_current_player = (
+                piece.color == current_player_color
+                and selected_piece is None
+                and piece_to_place is None
+            )
+            self.draw_piece(screen, piece, is_current_player)
+
+    def draw_piece(self, screen, piece, is_current_player):
+        x, y = self.board.hex_to_pixel(piece.q, piece.r)
+
+        if not piece.is_dead:
+            pygame.draw.circle(screen, piece.color, (x, y), PIECE_RADIUS)
+            if piece.class_image is not None:
+                class_image_rect = piece.class_image.get_rect(center=(x, y))
+                screen.blit(piece.class_image, class_image_rect)
+
+            if is_current_player:
+                pygame.draw.circle(
+                    screen, GREY, (x, y), PIECE_RADIUS + 2, HIGHLIGHT_WIDTH
+                )
+        else:
+            pygame.draw.circle(screen, GREY, (x, y), PIECE_RADIUS)
+
+    def draw_available_cells(self, screen):
+        """Draws available cells to place the killed piece."""
+        for q, r in self.board.available_cells:
+            x, y = self.board.hex_to_pixel(q, r)
+            pygame.draw.circle(screen, GREY, (int(x), int(y)), 10)
+
+    def draw_possible_moves(self, screen, possible_moves):
+        """Draws possible moves on the screen."""
+        for q, r in possible_moves:
+            x, y = self.board.hex_to_pixel(q, r)
+            pygame.draw.circle(screen, (100, 100, 100), (int(x), int(y)), 10)
+
+    def animate_move(self, piece, start_q, start_r, end_q, end_r):
+        board, screen = self.board, self.screen
+        frames = 30  # Number of frames for animation
+        logging.debug(
+            f"Move animation of {piece.piece_class} {piece.name} from {start_q},{start_r} to {end_q},{end_r}"
+        )
+
+        current_player_index = board.current_player_index
+        next_player_index = (current_player_index + 1) % len(board.players)
+
+        for i in range(frames + 1):
+            t = i / frames
+            current_q = start_q + (end_q - start_q) * t
+            current_r = start_r + (end_r - start_r) * t
+
+            # Redraw the complete board
+            screen.fill(BLACK)
+            self.draw(screen, moving_piece=piece)
+
+            # Draw the moving piece on top
+            x, y = board.hex_to_pixel(current_q, current_r)
+            pygame.draw.circle(screen, piece.color, (int(x), int(y)), PIECE_RADIUS)
+            if piece.class_image:
+                class_image_rect = piece.class_image.get_rect(center=(int(x), int(y)))
+                screen.blit(piece.class_image, class_image_rect)
+
+            # Draw the player order with arrow animation
+            draw_player_turn(
+                screen, board.players, current_player_index, next_player_index, t
+            )
+
+            pygame.display.flip()
+            pygame.time.wait(5)  # Wait 5ms between each frame
+
+        # Redraw one last time to ensure everything is up to date
+        screen.fill(BLACK)
+        self.draw(screen)
+        draw_player_turn(screen, board.players, next_player_index)
+        pygame.display.flip()
+
+    def animate_player_elimination(self, players, eliminated_player_index):
+        animate_player_elimination(self.screen, players, eliminated_player_index, self)
@@ -0,0 +1,74 @@
+from backend.src.state import DEAD
+
+PIECE_VALUES = {
+    "militant": 60,
+    "assassin": 120,
+    "chief": 180,
+    "diplomat": 120,
+    "necromobile": 120,
+    "reporter": 120,
+}
+
+
+class ScoreBoard:
+    """Running score totals of the players of a board.
+
+    Each piece contributes its material and threat score to its owner. Only
+    the pieces listed in AttackGraph.changed are re-evaluated, except when the
+    number of players in the turn order changes (eliminations, central cell),
+    which every threat score depends on.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        layout = board.state.layout
+        self.contributions = [(None, 0, 0)] * layout.nb_pieces  # slot, material, threat
+        self.material = [0] * layout.nb_slots
+        self.threat = [0] * layout.nb_slots
+        self.nb_players = None  # Length of the turn order at the last update
+        self.total = 0  # Shared denominator of the relative scores
+
+    def update(self):
+        """Updates the score, threat_score and relative_score of the players."""
+        board = self.board
+        attacks = board.attacks.refresh()
+        players = board.players
+        if len(players) != self.nb_players:
+            self.nb_players = len(players)
+            changed = range(len(board.pieces))
+        else:
+            changed = attacks.changed
+        owners, offset = board.state.buf, board.state.layout.piece_owner
+        for pid in changed:
+            slot, material, threat = self.contributions[pid]
+            if slot is not None:
+                self.material[slot] -= material
+                self.threat[slot] -= threat
+            piece = board.pieces[pid]
+            slot = owners[offset + pid]
+            if slot == DEAD:
+                self.contributions[pid] = (None, 0, 0)
+                continue
+            material = PIECE_VALUES[piece.piece_class]
+            threat = piece.evaluate_threat_score(board)
+            self.contributions[pid] = (slot, material, threat)
+            self.material[slot] += material
+            self.threat[slot] += threat
+        attacks.changed.clear()
+
+        # A player appears twice in the turn order while its chief is central
+        distinct = list(dict.fromkeys(players))
+        for player in distinct:
+            score = self.material[player.slot]
+            chief = board.pieces[board.state.player_chief(player.slot)]
+            if chief.on_central_cell:
+                score += (score - PIECE_VALUES["chief"]) * (
+                    len(players) - players.count(player) - 1
+                )
+            player.threat_score = self.threat[player.slot]
+            player.score = score + player.threat_score
+        self.total = sum(player.score for player in distinct)
+        for player in distinct:
+            player.relative_score = (
+                player.score * 600 // self.total if self.total else 0
+            )
@@ -0,0 +1,67 @@
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+import pygame
+
+from backend.src.constants import IS_PRODUCTION, SIZE_IMAGE, SPRITE_CACHE_DIR
+
+# (svg path, size) -> surface, shared by every piece of every board
+_sprites: dict = {}
+stats = {"memory_hits": 0, "disk_hits": 0, "rasterized": 0}
+
+
+def sprite_cache_path(svg_data, size):
+    """PNG file of the cache, named after the SVG content and the size."""
+    digest = hashlib.sha1(svg_data).hexdigest()[:16]
+    return os.path.join(SPRITE_CACHE_DIR, f"{digest}_{size[0]}x{size[1]}.png")
+
+
+def rasterize(svg_data, size):
+    import cairosvg  # Only needed when the disk cache is cold
+
+    return cairosvg.svg2png(
+        bytestring=svg_data, output_width=size[0], output_height=size[1]
+    )
+
+
+def get_sprite(svg_path, size=(SIZE_IMAGE, SIZE_IMAGE)):
+    """Returns the shared surface of the SVG file at the given size.
+
+    Each (svg path, size) is read once per process, and rasterized once ever:
+    the PNG is kept under SPRITE_CACHE_DIR for the next runs.
+    """
+    if IS_PRODUCTION:
+        return None
+    key = (svg_path, tuple(size))
+    sprite = _sprites.get(key)
+    if sprite is not None:
+        stats["memory_hits"] += 1
+        return sprite
+
+    with open(svg_path, "rb") as f:
+        svg_data = f.read()
+    png_path = sprite_cache_path(svg_data, size)
+    if os.path.exists(png_path):
+        stats["disk_hits"] += 1
+        sprite = pygame.image.load(png_path)
+    else:
+        stats["rasterized"] += 1
+        png_data = rasterize(svg_data, size)
+        try:
+            os.makedirs(SPRITE_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{png_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png_data)
+            os.replace(tmp_path, png_path)  # Atomic for concurrent runs
+        except OSError as e:
+            logging.warning(f"Unable to write the sprite cache {png_path}: {e}")
+        sprite = pygame.image.load(BytesIO(png_data))
+    _sprites[key] = sprite
+    return sprite
+
+
+def clear_sprites():
+    """Forgets the in-memory sprites (the disk cache is kept)."""
+    _sprites.clear()
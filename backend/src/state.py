@@ -0,0 +1,261 @@
+import random
+from functools import lru_cache
+
+PIECE_CLASSES = ("militant", "assassin", "chief", "diplomat", "necromobile", "reporter")
+CLASS_CODES = {piece_class: code for code, piece_class in enumerate(PIECE_CLASSES)}
+DEAD = 255  # Owner code of a dead piece
+ZOBRIST_SEED = 0x0D7A3B1  # Fixed so that keys match between processes and runs
+
+
+class StateLayout:
+    """Offsets of the records inside a GameState buffer, shared by one variant.
+
+    For C cells, N pieces and P player slots the buffer holds:
+    - C bytes: 0 for an empty cell, otherwise id + 1 of the piece on it
+    - N bytes each: piece cell, piece class code, piece owner slot (DEAD)
+    - P bytes each: player chief id, player alive flag
+    - current player index + 1, id + 1 of the piece waiting to be placed,
+      turn order length, then up to 2 * P turn order slots (a chief on the
+      central cell plays between every other player)
+    """
+
+    def __init__(self, geometry, colors, nb_pieces):
+        self.geometry = geometry
+        self.colors = tuple(colors)  # player slot -> RGB color
+        self.nb_cells = len(geometry.cells)
+        self.nb_pieces = nb_pieces
+        self.nb_slots = len(self.colors)
+
+        self.piece_cell = self.nb_cells
+        self.piece_class = self.piece_cell + nb_pieces
+        self.piece_owner = self.piece_class + nb_pieces
+        self.player_chief = self.piece_owner + nb_pieces
+        self.player_alive = self.player_chief + self.nb_slots
+        self.current = self.player_alive + self.nb_slots
+        self.to_place = self.current + 1
+        self.order_length = self.to_place + 1
+        self.order = self.order_length + 1
+        self.size = self.order + 2 * self.nb_slots
+
+        # Zobrist keys: one per (cell, piece class, owner slot or dead) and one
+        # per (byte, value) for the player records, turn and turn order bytes
+        rng = random.Random(ZOBRIST_SEED)
+        self.zobrist_pieces = [
+            [
+                [rng.getrandbits(64) for _ in range(self.nb_slots + 1)]
+                for _ in PIECE_CLASSES
+            ]
+            for _ in range(self.nb_cells)
+        ]
+        self.zobrist_bytes = [
+            [rng.getrandbits(64) for _ in range(256)]
+            for _ in range(self.player_alive, self.size)
+        ]
+
+
+class GameState:
+    """A whole Djambi position packed in one bytearray (see StateLayout).
+
+    Every write goes through ``set``, which keeps the 64-bit Zobrist ``key``
+    of the position up to date and collects the board cells whose content
+    changed in ``dirty_cells`` (consumed by the AttackGraph). While
+    ``journal`` is a list, the old value of each written byte is appended to
+    it so ``undo`` can roll back.
+    """
+
+    __slots__ = ("layout", "buf", "journal", "key", "dirty_cells")
+
+    def __init__(self, layout, buf=None, key=None):
+        self.layout = layout
+        self.buf = bytearray(layout.size) if buf is None else buf
+        self.journal = None
+        self.key = self.compute_key() if key is None else key
+        self.dirty_cells = set(range(layout.nb_cells))
+
+    def copy(self):
+        return GameState(self.layout, bytearray(self.buf), self.key)
+
+    def set(self, offset, value):
+        buf, layout = self.buf, self.layout
+        old = buf[offset]
+        if old == value:
+            return
+        if self.journal is not None:
+            self.journal.append((offset, old))
+        if offset < layout.nb_cells:
+            # Occupant of a cell: class and owner of the piece leaving / arriving
+            self.dirty_cells.add(offset)
+            self.key ^= self.cell_key(offset, old)
+            buf[offset] = value
+            self.key ^= self.cell_key(offset, value)
+            return
+        if offset >= layout.player_alive:
+            table = layout.zobrist_bytes[offset - layout.player_alive]
+            self.key ^= table[old] ^ table[value]
+        elif layout.piece_owner <= offset < layout.player_chief:
+            # Recolor or death of a piece, hashed where it stands on the board
+            pid = offset - layout.piece_owner
+            cell = buf[layout.piece_cell + pid]
+            self.dirty_cells.add(cell)
+            if buf[cell] == pid + 1:
+                self.key ^= self.cell_key(cell, pid + 1)
+                buf[offset] = value
+                self.key ^= self.cell_key(cell, pid + 1)
+                return
+        buf[offset] = value
+
+    def undo(self, writes, key):
+        """Restores the bytes recorded in a journal and the key from before."""
+        buf, layout, dirty_cells = self.buf, self.layout, self.dirty_cells
+        for offset, value in reversed(writes):
+            buf[offset] = value
+            if offset < layout.nb_cells:
+                dirty_cells.add(offset)
+            elif layout.piece_owner <= offset < layout.player_chief:
+                dirty_cells.add(buf[layout.piece_cell + offset - layout.piece_owner])
+        self.key = key
+
+    # Zobrist key
+
+    def cell_key(self, cell, occupant):
+        """Key of the piece id + 1 ``occupant`` on the cell, 0 for an empty cell."""
+        if not occupant:
+            return 0
+        layout, pid = self.layout, occupant - 1
+        owner = self.buf[layout.piece_owner + pid]
+        return layout.zobrist_pieces[cell][self.buf[layout.piece_class + pid]][
+            layout.nb_slots if owner == DEAD else owner
+        ]
+
+    def compute_key(self):
+        """Full recompute of the Zobrist key, to verify the incremental one."""
+        layout, buf = self.layout, self.buf
+        key = 0
+        for cell in range(layout.nb_cells):
+            key ^= self.cell_key(cell, buf[cell])
+        for i, table in enumerate(layout.zobrist_bytes):
+            key ^= table[buf[layout.player_alive + i]]
+        return key
+
+    # Pieces
+
+    def piece_at(self, cell):
+        """Returns the id of the piece standing on the cell, or None."""
+        occupant = self.buf[cell]
+        return occupant - 1 if occupant else None
+
+    def piece_cell(self, pid):
+        return self.buf[self.layout.piece_cell + pid]
+
+    def piece_class(self, pid):
+        return self.buf[self.layout.piece_class + pid]
+
+    def owner(self, pid):
+        return self.buf[self.layout.piece_owner + pid]
+
+    def move_piece(self, pid, cell):
+        """Moves a piece, freeing its previous cell if it still holds it."""
+        buf, offset = self.buf, self.layout.piece_cell + pid
+        if buf[buf[offset]] == pid + 1:
+            self.set(buf[offset], 0)
+        self.set(offset, cell)
+        self.set(cell, pid + 1)
+
+    def lift_piece(self, pid):
+        """Takes a piece off its cell, e.g. while it waits to be placed."""
+        buf, cell = self.buf, self.buf[self.layout.piece_cell + pid]
+        if buf[cell] == pid + 1:
+            self.set(cell, 0)
+
+    def set_owner(self, pid, owner):
+        self.set(self.layout.piece_owner + pid, owner)
+
+    # Players
+
+    def player_chief(self, slot):
+        return self.buf[self.layout.player_chief + slot]
+
+    def is_alive(self, slot):
+        return bool(self.buf[self.layout.player_alive + slot])
+
+    def set_alive(self, slot, alive):
+        self.set(self.layout.player_alive + slot, 1 if alive else 0)
+
+    def turn_order(self):
+        start = self.layout.order
+        return list(self.buf[start : start + self.buf[self.layout.order_length]])
+
+    def set_turn_order(self, slots):
+        layout = self.layout
+        if len(slots) > 2 * layout.nb_slots:
+            raise ValueError(f"Turn order too long: {slots}")
+        slots = list(slots)
+        self.set(layout.order_length, len(slots))
+        # Unused slots are cleared so that a position has a single encoding
+        for i, slot in enumerate(slots + [0] * (2 * layout.nb_slots - len(slots))):
+            self.set(layout.order + i, slot)
+
+    @property
+    def current_player_index(self):
+        return self.buf[self.layout.current] - 1
+
+    @current_player_index.setter
+    def current_player_index(self, index):
+        self.set(self.layout.current, index + 1)
+
+    @property
+    def piece_to_place(self):
+        occupant = self.buf[self.layout.to_place]
+        return occupant - 1 if occupant else None
+
+    @piece_to_place.setter
+    def piece_to_place(self, pid):
+        self.set(self.layout.to_place, 0 if pid is None else pid + 1)
+
+    def check(self):
+        """Debug check: cells and piece records must agree."""
+        layout, buf = self.layout, self.buf
+        to_place = self.piece_to_place
+        for cell in range(layout.nb_cells):
+            if buf[cell]:
+                pid = buf[cell] - 1
+                assert self.piece_cell(pid) == cell, (
+                    f"Cell {layout.geometry.cells[cell]} holds piece {pid} which "
+                    f"is at {layout.geometry.cells[self.piece_cell(pid)]}"
+                )
+        for pid in range(layout.nb_pieces):
+            if pid != to_place:
+                assert buf[self.piece_cell(pid)] == pid + 1, (
+                    f"Piece {pid} at {layout.geometry.cells[self.piece_cell(pid)]} "
+                    "is missing from its cell"
+                )
+        assert self.key == self.compute_key(), "Zobrist key out of sync"
+
+
+@lru_cache(maxsize=None)
+def get_layout(geometry, colors, nb_pieces):
+    """Returns the shared layout of a variant, Zobrist tables included."""
+    return StateLayout(geometry, colors, nb_pieces)
+
+
+def new_game_state(geometry, colors, start_positions, current_player_index=0):
+    """Builds the starting position: pieces grouped by player, in slot order."""
+    pieces = [
+        (q, r, slot, piece_class)
+        for slot, color in enumerate(colors)
+        for q, r, c, piece_class in start_positions
+        if c == color
+    ]
+    state = GameState(get_layout(geometry, tuple(colors.values()), len(pieces)))
+    layout = state.layout
+    for pid, (q, r, slot, piece_class) in enumerate(pieces):
+        state.set(layout.piece_class + pid, CLASS_CODES[piece_class])
+        state.set_owner(pid, slot)
+        state.move_piece(pid, geometry.index[(q, r)])
+        if piece_class == "chief":
+            state.set(layout.player_chief + slot, pid)
+    for slot in range(layout.nb_slots):
+        state.set_alive(slot, True)
+    state.set_turn_order(range(layout.nb_slots))
+    state.current_player_index = current_player_index
+    return state
@@ -0,0 +1,66 @@
+from array import array
+
+EXACT, LOWER, UPPER = 0, 1, 2  # Bound type of a stored score
+NO_MOVE = -1
+ENTRY_SIZE = 8 + 1 + 1 + 8 + 4  # key, depth, bound, score, move (bytes)
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by Zobrist key.
+
+    Each bucket has two slots: the first keeps the deepest search of the
+    positions mapped to the bucket, the second always takes the latest one.
+    Entries are stored in flat arrays so the memory stays within size_mb.
+    Best moves are encoded as piece id * 256 + destination cell number.
+    """
+
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.nb_buckets = max(1, size_mb * 1024 * 1024 // (2 * ENTRY_SIZE))
+        self.clear()
+
+    def clear(self):
+        nb_slots = 2 * self.nb_buckets
+        self.keys = array("Q", bytes(8 * nb_slots))
+        self.depths = array("b", [-1]) * nb_slots  # -1 marks an empty slot
+        self.bounds = array("B", bytes(nb_slots))
+        self.scores = array("d", bytes(8 * nb_slots))
+        self.moves = array("i", [NO_MOVE]) * nb_slots
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0  # Probes of a bucket filled by other positions
+
+    def probe(self, key):
+        """Returns (depth, bound, score, move) stored for the key, or None."""
+        slot = 2 * (key % self.nb_buckets)
+        for i in (slot, slot + 1):
+            if self.keys[i] == key and self.depths[i] >= 0:
+                self.hits += 1
+                return self.depths[i], self.bounds[i], self.scores[i], self.moves[i]
+        self.misses += 1
+        if self.depths[slot] >= 0 or self.depths[slot + 1] >= 0:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, bound, score, move=NO_MOVE):
+        slot = 2 * (key % self.nb_buckets)
+        if self.keys[slot] == key or depth >= self.depths[slot]:
+            i = slot  # Depth-preferred slot
+        else:
+            i = slot + 1  # Always-replace slot
+        self.keys[i] = key
+        self.depths[i] = min(depth, 127)
+        self.bounds[i] = bound
+        self.scores[i] = score
+        self.moves[i] = move
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "filled": sum(1 for depth in self.depths if depth >= 0),
+            "slots": len(self.depths),
+        }
@@ -0,0 +1,365 @@
+import argparse
+import logging
+import os
+import queue
+import time
+import traceback
+from typing import Dict, List, Tuple
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from .djambi_env import DjambiEnv
+from .dqn_model import DQN, DQNAgent, epsilon_greedy
+from .vec_env import SharedArrays
+
+logger = logging.getLogger(__name__)
+
+
+class TransitionChunks(SharedArrays):
+    """nb_chunks chunks of chunk_len transitions of one actor, in shared memory.
+
+    The actor fills a free chunk and sends its number to the learner, which
+    copies the transitions into its replay buffer and gives the chunk back.
+    ``chained[c, t]`` is set when the state of transition t is the next
+    state of transition t - 1 (same game).
+    """
+
+    def __init__(
+        self,
+        nb_chunks: int,
+        chunk_len: int,
+        board_shape: Tuple[int, ...],
+        nb_players: int,
+        nb_actions: int,
+        *,
+        name=None,
+    ):
+        self.args = (nb_chunks, chunk_len, board_shape, nb_players, nb_actions)
+        n = (nb_chunks, chunk_len)
+        shapes: List[Tuple] = [("actions", n, np.int64), ("rewards", n, np.float32)]
+        for prefix in ("", "next_"):
+            shapes += [
+                (prefix + "board", (*n, *board_shape), np.uint8),
+                (prefix + "player_status", (*n, nb_players), np.int8),
+                (prefix + "current_player", n, np.int8),
+            ]
+        shapes += [
+            ("next_action_mask", (*n, nb_actions), np.int8),
+            ("dones", n, np.bool_),
+            ("chained", n, np.bool_),
+        ]
+        super().__init__(shapes, name)
+
+    def transitions(self, chunk: int):
+        """(state, action, reward, next_state, done) of a chunk, as views. A
+        chained state is the next_state dict of the previous transition."""
+        arrays = self.arrays
+        previous = None
+        for t in range(self.args[1]):
+            if arrays["chained"][chunk, t] and previous is not None:
+                state = previous
+            else:
+                state = {
+                    field: arrays[field][chunk, t]
+                    for field in ("board", "player_status", "current_player")
+                }
+            next_state = {
+                field: arrays["next_" + field][chunk, t]
+                for field in ("board", "player_status", "current_player", "action_mask")
+            }
+            yield (
+                state,
+                arrays["actions"][chunk, t],
+                arrays["rewards"][chunk, t],
+                next_state,
+                arrays["dones"][chunk, t],
+            )
+            previous = next_state
+
+
+def actor_epsilon(index: int, nb_actors: int, eps: float = 0.4, alpha: float = 7.0):
+    """Fixed exploration rate of actor index, eps ** (1 + alpha * i / (N - 1))."""
+    if nb_actors == 1:
+        return eps
+    return eps ** (1 + alpha * index / (nb_actors - 1))
+
+
+def actor(
+    index: int,
+    nb_players: int,
+    epsilon: float,
+    seed: int,
+    shm_name: str,
+    chunk_args,
+    free,
+    ready,
+    errors,
+    shared_net: DQN,
+    version,
+    lock,
+    stop,
+):
+    """Plays DjambiEnv with the last published policy, streams chunks of
+    transitions to the learner. An exception is sent on errors with its
+    traceback."""
+    torch.set_num_threads(1)
+    chunks = TransitionChunks(*chunk_args, name=shm_name)
+    arrays = chunks.arrays
+    chunk_len, board_shape = chunk_args[1], chunk_args[2]
+    env = DjambiEnv(nb_players=nb_players)
+    # The planes are copied into the chunks, one local buffer is enough
+    env.set_observation_buffer(np.zeros(board_shape, dtype=np.uint8))
+    n_actions = int(env.action_space.n)
+    net = DQN(board_shape, n_actions, nb_players)
+    net.eval()
+    local_version = -1
+    state, info = env.reset(seed=seed)
+    try:
+        while not stop.is_set():
+            try:
+                chunk = free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if version.value != local_version:
+                with lock:
+                    net.load_state_dict(shared_net.state_dict())
+                    local_version = version.value
+
+            chained = False  # The learner cannot chain across chunks
+            for t in range(chunk_len):
+                for field in ("board", "player_status", "current_player"):
+                    arrays[field][chunk, t] = state[field]
+                arrays["chained"][chunk, t] = chained
+                action = epsilon_greedy(
+                    net, state, info["action_mask"], epsilon, n_actions
+                )
+                state, reward, terminated, truncated, info = env.step(action)
+                for field in ("board", "player_status", "current_player"):
+                    arrays["next_" + field][chunk, t] = state[field]
+                arrays["next_action_mask"][chunk, t] = info["action_mask"]
+                arrays["actions"][chunk, t] = action
+                arrays["rewards"][chunk, t] = reward
+                arrays["dones"][chunk, t] = terminated
+                chained = not (terminated or truncated)
+                if not chained:
+                    state, info = env.reset()
+            ready.put((index, chunk))
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        errors.put((index, traceback.format_exc()))
+    finally:
+        env.close()
+        chunks.close()
+
+
+class ApeXTrainer:
+    """Ape-X style training on one machine.
+
+    nb_actors processes play DjambiEnv with a snapshot of the policy, each
+    with its own exploration rate, and stream their transitions through
+    shared memory chunks (only the chunk numbers go through the queues).
+    The learner, in this process, copies them into the DQNAgent replay
+    buffer, runs optimize_model as fast as it can and publishes its
+    weights to the actors every broadcast_interval gradient steps.
+    """
+
+    def __init__(
+        self,
+        nb_players: int = 3,
+        nb_actors: int = 2,
+        chunk_len: int = 50,
+        nb_chunks: int = 4,
+        broadcast_interval: int = 100,
+        warmup: int = 1000,
+        prioritized: bool = False,
+        seed: int = 0,
+        context: str = "fork",
+    ):
+        self.nb_players = nb_players
+        self.nb_actors = nb_actors
+        self.broadcast_interval = broadcast_interval
+        self.warmup = warmup
+
+        env = DjambiEnv(nb_players=nb_players)
+        board_shape = env.observation_space["board"].shape
+        n_actions = int(env.action_space.n)
+        env.close()
+        self.agent = DQNAgent(
+            board_shape, n_actions, nb_players, prioritized=prioritized
+        )
+
+        ctx = mp.get_context(context)
+        self.shared_net = DQN(board_shape, n_actions, nb_players)
+        self.shared_net.share_memory()
+        self.version = ctx.Value("i", 0)
+        self.lock = ctx.Lock()
+        self.stop = ctx.Event()
+        self.ready = ctx.Queue()
+        self.errors = ctx.Queue()
+        self.publish()
+
+        self.chunks: List[TransitionChunks] = []
+        self.free = []
+        self.processes = []
+        for index in range(nb_actors):
+            chunks = TransitionChunks(
+                nb_chunks, chunk_len, board_shape, nb_players, n_actions
+            )
+            free = ctx.Queue()
+            for chunk in range(nb_chunks):
+                free.put(chunk)
+            process = ctx.Process(
+                target=actor,
+                args=(
+                    index,
+                    nb_players,
+                    actor_epsilon(index, nb_actors),
+                    seed + index,
+                    chunks.shm.name,
+                    chunks.args,
+                    free,
+                    self.ready,
+                    self.errors,
+                    self.shared_net,
+                    self.version,
+                    self.lock,
+                    self.stop,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.chunks.append(chunks)
+            self.free.append(free)
+            self.processes.append(process)
+
+    def publish(self):
+        """Copies the learner weights into the snapshot read by the actors."""
+        with self.lock:
+            for shared, param in zip(
+                self.shared_net.state_dict().values(),
+                self.agent.policy_net.state_dict().values(),
+            ):
+                shared.copy_(param)
+            self.version.value += 1
+
+    def check_actors(self):
+        """Raises RuntimeError if an actor failed or exited."""
+        try:
+            index, error = self.errors.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            raise RuntimeError(f"Actor {index} failed:\n{error}")
+        for index, process in enumerate(self.processes):
+            if not process.is_alive():
+                try:
+                    # The traceback may still be on its way
+                    _, error = self.errors.get(timeout=1.0)
+                except queue.Empty:
+                    error = f"exit code {process.exitcode}"
+                raise RuntimeError(f"Actor {index} exited: {error}")
+
+    def receive(self, timeout: float) -> int:
+        """Moves the ready chunks into the replay buffer, waiting up to
+        timeout for the first one. Returns the number of transitions.
+        Raises RuntimeError once no chunk is ready and an actor is down."""
+        received = 0
+        block = True
+        while True:
+            try:
+                index, chunk = self.ready.get(block=block, timeout=timeout)
+            except queue.Empty:
+                self.check_actors()
+                return received
+            for transition in self.chunks[index].transitions(chunk):
+                self.agent.memory.push(*transition)
+                received += 1
+            self.free[index].put(chunk)
+            block = False
+
+    def train(self, grad_steps: int, report_interval: float = 10.0) -> Dict:
+        """Runs the learner until grad_steps gradient steps, logs the env
+        steps/s and gradient steps/s separately."""
+        agent = self.agent
+        env_steps = done_steps = 0
+        start = last_report = time.perf_counter()
+        report = (0, 0)
+        while done_steps < grad_steps:
+            learning = len(agent.memory) >= max(self.warmup, agent.batch_size)
+            env_steps += self.receive(timeout=0 if learning else 1.0)
+            if not learning:
+                continue
+            agent.steps_done += 1  # Drives the target network updates
+            agent.optimize_model()
+            done_steps += 1
+            if done_steps % self.broadcast_interval == 0:
+                self.publish()
+
+            now = time.perf_counter()
+            if now - last_report >= report_interval:
+                elapsed = now - last_report
+                logger.info(
+                    f"{(env_steps - report[0]) / elapsed:.0f} env steps/s, "
+                    f"{(done_steps - report[1]) / elapsed:.1f} grad steps/s, "
+                    f"replay {len(agent.memory)}"
+                )
+                last_report, report = now, (env_steps, done_steps)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "env_steps": env_steps,
+            "grad_steps": done_steps,
+            "seconds": elapsed,
+            "env_steps_per_s": env_steps / elapsed,
+            "grad_steps_per_s": done_steps / elapsed,
+        }
+
+    def close(self):
+        self.stop.set()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for chunks in self.chunks:
+            chunks.close(unlink=True)
+        self.chunks = []
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Ape-X style DQN training.")
+    parser.add_argument("--nb_player_mode", type=int, choices=[3, 4, 6], default=3)
+    parser.add_argument("--num_actors", type=int, default=2)
+    parser.add_argument("--grad_steps", type=int, default=10000)
+    parser.add_argument("--chunk_len", type=int, default=50)
+    parser.add_argument("--broadcast_interval", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--prioritized", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save_path", default="models")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    trainer = ApeXTrainer(
+        nb_players=args.nb_player_mode,
+        nb_actors=args.num_actors,
+        chunk_len=args.chunk_len,
+        broadcast_interval=args.broadcast_interval,
+        warmup=args.warmup,
+        prioritized=args.prioritized,
+        seed=args.seed,
+    )
+    try:
+        stats = trainer.train(args.grad_steps)
+    finally:
+        trainer.close()
+    os.makedirs(args.save_path, exist_ok=True)
+    trainer.agent.save(os.path.join(args.save_path, "dqn_apex.pt"))
+    print(
+        f"{stats['env_steps']} env steps, {stats['env_steps_per_s']:.0f} env steps/s; "
+        f"{stats['grad_steps']} grad steps, {stats['grad_steps_per_s']:.1f} grad steps/s"
+    )
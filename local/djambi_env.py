@@ -6,7 +6,6 @@ from typing import Dict, List, Optional, Tuple
 
 import gymnasium as gym
 import numpy as np
-import pygame
 from gymnasium import spaces
 
 from backend.src.constants import FONT_SIZE, WINDOW_HEIGHT, WINDOW_WIDTH
@@ -25,6 +24,8 @@ sys.path.append(project_root)
 
 from backend.src import Board, MinMaxPlayer, Player, create_piece
 
+from .observation import ObservationEncoder
+
 
 class DjambiEnv(gym.Env):
     """
@@ -41,6 +42,8 @@ class DjambiEnv(gym.Env):
         self.paused = False  # Pause state
 
         if self.render_mode == "human":
+            import pygame  # Only the display needs pygame
+
             pygame.init()
             self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
             pygame.display.set_caption("Djambi")
@@ -53,18 +56,16 @@ class DjambiEnv(gym.Env):
         self.board.rl = (
             self.render_mode != "human"
         )  # Set rl to False when rendering is enabled
+        self.attach_renderer()
+        self.encoder = ObservationEncoder(self.board.state.layout)
+        self.shared_board = False  # True once the planes go to a caller buffer
 
         # Define observation and action spaces
         self.observation_space = spaces.Dict(
             {
+                # Planes: pieces per owner and class, dead bodies, central cell
                 "board": spaces.Box(
-                    low=0,
-                    high=self.nb_players,
-                    shape=(
-                        self.board.board_size * 2 - 1,
-                        self.board.board_size * 2 - 1,
-                    ),
-                    dtype=np.int8,
+                    low=0, high=1, shape=self.encoder.shape, dtype=np.uint8
                 ),
                 "player_status": spaces.Box(
                     low=0, high=1, shape=(self.nb_players,), dtype=np.int8
@@ -73,57 +74,71 @@ class DjambiEnv(gym.Env):
             }
         )
 
-        # Action: (piece_q, piece_r, move_q, move_r)
-        self.action_space = spaces.MultiDiscrete(
-            [
-                self.board.board_size * 2 - 1,  # piece_q
-                self.board.board_size * 2 - 1,  # piece_r
-                self.board.board_size * 2 - 1,  # move_q
-                self.board.board_size * 2 - 1,  # move_r
-            ]
-        )
+        # Action: piece slot * number of cells + destination cell
+        layout = self.board.state.layout
+        self.nb_cells = layout.nb_cells
+        self.action_space = spaces.Discrete(layout.nb_pieces * self.nb_cells)
+        self.action_mask = np.zeros(self.action_space.n, dtype=np.int8)
+        self.mask_key = None  # Zobrist key of the position of action_mask
 
         # Initialization
         self.reset()
 
-    def get_valid_actions(self) -> List[np.ndarray]:
+    def set_observation_buffer(self, out: np.ndarray):
         """
-        Returns the list of valid actions for the current player.
+        Makes the observation planes be written into out (for instance a row
+        of a vectorized env buffer): the returned "board" is then out itself,
+        overwritten by the next step or reset.
         """
-        valid_actions = []
-        current_player = self.board.players[self.board.current_player_index]
+        self.encoder = ObservationEncoder(self.board.state.layout, out=out)
+        self.shared_board = True
 
-        # For each piece of the current player
-        for piece in current_player.pieces:
-            if piece.is_dead:
-                continue
-
-            # Get possible moves for this piece
-            possible_moves = self.board.get_possible_moves(piece)
-
-            # Convert hexagonal coordinates to action space coordinates
-            piece_q = piece.q + (self.board.board_size - 1)
-            piece_r = piece.r + (self.board.board_size - 1)
-
-            for move_q, move_r in possible_moves:
-                move_q = move_q + (self.board.board_size - 1)
-                move_r = move_r + (self.board.board_size - 1)
+    def encode_action(self, piece, destination: Tuple[int, int]) -> int:
+        """
+        Action index of the move of piece to the (q, r) destination.
+        """
+        return int(piece.pid * self.nb_cells + self.board.geometry.index[destination])
 
-                # Create the action
-                action = np.array([piece_q, piece_r, move_q, move_r])
-                valid_actions.append(action)
+    def decode_action(self, action: int):
+        """
+        Returns the piece and the (q, r) destination of an action index.
+        """
+        pid, cell = divmod(int(action), self.nb_cells)
+        return self.board.pieces[pid], self.board.geometry.cells[cell]
 
-        return valid_actions
+    def get_action_mask(self) -> np.ndarray:
+        """
+        Mask of the legal actions of the current player (1 if legal), built
+        in one pass of the move generation and kept until the position changes.
+        """
+        key = self.board.state.key
+        if key != self.mask_key:
+            mask = np.zeros(self.action_space.n, dtype=np.int8)
+            players = self.board.players
+            if players:
+                current_player = players[self.board.current_player_index]
+                for piece, destination in current_player.get_all_valid_moves(
+                    self.board
+                ):
+                    mask[self.encode_action(piece, destination)] = 1
+            self.action_mask, self.mask_key = mask, key
+        return self.action_mask
+
+    def get_valid_actions(self) -> List[int]:
+        """
+        Returns the list of valid actions for the current player.
+        """
+        actions: List[int] = np.flatnonzero(self.get_action_mask()).tolist()
+        return actions
 
-    def sample_action(self) -> np.ndarray:
+    def sample_action(self) -> int:
         """
         Samples a random valid action.
         """
         valid_actions = self.get_valid_actions()
         if not valid_actions:
             # If no valid action, return an invalid action (will be rejected by step)
-            sampled: np.ndarray = self.action_space.sample()
-            return sampled
+            return int(self.action_space.sample())
         return random.choice(valid_actions)
 
     def reset(
@@ -134,18 +149,16 @@ class DjambiEnv(gym.Env):
         """
         logger.debug("Resetting environment")
         super().reset(seed=seed, options=options)
+        if seed is not None:
+            random.seed(seed)  # The engine draws from the random module
 
         # Reset the board
         self.board = Board(self.nb_players, current_player_index=0)
         self.board.rl = (
             self.render_mode != "human"
         )  # Use self.render_mode instead of render_mode
-
-        self.board.pieces = [
-            p
-            for p in self.board.pieces
-            if p.color in [p.color for p in self.board.players]
-        ]
+        self.attach_renderer()
+        self.encoder.reset()
 
         # Current player (starts randomly)
         self.board.current_player_index = random.randint(0, self.nb_players - 1)
@@ -160,31 +173,10 @@ class DjambiEnv(gym.Env):
         """
         Returns the current observation.
         """
-        # Create a board representation
-        board_state: np.ndarray = np.zeros(
-            (self.board.board_size * 2 - 1, self.board.board_size * 2 - 1),
-            dtype=np.int8,
-        )
-        for piece in self.board.pieces:
-            if not piece.is_dead:
-                q, r = (
-                    piece.q + self.board.board_size - 1,
-                    piece.r + self.board.board_size - 1,
-                )
-                # Use the color index in the color list
-                color_name = self.board.names[piece.color]
-                color_index = list(self.board.names.keys()).index(piece.color) + 1
-                board_state[q, r] = color_index
-
-        # Player status
-        player_status = np.ones(self.nb_players, dtype=np.int8)
-        for i, player in enumerate(self.board.players):
-            if not any(not p.is_dead for p in player.pieces):
-                player_status[i] = 0
-
+        planes = self.encoder.update(self.board.state)
         return {
-            "board": board_state,
-            "player_status": player_status,
+            "board": planes if self.shared_board else planes.copy(),
+            "player_status": self.encoder.player_status(self.board.state),
             "current_player": self.board.current_player_index,
         }
 
@@ -194,69 +186,37 @@ class DjambiEnv(gym.Env):
         """
         return {
             "current_player": self.board.current_player_index,
-            "player_status": [
-                1 if any(not p.is_dead for p in player.pieces) else 0
-                for player in self.board.players
-            ],
+            "player_status": self.encoder.player_status(self.board.state).tolist(),
+            "action_mask": self.get_action_mask(),
         }
 
-    def _is_valid_move(
-        self, piece_q: int, piece_r: int, move_q: int, move_r: int
-    ) -> bool:
+    def _is_valid_move(self, action: int) -> bool:
         """
-        Checks if a move is valid.
+        Checks if an action is legal for the current player.
         """
-        # Convert coordinates
-        piece_q = piece_q - (self.board.board_size - 1)
-        piece_r = piece_r - (self.board.board_size - 1)
-        move_q = move_q - (self.board.board_size - 1)
-        move_r = move_r - (self.board.board_size - 1)
-
-        # Check if the piece exists and belongs to the current player
-        piece = self.board.get_piece_at(piece_q, piece_r)
-        if (
-            not piece
-            or piece.color != self.board.players[self.board.current_player_index].color
-        ):
-            logger.warning(
-                f"Invalid move: Piece at ({piece_q}, {piece_r}) doesn't exist or doesn't belong to current player"
-            )
-            return False
-
-        # Check if the move is possible
-        possible_moves = self.board.get_possible_moves(piece)
-        is_valid = (move_q, move_r) in possible_moves
+        is_valid = 0 <= action < self.action_space.n and bool(
+            self.get_action_mask()[action]
+        )
         if not is_valid:
-            logger.warning(
-                f"Invalid move: Move to ({move_q}, {move_r}) not in possible moves {possible_moves}"
-            )
+            logger.debug(f"Invalid action {action}")
         return is_valid
 
-    def step(self, action: np.ndarray) -> Tuple[Dict, float, bool, bool, Dict]:
+    def step(self, action: int) -> Tuple[Dict, float, bool, bool, Dict]:
         """
         Executes an action and returns (observation, reward, terminated, truncated, info)
         """
-        piece_q, piece_r, move_q, move_r = action
-        # logger.debug(
-        #     f"Player {self.board.current_player_index + 1} attempting move: piece at ({piece_q}, {piece_r}) to ({move_q}, {move_r})"
-        # )
+        action = int(action)
 
         # Check if the action is valid
-        if not self._is_valid_move(piece_q, piece_r, move_q, move_r):
-            logger.debug("Invalid move attempted")
+        if not self._is_valid_move(action):
             return self._get_observation(), -10.0, False, False, self._get_info()
 
         current_player = self.board.players[self.board.current_player_index]
         score_initial = current_player.compute_relative_score(self.board)
 
-        # Convert coordinates
-        piece_q = piece_q - (self.board.board_size - 1)
-        piece_r = piece_r - (self.board.board_size - 1)
-        move_q = move_q - (self.board.board_size - 1)
-        move_r = move_r - (self.board.board_size - 1)
-
         # Execute the move
-        piece = self.board.get_piece_at(piece_q, piece_r)
+        piece, (move_q, move_r) = self.decode_action(action)
+        piece_q, piece_r = piece.q, piece.r
         success = self.board.move_piece(piece, move_q, move_r)
 
         if not success:
@@ -317,11 +277,22 @@ class DjambiEnv(gym.Env):
 
         return self._get_observation(), reward, terminated, False, self._get_info()
 
+    def attach_renderer(self):
+        """
+        Attaches the pygame display to the board in human render mode.
+        """
+        if self.render_mode == "human":
+            from backend.src.renderer import BoardRenderer
+
+            self.renderer = BoardRenderer(self.board, self.screen)
+
     def render(self):
         """
         Displays the current board state.
         """
         if self.render_mode == "human":
+            import pygame
+
             # Handle pygame events to keep window responsive
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -335,7 +306,7 @@ class DjambiEnv(gym.Env):
                         )
 
             self.screen.fill((0, 0, 0))  # BLACK
-            self.board.draw(self.screen)
+            self.renderer.draw(self.screen)
 
             # Display pause state
             if self.paused:
@@ -350,8 +321,8 @@ class DjambiEnv(gym.Env):
         else:
             logger.debug("Rendering current board state")
             print("\nCurrent board:")
-            board_state = self._get_observation()["board"]
-            print(board_state)
+            self.encoder.update(self.board.state)
+            print(self.encoder.owner_grid())
             print(f"Current player: {self.board.current_player_index + 1}")
             print(f"Player status: {self._get_info()['player_status']}")
 
@@ -360,4 +331,6 @@ class DjambiEnv(gym.Env):
         Closes the environment and releases resources.
         """
         if self.render_mode == "human":
+            import pygame
+
             pygame.quit()
@@ -1,6 +1,5 @@
 import random
-from collections import deque
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import torch
@@ -8,26 +7,37 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 
+# (state, action, reward, next_state, done) tensors of a sampled batch
+Batch = Tuple[
+    Dict[str, torch.Tensor],
+    torch.Tensor,
+    torch.Tensor,
+    Dict[str, torch.Tensor],
+    torch.Tensor,
+]
+
 
 class DQN(nn.Module):
-    def __init__(self, input_shape: Tuple[int, int, int], n_actions: int):
+    def __init__(
+        self, input_shape: Tuple[int, int, int], n_actions: int, nb_players: int
+    ):
         super(DQN, self).__init__()
 
-        # Convolutional layers for the board
-        self.conv1 = nn.Conv2d(1, 32, kernel_size=3, padding=1)  # 1 input channel
+        # Convolutional layers for the board planes
+        self.conv1 = nn.Conv2d(input_shape[0], 32, kernel_size=3, padding=1)
         self.conv2 = nn.Conv2d(32, 64, kernel_size=3, padding=1)
         self.conv3 = nn.Conv2d(64, 64, kernel_size=3, padding=1)
 
         # Fully connected layers
         conv_out_size = self._get_conv_out(input_shape)
         self.fc1 = nn.Linear(
-            conv_out_size + 4, 512
-        )  # +4 for player status and current player
+            conv_out_size + nb_players + 1, 512
+        )  # + player status and current player
         self.fc2 = nn.Linear(512, 256)
         self.fc3 = nn.Linear(256, n_actions)
 
     def _get_conv_out(self, shape):
-        o = self.conv1(torch.zeros(1, 1, *shape[1:]))  # Add the channel dimension
+        o = self.conv1(torch.zeros(1, *shape))
         o = self.conv2(o)
         o = self.conv3(o)
         return int(np.prod(o.size()))
@@ -37,8 +47,9 @@ class DQN(nn.Module):
         board = x["board"].float()
         batch_size = board.size(0)
 
-        # Add the channel dimension
-        board = board.unsqueeze(1)  # [batch_size, 1, height, width]
+        if board.dim() == 3:
+            # Add the channel dimension of a single-channel board
+            board = board.unsqueeze(1)  # [batch_size, 1, height, width]
 
         # Pass through the convolutional layers
         conv_out = F.relu(self.conv1(board))
@@ -49,7 +60,7 @@ class DQN(nn.Module):
         # Concatenate with other information
         player_status = (
             x["player_status"].float().view(batch_size, -1)
-        )  # [batch_size, 3]
+        )  # [batch_size, nb_players]
         current_player = (
             x["current_player"].float().view(batch_size, -1)
         )  # [batch_size, 1]
@@ -62,63 +73,313 @@ class DQN(nn.Module):
         return result
 
 
+def epsilon_greedy(
+    net: DQN,
+    state: Dict[str, np.ndarray],
+    action_mask: Optional[np.ndarray],
+    eps: float,
+    n_actions: int,
+    device: str = "cpu",
+) -> int:
+    """Random action with probability eps, else the one with the highest Q
+    value; among the legal ones when a mask is given."""
+    legal = None if action_mask is None else np.flatnonzero(action_mask)
+
+    if random.random() < eps:
+        # Random action
+        if legal is not None and len(legal):
+            return int(random.choice(legal))
+        return random.randrange(n_actions)
+
+    with torch.no_grad():
+        # Convert the state to tensor
+        state_tensor = {
+            "board": torch.FloatTensor(state["board"]).unsqueeze(0).to(device),
+            "player_status": torch.FloatTensor(state["player_status"])
+            .unsqueeze(0)
+            .to(device),
+            "current_player": torch.FloatTensor([state["current_player"]])
+            .unsqueeze(0)
+            .to(device),
+        }
+
+        # Select the legal action with the highest Q value
+        q_values = net(state_tensor)[0]
+        if legal is not None and len(legal):
+            legal_tensor = torch.as_tensor(legal, device=device)
+            return int(legal_tensor[q_values[legal_tensor].argmax()])
+        return int(q_values.argmax())
+
+
 class ReplayBuffer:
-    def __init__(self, capacity: int):
-        self.buffer: deque[
-            tuple[Dict[str, np.ndarray], np.ndarray, float, Dict[str, np.ndarray], bool]
-        ] = deque(maxlen=capacity)
+    """Ring buffer of transitions in preallocated NumPy arrays.
+
+    Observations are stored once, in their own ring (capacity + 1 slots by
+    default): a transition keeps the serial numbers of its state and next
+    state, and the state of a push that is the next state of the previous
+    push (the same object) is not copied again. When a slot is reused, the
+    oldest transitions pointing at it are dropped, so producers that do not
+    chain their pushes should give up to 2 * capacity + 1 slots. Legal action masks are stored
+    as bits, and so are the board planes of DjambiEnv. The arrays are
+    allocated at the first push, from the shapes of its observations.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        pin_memory: bool = False,
+        seed=None,
+        obs_capacity: Optional[int] = None,
+    ):
+        self.capacity = capacity
+        self.obs_capacity = capacity + 1 if obs_capacity is None else obs_capacity
+        # Sampled tensors copied into reused page-locked buffers (CUDA only)
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self.pinned: Dict[str, torch.Tensor] = {}
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+        self.position = 0  # Ring index of the next transition
+        self.obs_count = 0  # Observations written so far
+        self.last_next_state: Optional[Dict[str, np.ndarray]] = None
+        self.obs: Dict[str, np.ndarray] = {}
+        self.nb_actions = 0
+        self.board_shape: Tuple[int, ...] = ()
+        self.packed_board = False
+
+        self.state_serials = np.zeros(capacity, dtype=np.int64)
+        self.next_serials = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+
+    def allocate(self, state: Dict[str, np.ndarray], next_state: Dict[str, np.ndarray]):
+        n = self.obs_capacity
+        self.board_shape = np.shape(state["board"])
+        # Binary planes (C, H, W) are stored as bits
+        self.packed_board = len(self.board_shape) == 3
+        board_size = int(np.prod(self.board_shape))
+        self.obs = {
+            "board": (
+                np.zeros((n, (board_size + 7) // 8), dtype=np.uint8)
+                if self.packed_board
+                else np.zeros((n, *self.board_shape), dtype=np.int8)
+            ),
+            "player_status": np.zeros(
+                (n, *np.shape(state["player_status"])), dtype=np.int8
+            ),
+            "current_player": np.zeros(n, dtype=np.int8),
+        }
+        if "action_mask" in next_state:
+            self.nb_actions = len(next_state["action_mask"])
+            self.obs["action_mask"] = np.zeros(
+                (n, (self.nb_actions + 7) // 8), dtype=np.uint8
+            )
+
+    def write_observation(self, observation: Dict[str, np.ndarray]) -> int:
+        """Copies an observation into the next slot, returns its serial."""
+        serial = self.obs_count
+        slot = serial % self.obs_capacity
+        # Oldest transitions first: drop those whose state was in the slot
+        stale = serial - self.obs_capacity
+        while (
+            self.size
+            and self.state_serials[(self.position - self.size) % self.capacity] <= stale
+        ):
+            self.drop_oldest()
+        for field in ("player_status", "current_player"):
+            self.obs[field][slot] = observation[field]
+        if self.packed_board:
+            self.obs["board"][slot] = np.packbits(observation["board"])
+        else:
+            self.obs["board"][slot] = observation["board"]
+        if "action_mask" in self.obs:
+            mask = observation.get("action_mask")
+            # Without a mask every action counts as legal
+            self.obs["action_mask"][slot] = 255 if mask is None else np.packbits(mask)
+        self.obs_count += 1
+        return serial
+
+    def drop_oldest(self):
+        self.size -= 1
 
     def push(
         self,
         state: Dict[str, np.ndarray],
-        action: np.ndarray,
+        action: int,
         reward: float,
         next_state: Dict[str, np.ndarray],
         done: bool,
     ):
-        self.buffer.append((state, action, reward, next_state, done))
-
-    def sample(
-        self, batch_size: int
-    ) -> Tuple[
-        Dict[str, torch.Tensor],
-        torch.Tensor,
-        torch.Tensor,
-        Dict[str, torch.Tensor],
-        torch.Tensor,
-    ]:
-        samples = random.sample(self.buffer, batch_size)
-        state_list, action_list, reward_list, next_state_list, done_list = zip(*samples)
-
-        # Convertir en tenseurs PyTorch
-        state_dict: Dict[str, torch.Tensor] = {
-            "board": torch.FloatTensor(np.array([s["board"] for s in state_list])),
-            "player_status": torch.FloatTensor(
-                np.array([s["player_status"] for s in state_list])
-            ),
-            "current_player": torch.FloatTensor(
-                np.array([s["current_player"] for s in state_list])
-            ),
-        }
+        if not self.obs:
+            self.allocate(state, next_state)
+        if state is self.last_next_state:
+            state_serial = self.obs_count - 1
+        else:
+            state_serial = self.write_observation(state)
+        next_serial = self.write_observation(next_state)
+        self.last_next_state = next_state
+
+        i = self.position
+        self.state_serials[i] = state_serial
+        self.next_serials[i] = next_serial
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def to_tensor(self, name: str, array: np.ndarray) -> torch.Tensor:
+        """Tensor of a sampled array. With pin_memory it is a page-locked
+        buffer reused by the next sample."""
+        tensor = torch.from_numpy(array)
+        if not self.pin_memory:
+            return tensor
+        pinned = self.pinned.get(name)
+        if pinned is None or pinned.shape != tensor.shape:
+            pinned = self.pinned[name] = torch.empty_like(tensor).pin_memory()
+        return pinned.copy_(tensor)
+
+    def observations(self, serials: np.ndarray, prefix: str) -> Dict[str, torch.Tensor]:
+        slots = serials % self.obs_capacity
+        board = self.obs["board"][slots]
+        if self.packed_board:
+            board = np.unpackbits(
+                board, axis=1, count=int(np.prod(self.board_shape))
+            ).reshape(len(slots), *self.board_shape)
+        batch = {"board": self.to_tensor(prefix + "board", board)}
+        for field in ("player_status", "current_player"):
+            batch[field] = self.to_tensor(prefix + field, self.obs[field][slots])
+        if "action_mask" in self.obs:
+            mask = np.unpackbits(
+                self.obs["action_mask"][slots], axis=1, count=self.nb_actions
+            )
+            batch["action_mask"] = self.to_tensor(prefix + "action_mask", mask)
+        return batch
+
+    def sample(self, batch_size: int) -> Batch:
+        """Uniform batch of transitions (with replacement), as tensors of
+        the stored dtypes: int8 observations, 0/1 uint8 masks."""
+        positions = (
+            self.position - self.size + self.rng.integers(0, self.size, batch_size)
+        ) % self.capacity
+        return self.gather(positions)
+
+    def gather(self, positions: np.ndarray) -> Batch:
+        state_dict = self.observations(self.state_serials[positions], "")
+        next_state_dict = self.observations(self.next_serials[positions], "next_")
+        action_tensor = self.to_tensor("action", self.actions[positions])
+        reward_tensor = self.to_tensor("reward", self.rewards[positions])
+        done_tensor = self.to_tensor("done", self.dones[positions])
+        return state_dict, action_tensor, reward_tensor, next_state_dict, done_tensor
 
-        next_state_dict: Dict[str, torch.Tensor] = {
-            "board": torch.FloatTensor(np.array([s["board"] for s in next_state_list])),
-            "player_status": torch.FloatTensor(
-                np.array([s["player_status"] for s in next_state_list])
-            ),
-            "current_player": torch.FloatTensor(
-                np.array([s["current_player"] for s in next_state_list])
-            ),
-        }
+    def __len__(self):
+        return self.size
 
-        action_tensor = torch.LongTensor(np.array(action_list))
-        reward_tensor = torch.FloatTensor(reward_list)
-        done_tensor = torch.FloatTensor(done_list)
 
-        return state_dict, action_tensor, reward_tensor, next_state_dict, done_tensor
+class SumTree:
+    """Binary tree of sums over capacity leaf priorities, in one array.
 
-    def __len__(self):
-        return len(self.buffer)
+    The root is node 1, the children of node i are 2i and 2i + 1, and leaf
+    i is node leaves + i (leaves is a power of two). ``update`` and
+    ``find`` handle a batch of leaves at once, one NumPy step per level.
+    """
+
+    def __init__(self, capacity: int):
+        self.leaves = 1 << max(0, capacity - 1).bit_length()
+        self.nodes = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self.nodes[1])
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        return self.nodes[self.leaves + indices]
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        """Sets the priorities of the leaves, then recomputes their parents."""
+        nodes = np.asarray(indices) + self.leaves
+        self.nodes[nodes] = priorities
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Leaves where the prefix sums of the priorities reach the values."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            left_sums = self.nodes[left]
+            right = values >= left_sums
+            values -= np.where(right, left_sums, 0.0)
+            nodes = left + right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """ReplayBuffer sampling transition i with probability p_i^alpha / sum.
+
+    New transitions get the largest priority seen so far, sampled ones get
+    |TD error| + eps through ``update_priorities``. ``sample`` also returns
+    the importance-sampling weights (N P(i))^-beta, divided by their batch
+    maximum, and the positions to update; beta grows to 1 over
+    beta_samples samples.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        alpha: float = 0.6,
+        beta: float = 0.4,
+        beta_samples: int = 100000,
+        eps: float = 1e-6,
+        **kwargs,
+    ):
+        super().__init__(capacity, **kwargs)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = (1.0 - beta) / beta_samples
+        self.eps = eps
+        self.max_priority = 1.0
+
+    def drop_oldest(self):
+        self.tree.update(
+            np.array([(self.position - self.size) % self.capacity]), np.zeros(1)
+        )
+        super().drop_oldest()
+
+    def push(self, *args, **kwargs):
+        super().push(*args, **kwargs)
+        self.tree.update(
+            np.array([(self.position - 1) % self.capacity]),
+            np.array([self.max_priority**self.alpha]),
+        )
+
+    def sample(self, batch_size: int):
+        """Stratified sample: one transition per equal slice of the total
+        priority. Returns the uniform batch plus the weights and positions."""
+        total = self.tree.total
+        bounds = (np.arange(batch_size) + self.rng.random(batch_size)) * (
+            total / batch_size
+        )
+        positions = self.tree.find(np.minimum(bounds, np.nextafter(total, 0)))
+        probabilities = self.tree.get(positions) / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self.gather(positions) + (
+            self.to_tensor("weights", weights.astype(np.float32)),
+            positions,
+        )
+
+    def update_priorities(self, positions: np.ndarray, td_errors: np.ndarray):
+        """Priorities of the sampled positions from their absolute TD errors."""
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        # A position sampled twice keeps one of its errors
+        positions, first = np.unique(positions, return_index=True)
+        self.tree.update(positions, priorities[first] ** self.alpha)
 
 
 class DQNAgent:
@@ -126,21 +387,29 @@ class DQNAgent:
         self,
         state_shape: Tuple[int, int, int],
         n_actions: int,
+        nb_players: int,
         device: str = "cuda" if torch.cuda.is_available() else "cpu",
+        prioritized: bool = False,
     ):
         self.device = device
         self.n_actions = n_actions
+        self.prioritized = prioritized
 
         # Create the networks
-        self.policy_net = DQN(state_shape, n_actions).to(device)
-        self.target_net = DQN(state_shape, n_actions).to(device)
+        self.policy_net = DQN(state_shape, n_actions, nb_players).to(device)
+        self.target_net = DQN(state_shape, n_actions, nb_players).to(device)
         self.target_net.load_state_dict(self.policy_net.state_dict())
 
         # Optimizer
         self.optimizer = optim.Adam(self.policy_net.parameters())
 
         # Replay buffer
-        self.memory = ReplayBuffer(100000)
+        if prioritized:
+            self.memory: ReplayBuffer = PrioritizedReplayBuffer(
+                100000, pin_memory=device != "cpu"
+            )
+        else:
+            self.memory = ReplayBuffer(100000, pin_memory=device != "cpu")
 
         # Hyperparameters
         self.batch_size = 64
@@ -152,81 +421,65 @@ class DQNAgent:
         self.target_update = 10
         self.steps_done = 0
 
-    def select_action(self, state: Dict[str, np.ndarray]) -> np.ndarray:
+    def select_action(
+        self, state: Dict[str, np.ndarray], action_mask: Optional[np.ndarray] = None
+    ) -> int:
+        """Epsilon-greedy action index, among the legal ones (action_mask of
+        the env info) when a mask is given."""
         self.steps_done += 1
         self.eps = max(self.eps_end, self.eps * self.eps_decay)
+        return epsilon_greedy(
+            self.policy_net, state, action_mask, self.eps, self.n_actions, self.device
+        )
 
-        if random.random() < self.eps:
-            # Random action
-            board_size = state["board"].shape[0]
-            return np.array(
-                [
-                    random.randint(0, board_size - 1),  # piece_q
-                    random.randint(0, board_size - 1),  # piece_r
-                    random.randint(0, board_size - 1),  # move_q
-                    random.randint(0, board_size - 1),  # move_r
-                ]
-            )
-
-        with torch.no_grad():
-            # Convert the state to tensor
-            state_tensor = {
-                "board": torch.FloatTensor(state["board"]).unsqueeze(0).to(self.device),
-                "player_status": torch.FloatTensor(state["player_status"])
-                .unsqueeze(0)
-                .to(self.device),
-                "current_player": torch.FloatTensor([state["current_player"]])
-                .unsqueeze(0)
-                .to(self.device),
-            }
-
-            # Select the action with the highest Q value
-            q_values = self.policy_net(state_tensor)
-            action_idx = q_values.max(1)[1].cpu().numpy()[0]
-
-            # Convert the index to coordinates
-            board_size = state["board"].shape[0]
-            piece_q = action_idx // (board_size**3)
-            action_idx = action_idx % (board_size**3)
-            piece_r = action_idx // (board_size**2)
-            action_idx = action_idx % (board_size**2)
-            move_q = action_idx // board_size
-            move_r = action_idx % board_size
-
-            return np.array([piece_q, piece_r, move_q, move_r])
+    def to_device(self, batch):
+        if isinstance(batch, dict):
+            return {key: self.to_device(value) for key, value in batch.items()}
+        return batch.to(self.device, non_blocking=True)
 
     def optimize_model(self):
         if len(self.memory) < self.batch_size:
             return
 
-        # Sample a batch
-        state, action, reward, next_state, done = self.memory.sample(self.batch_size)
-
-        # Convert actions to unique indices
-        board_size = state["board"].shape[1]
-        action_indices = (
-            action[:, 0] * (board_size**3)
-            + action[:, 1] * (board_size**2)
-            + action[:, 2] * board_size
-            + action[:, 3]
+        # Sample a batch (a prioritized one ends with weights and positions)
+        batch: tuple = self.memory.sample(self.batch_size)
+        state, action, reward, next_state, done = (
+            self.to_device(tensors) for tensors in batch[:5]
         )
 
         # Calculate Q(s_t, a)
-        state_action_values = self.policy_net(state).gather(
-            1, action_indices.unsqueeze(1)
-        )
+        state_action_values = self.policy_net(state).gather(1, action.unsqueeze(1))
 
-        # Calculate V(s_{t+1})
+        # Calculate V(s_{t+1}), over the legal actions when the mask was stored
         with torch.no_grad():
-            next_state_values = self.target_net(next_state).max(1)[0]
+            next_q_values = self.target_net(next_state)
+            if "action_mask" in next_state:
+                legal = next_state["action_mask"] > 0
+                next_q_values = next_q_values.masked_fill(~legal, float("-inf"))
+            next_state_values = next_q_values.max(1)[0]
+            # No legal action (end of the game): no bootstrap
+            next_state_values = torch.nan_to_num(next_state_values, neginf=0.0)
             expected_state_action_values = (
                 reward + (1 - done) * self.gamma * next_state_values
             )
 
         # Calculate the loss
-        loss = F.smooth_l1_loss(
-            state_action_values, expected_state_action_values.unsqueeze(1)
-        )
+        if isinstance(self.memory, PrioritizedReplayBuffer):
+            # Weighted by the importance-sampling weights, and the TD errors
+            # become the new priorities of the sampled transitions
+            weights, positions = self.to_device(batch[5]), batch[6]
+            losses = F.smooth_l1_loss(
+                state_action_values.squeeze(1),
+                expected_state_action_values,
+                reduction="none",
+            )
+            loss = (weights * losses).mean()
+            td_errors = expected_state_action_values - state_action_values.squeeze(1)
+            self.memory.update_priorities(positions, td_errors.detach().cpu().numpy())
+        else:
+            loss = F.smooth_l1_loss(
+                state_action_values, expected_state_action_values.unsqueeze(1)
+            )
 
         # Optimize
         self.optimizer.zero_grad()
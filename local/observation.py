@@ -0,0 +1,90 @@
+import numpy as np
+
+from backend.src.state import DEAD, PIECE_CLASSES
+
+
+class ObservationEncoder:
+    """Binary planes of a board state, updated from the cells that changed.
+
+    Plane owner slot * 6 + class code marks the living pieces of each player
+    and class, then come the plane of the dead bodies and the plane of the
+    central cell. Cell (q, r) is at row q + board_size - 1, column
+    r + board_size - 1. ``update`` compares the cell occupants and the piece
+    owners with the last encoded state and rewrites the changed cells only,
+    in ``out`` when given: the planes must not be modified in between.
+    """
+
+    def __init__(self, layout, out=None):
+        self.layout = layout
+        geometry = layout.geometry
+        board_size = geometry.board_size
+        side = 2 * board_size - 1
+        self.dead_plane = layout.nb_slots * len(PIECE_CLASSES)
+        self.center_plane = self.dead_plane + 1
+        self.shape = (self.center_plane + 1, side, side)
+        if out is None:
+            out = np.zeros(self.shape, dtype=np.uint8)
+        elif out.shape != self.shape:
+            raise ValueError(
+                f"Observation buffer of shape {out.shape}, {self.shape} expected"
+            )
+        self.planes = out
+        cells = np.array(geometry.cells)
+        self.rows = cells[:, 0] + board_size - 1
+        self.cols = cells[:, 1] + board_size - 1
+        self.center = geometry.center
+        self.last_cells = None  # Cell and owner bytes of the encoded state
+        self.last_owners = None
+
+    def reset(self):
+        """The next update rewrites every cell."""
+        self.last_cells = None
+
+    def update(self, state) -> np.ndarray:
+        """Planes of the GameState, returns the planes array."""
+        layout, planes = self.layout, self.planes
+        buf = np.frombuffer(state.buf, dtype=np.uint8)
+        cells = buf[: layout.nb_cells]
+        owners = buf[layout.piece_owner : layout.piece_owner + layout.nb_pieces]
+        if self.last_cells is None:
+            changed = np.arange(layout.nb_cells)
+        else:
+            changed_cells = cells != self.last_cells
+            # A killed or recolored piece stays on its cell
+            recolored = np.flatnonzero(owners != self.last_owners)
+            changed_cells[buf[layout.piece_cell + recolored]] = True
+            changed = np.flatnonzero(changed_cells)
+        self.last_cells, self.last_owners = cells.copy(), owners.copy()
+        if not len(changed):
+            return planes
+
+        rows, cols = self.rows[changed], self.cols[changed]
+        planes[:, rows, cols] = 0
+        occupants = cells[changed].astype(np.int64)
+        occupied = occupants > 0
+        pids = occupants[occupied] - 1
+        piece_owners = owners[pids].astype(np.int64)
+        classes = buf[layout.piece_class + pids]
+        plane = np.where(
+            piece_owners == DEAD,
+            self.dead_plane,
+            piece_owners * len(PIECE_CLASSES) + classes,
+        )
+        planes[plane, rows[occupied], cols[occupied]] = 1
+        planes[self.center_plane, self.rows[self.center], self.cols[self.center]] = 1
+        return planes
+
+    def player_status(self, state) -> np.ndarray:
+        """1 for the player slots that still own a living piece."""
+        layout = self.layout
+        owners = np.frombuffer(
+            state.buf, dtype=np.uint8, count=layout.nb_pieces, offset=layout.piece_owner
+        )
+        alive = np.bincount(owners[owners != DEAD], minlength=layout.nb_slots)
+        return (alive > 0).astype(np.int8)
+
+    def owner_grid(self) -> np.ndarray:
+        """Single-channel board: owner slot + 1 of each living piece, 0 elsewhere."""
+        nb_classes = len(PIECE_CLASSES)
+        slots = np.arange(self.dead_plane) // nb_classes + 1
+        return (self.planes[: self.dead_plane] * slots[:, None, None]).max(axis=0)
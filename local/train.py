@@ -1,11 +1,11 @@
 import argparse
 import os
 import random
+import time
 
 import gymnasium as gym
 import matplotlib.pyplot as plt
 import numpy as np
-import pygame
 from tqdm import tqdm
 
 from .djambi_env import DjambiEnv
@@ -32,7 +32,7 @@ def train(
 
     for episode in pbar:
         # Reset the environment
-        state, _ = env.reset()
+        state, info = env.reset()
         episode_reward = 0.0
         done = False
 
@@ -40,7 +40,7 @@ def train(
             # Check if training is paused
             while env.paused:
                 env.render()
-                pygame.time.delay(100)  # Reduce CPU load during pause
+                time.sleep(0.1)  # Reduce CPU load during pause
 
             # Select an action
             if random.random() < agent.eps:
@@ -48,13 +48,14 @@ def train(
                 action = env.sample_action()
             else:
                 # Exploitation: use the model
-                action = agent.select_action(state)
+                action = agent.select_action(state, info["action_mask"])
 
             # Execute the action
-            next_state, reward, terminated, truncated, _ = env.step(action)
+            next_state, reward, terminated, truncated, info = env.step(action)
             done = terminated or truncated
 
-            # Store the experience
+            # Store the experience, with the legal actions of the next state
+            next_state = {**next_state, "action_mask": info["action_mask"]}
             agent.memory.push(state, action, reward, next_state, done)
 
             # Optimize the model
@@ -119,6 +120,11 @@ def parse_arguments():
         default=False,
         help="Render mode (human or none)",
     )
+    parser.add_argument(
+        "--prioritized",
+        action="store_true",
+        help="Prioritized experience replay",
+    )
     return parser.parse_args()
 
 
@@ -131,15 +137,17 @@ if __name__ == "__main__":
 
     # Define the state shape and number of actions
     board_shape = env.observation_space["board"].shape
-    state_shape = (1, board_shape[0], board_shape[1])  # Add the channel dimension
-    n_actions = int(np.prod(env.action_space.nvec))
+    state_shape = board_shape  # (planes, height, width)
+    n_actions = int(env.action_space.n)
 
     print(f"Board shape: {board_shape}")
     print(f"State shape: {state_shape}")
     print(f"Number of actions: {n_actions}")
 
     # Create the agent
-    agent = DQNAgent(state_shape, n_actions)
+    agent = DQNAgent(
+        state_shape, n_actions, args.nb_player_mode, prioritized=args.prioritized
+    )
 
     # Train the agent
     rewards, epsilons, wins = train(env, agent, num_episodes=1000)
@@ -0,0 +1,279 @@
+import argparse
+import multiprocessing as mp
+import random
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .djambi_env import DjambiEnv
+
+
+class SharedArrays:
+    """NumPy arrays laid out one after the other in a shared memory segment.
+
+    shapes lists (field, shape, dtype), 8-byte fields first to keep every
+    view aligned. The segment is created when name is None, else attached.
+    """
+
+    def __init__(self, shapes, name=None):
+        size = sum(
+            int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in shapes
+        )
+        self.shm = SharedMemory(name=name, create=name is None, size=size)
+        self.arrays: Dict[str, np.ndarray] = {}
+        offset = 0
+        for field, shape, dtype in shapes:
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            self.arrays[field] = array
+            offset += array.nbytes
+
+    def close(self, unlink: bool = False):
+        self.arrays = {}  # The views must go before the segment is closed
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class SharedBlock(SharedArrays):
+    """NumPy views of the arrays shared by the parent and the workers.
+
+    One shared memory segment holds, for nb_envs environments, the
+    observations (board, player_status, current_player), the legal action
+    masks, the actions written by the parent and the rewards and end flags
+    written by the workers.
+    """
+
+    def __init__(
+        self,
+        nb_envs: int,
+        nb_players: int,
+        board_shape: Tuple[int, ...],
+        nb_actions: int,
+        *,
+        name=None,
+    ):
+        self.args = (nb_envs, nb_players, board_shape, nb_actions)
+        super().__init__(
+            [
+                ("current_player", (nb_envs,), np.int64),
+                ("actions", (nb_envs,), np.int64),
+                ("rewards", (nb_envs,), np.float64),
+                ("board", (nb_envs, *board_shape), np.uint8),
+                ("player_status", (nb_envs, nb_players), np.int8),
+                ("action_mask", (nb_envs, nb_actions), np.int8),
+                ("terminated", (nb_envs,), np.bool_),
+                ("truncated", (nb_envs,), np.bool_),
+            ],
+            name,
+        )
+
+    def write_observation(self, index: int, observation: Dict, info: Dict):
+        # The board planes are encoded in place (DjambiEnv.set_observation_buffer)
+        for field in ("player_status", "current_player"):
+            self.arrays[field][index] = observation[field]
+        self.arrays["action_mask"][index] = info["action_mask"]
+
+    def observations(self, copy: bool = True) -> Dict[str, np.ndarray]:
+        fields = ("board", "player_status", "current_player")
+        return {
+            field: self.arrays[field].copy() if copy else self.arrays[field]
+            for field in fields
+        }
+
+
+def worker(
+    remote, parent_remote, shm_name: str, block_args, index: int, nb_players: int
+):
+    """Runs one DjambiEnv, driven by the commands received on remote."""
+    parent_remote.close()
+    block = SharedBlock(*block_args, name=shm_name)
+    env = DjambiEnv(nb_players=nb_players)
+    arrays = block.arrays
+    env.set_observation_buffer(arrays["board"][index])
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == "step":
+                observation, reward, terminated, truncated, info = env.step(
+                    arrays["actions"][index]
+                )
+                final = None
+                if terminated or truncated:
+                    # Auto-reset: the next observation starts a new game, and
+                    # overwrites the board planes of the last one
+                    observation["board"] = observation["board"].copy()
+                    final = {"final_observation": observation, "final_info": info}
+                    observation, info = env.reset()
+                block.write_observation(index, observation, info)
+                arrays["rewards"][index] = reward
+                arrays["terminated"][index] = terminated
+                arrays["truncated"][index] = truncated
+                remote.send(final)
+            elif command == "reset":
+                observation, info = env.reset(seed=data)
+                block.write_observation(index, observation, info)
+                del info["action_mask"]  # Read from the block
+                remote.send(info)
+            elif command == "call":
+                name, args = data
+                remote.send(getattr(env, name)(*args))
+            elif command == "close":
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        env.close()
+        block.close()
+        remote.close()
+
+
+class SubprocVecEnv:
+    """nb_envs DjambiEnv stepped together in worker processes.
+
+    ``step(actions)`` writes the (nb_envs,) actions into the shared block,
+    lets every worker play its action, and returns the batched observations,
+    rewards, terminated and truncated flags read back from the block. An
+    environment whose game ends is reset at once: its row holds the first
+    observation of the new game, the last one is in its info under
+    "final_observation". The legal action mask of each environment is put
+    in its info under "action_mask". Only commands and these rare infos go
+    through the pipes.
+    """
+
+    def __init__(
+        self,
+        nb_envs: int,
+        nb_players: int = 3,
+        seed: Optional[int] = None,
+        copy: bool = True,
+        context: Optional[str] = None,
+    ):
+        self.nb_envs = nb_envs
+        self.nb_players = nb_players
+        self.copy = copy  # False: the returned arrays are overwritten by step
+        self.seed = random.randrange(2**31) if seed is None else seed
+
+        # Spaces of one environment, from a local instance
+        env = DjambiEnv(nb_players=nb_players)
+        self.observation_space = env.observation_space
+        self.action_space = env.action_space
+        board_shape = env.observation_space["board"].shape
+        env.close()
+
+        self.block = SharedBlock(nb_envs, nb_players, board_shape, self.action_space.n)
+        ctx: Any = mp.get_context(context)  # BaseContext is stubbed without Process
+        self.remotes, self.processes = [], []
+        for index in range(nb_envs):
+            remote, worker_remote = ctx.Pipe()
+            process = ctx.Process(
+                target=worker,
+                args=(
+                    worker_remote,
+                    remote,
+                    self.block.shm.name,
+                    self.block.args,
+                    index,
+                    nb_players,
+                ),
+                daemon=True,
+            )
+            process.start()
+            worker_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        self.closed = False
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[Dict, List[Dict]]:
+        """Resets every environment, seeding environment i with seed + i."""
+        seed = self.seed if seed is None else seed
+        for index, remote in enumerate(self.remotes):
+            remote.send(("reset", seed + index))
+        infos = [remote.recv() for remote in self.remotes]
+        return self.block.observations(self.copy), self.with_masks(infos)
+
+    def step_async(self, actions):
+        self.block.arrays["actions"][:] = actions
+        for remote in self.remotes:
+            remote.send(("step", None))
+
+    def step_wait(self):
+        infos = [remote.recv() or {} for remote in self.remotes]
+        arrays = self.block.arrays
+        rewards, terminated, truncated = (
+            arrays[field].copy() for field in ("rewards", "terminated", "truncated")
+        )
+        observations = self.block.observations(self.copy)
+        return observations, rewards, terminated, truncated, self.with_masks(infos)
+
+    def with_masks(self, infos: List[Dict]) -> List[Dict]:
+        masks = self.block.arrays["action_mask"].copy()
+        for info, mask in zip(infos, masks):
+            info["action_mask"] = mask
+        return infos
+
+    def step(self, actions):
+        """Plays one action per environment, returns the batched results."""
+        self.step_async(actions)
+        return self.step_wait()
+
+    def call(self, name: str, *args) -> List:
+        """Calls a DjambiEnv method in every worker, returns the results."""
+        for remote in self.remotes:
+            remote.send(("call", (name, args)))
+        return [remote.recv() for remote in self.remotes]
+
+    def sample_actions(self) -> np.ndarray:
+        """One random valid action per environment."""
+        return np.array(self.call("sample_action"))
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            try:
+                remote.send(("close", None))
+            except (BrokenPipeError, EOFError):
+                pass  # The worker already exited
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.block.close(unlink=True)
+        self.closed = True
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
+
+
+def benchmark(nb_envs_list, nb_players: int, nb_steps: int, seed: int):
+    """Env steps per second for each number of envs, random valid actions
+    sampled by the workers included."""
+    for nb_envs in nb_envs_list:
+        envs = SubprocVecEnv(nb_envs, nb_players, seed=seed)
+        envs.reset()
+        start = time.perf_counter()
+        for _ in range(nb_steps):
+            envs.step(envs.sample_actions())
+        elapsed = time.perf_counter() - start
+        envs.close()
+        print(
+            f"{nb_envs} envs, {nb_players} players: "
+            f"{nb_envs * nb_steps / elapsed:.0f} env steps/s"
+        )
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Vectorized DjambiEnv throughput.")
+    parser.add_argument("--nb_player_mode", type=int, choices=[3, 4, 6], default=3)
+    parser.add_argument("--num_envs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    benchmark(args.num_envs, args.nb_player_mode, args.steps, args.seed)